@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    """Регистрация приложения api.
+
+    JSON API только для чтения: посты, группы, профили,
+    комментарии и лента подписок.
+    """
+
+    name = 'api'
+    verbose_name = 'API'
@@ -0,0 +1,135 @@
+"""Проекции моделей для API: поле ответа -> выражение для values().
+
+Ответы собираются из словарей values() одним запросом с JOIN,
+без создания экземпляров моделей. Клиент выбирает нужные поля
+параметром fields=id,text,author, в SELECT попадают только они
+и поля, нужные для курсора.
+"""
+import typing
+
+from django.conf import settings
+
+
+def media_url(name: str) -> typing.Optional[str]:
+    return settings.MEDIA_URL + name if name else None
+
+
+def counter(value: typing.Optional[int]) -> int:
+    return value or 0
+
+
+class Projection:
+    """Набор полей ответа одного ресурса.
+
+    fields - поле ответа -> путь для values(),
+    default - поля по умолчанию, если fields не передан,
+    required - пути, которые нужны всегда (ключ курсора),
+    convert - поле ответа -> функция преобразования значения.
+    """
+
+    def __init__(
+        self,
+        fields: typing.Dict[str, str],
+        default: typing.Optional[typing.Sequence[str]] = None,
+        required: typing.Sequence[str] = (),
+        convert: typing.Optional[typing.Dict[str, typing.Callable]] = None,
+    ) -> None:
+        self.fields = fields
+        self.default = tuple(default or fields)
+        self.required = tuple(required)
+        self.convert = convert or {}
+
+    def parse(self, value: typing.Optional[str]) -> typing.Tuple[str, ...]:
+        """Разбирает параметр fields, для неизвестного поля ValueError."""
+        if not value:
+            return self.default
+        names = tuple(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}',
+            )
+        return names
+
+    def lookups(self, names: typing.Sequence[str]) -> typing.List[str]:
+        """Пути для values(): выбранные поля и обязательные."""
+        return list(dict.fromkeys(
+            [self.fields[name] for name in names] + list(self.required),
+        ))
+
+    def row(self, values: dict, names: typing.Sequence[str]) -> dict:
+        """Строка values() -> объект ответа с выбранными полями."""
+        result = {}
+        for name in names:
+            value = values[self.fields[name]]
+            if name in self.convert:
+                value = self.convert[name](value)
+            result[name] = value
+        return result
+
+
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+
+POST = Projection(
+    POST_FIELDS,
+    required=('pk', 'pub_date'),
+    convert={'image': media_url},
+)
+
+# кешируемые списки постов (posts, group:, author:) не сбрасываются
+# при комментариях, поэтому число комментариев в них не отдаётся
+POST_LISTING = Projection(
+    {
+        name: path for name, path in POST_FIELDS.items()
+        if name != 'comments_count'
+    },
+    required=('pk', 'pub_date'),
+    convert={'image': media_url},
+)
+
+COMMENT = Projection(
+    {
+        'id': 'pk',
+        'post': 'post_id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+    },
+    required=('pk', 'pub_date'),
+)
+
+GROUP = Projection({
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+})
+
+PROFILE = Projection(
+    {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'posts_count': 'counters__posts_count',
+        'followers_count': 'counters__followers_count',
+        'following_count': 'counters__following_count',
+    },
+    # у пользователя без постов и подписок счётчиков ещё нет
+    convert={
+        'posts_count': counter,
+        'followers_count': counter,
+        'following_count': counter,
+    },
+)
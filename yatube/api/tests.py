@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    """Тестирование JSON API."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора с тремя постами в группе."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='api_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group,
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_pages_by_cursor(self):
+        """Проверка что курсор листает посты без повторов."""
+        url = reverse('api:posts')
+        with self.assertNumQueries(1):
+            page = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual(
+            [item['id'] for item in page['results']],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
+        page = self.client.get(
+            url, {'limit': 2, 'cursor': page['next_cursor']},
+        ).json()
+        self.assertEqual(
+            [item['id'] for item in page['results']], [self.posts[0].pk],
+        )
+        self.assertIsNone(page['next_cursor'])
+
+    def test_sparse_fields(self):
+        """Проверка выбора полей параметром fields."""
+        response = self.client.get(
+            reverse('api:group_posts', args=(self.group.slug,)),
+            {'fields': 'id,author'},
+        )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.posts[2].pk, 'author': self.author.username},
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'pk'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_listings_have_no_comments_count(self):
+        """Проверка что число комментариев есть только у поста."""
+        response = self.client.get(reverse('api:posts'))
+        self.assertNotIn('comments_count', response.json()['results'][0])
+        response = self.client.get(
+            reverse('api:posts'), {'fields': 'comments_count'},
+        )
+        self.assertEqual(response.status_code, 400)
+        url = reverse('api:post', args=(self.posts[0].pk,))
+        self.assertEqual(self.client.get(url).json()['comments_count'], 0)
+
+    def test_etag(self):
+        """Проверка ответа 304 на повторный запрос с If-None-Match."""
+        url = reverse('api:post', args=(self.posts[0].pk,))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Новый текст')
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['text'], 'Новый текст')
+
+    def test_not_found(self):
+        """Проверка 404 для несуществующих владельцев списков."""
+        for url in (
+            reverse('api:post', args=(0,)),
+            reverse('api:post_comments', args=(0,)),
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:profile_posts', args=('missing',)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_profile(self):
+        """Проверка профиля со счётчиками."""
+        response = self.client.get(
+            reverse('api:profile', args=(self.author.username,)),
+        )
+        self.assertEqual(response.json()['posts_count'], 3)
+
+    def test_follow_feed(self):
+        """Проверка ленты подписок только для авторизованных."""
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        reader = User.objects.create_user(username='api_reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        response = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertEqual(self.client.post(url).status_code, 405)
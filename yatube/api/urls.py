@@ -0,0 +1,24 @@
+from api import views
+from api.apps import ApiConfig
+from django.urls import path
+
+app_name = ApiConfig.name
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:pk>/', views.post, name='post'),
+    path(
+        'posts/<int:pk>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path('profiles/<str:username>/', views.profile, name='profile'),
+    path(
+        'profiles/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts',
+    ),
+    path('follow/', views.follow, name='follow'),
+]
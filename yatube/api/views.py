@@ -0,0 +1,180 @@
+import functools
+import hashlib
+import json
+import typing
+
+from api import projections
+from core.cache import cached_page
+from core.routers import read_from_replica
+from core.utils import CursorPaginator
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from posts.feed import feed_for
+from posts.models import Comment, Group, Post, User
+
+
+def json_response(data: dict, status: int = 200) -> HttpResponse:
+    """JSON-ответ с ETag по содержимому."""
+    body = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False,
+    ).encode()
+    response = HttpResponse(
+        body, status=status, content_type='application/json',
+    )
+    if status == 200:
+        response['ETag'] = f'"{hashlib.md5(body).hexdigest()}"'
+    return response
+
+
+def error(status: int, message: str) -> HttpResponse:
+    return json_response({'error': message}, status)
+
+
+def api_view(view: typing.Callable) -> typing.Callable:
+    """Только GET и HEAD, ответ 304 при совпадении If-None-Match.
+
+    Проверка идёт после кеша страниц, поэтому закешированный
+    ответ тоже отдаётся клиенту без тела.
+    """
+    @require_safe
+    @functools.wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or not response.has_header('ETag'):
+            return response
+        return get_conditional_response(
+            request, etag=response['ETag'], response=response,
+        )
+    return wrapper
+
+
+def page_size(request: HttpRequest) -> int:
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        return settings.API_PAGE_SIZE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def listing(
+    request: HttpRequest,
+    queryset: QuerySet,
+    projection: projections.Projection,
+    owner: typing.Optional[QuerySet] = None,
+) -> HttpResponse:
+    """Страница списка по курсору (pub_date, pk) из values().
+
+    owner - владелец списка (пост, группа, автор). Если страница
+    пуста, отдельным запросом проверяем, что он существует.
+    """
+    try:
+        names = projection.parse(request.GET.get('fields'))
+    except ValueError as exc:
+        return error(400, str(exc))
+    page = CursorPaginator(
+        queryset.values(*projection.lookups(names)), page_size(request),
+    ).get_page(request.GET.get('cursor'))
+    if not page and owner is not None and not owner.exists():
+        return error(404, 'Не найдено')
+    return json_response({
+        'results': [projection.row(values, names) for values in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def detail(
+    request: HttpRequest,
+    queryset: QuerySet,
+    projection: projections.Projection,
+) -> HttpResponse:
+    """Один объект из values() или 404."""
+    try:
+        names = projection.parse(request.GET.get('fields'))
+    except ValueError as exc:
+        return error(400, str(exc))
+    values = queryset.values(*projection.lookups(names)).first()
+    if values is None:
+        return error(404, 'Не найдено')
+    return json_response(projection.row(values, names))
+
+
+@read_from_replica
+@api_view
+@cached_page('posts')
+def posts(request: HttpRequest) -> HttpResponse:
+    """Все посты, от новых к старым."""
+    return listing(request, Post.objects.all(), projections.POST_LISTING)
+
+
+@read_from_replica
+@api_view
+@cached_page('post:{pk}')
+def post(request: HttpRequest, pk: int) -> HttpResponse:
+    return detail(request, Post.objects.filter(pk=pk), projections.POST)
+
+
+@read_from_replica
+@api_view
+@cached_page('post:{pk}')
+def post_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    """Комментарии поста, от новых к старым."""
+    return listing(
+        request,
+        Comment.objects.filter(post_id=pk),
+        projections.COMMENT,
+        Post.objects.filter(pk=pk),
+    )
+
+
+@read_from_replica
+@api_view
+@cached_page('group:{slug}')
+def group(request: HttpRequest, slug: str) -> HttpResponse:
+    return detail(request, Group.objects.filter(slug=slug), projections.GROUP)
+
+
+@read_from_replica
+@api_view
+@cached_page('group:{slug}')
+def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
+    return listing(
+        request,
+        Post.objects.filter(group__slug=slug),
+        projections.POST_LISTING,
+        Group.objects.filter(slug=slug),
+    )
+
+
+@read_from_replica
+@api_view
+@cached_page('author:{username}')
+def profile(request: HttpRequest, username: str) -> HttpResponse:
+    return detail(
+        request, User.objects.filter(username=username), projections.PROFILE,
+    )
+
+
+@read_from_replica
+@api_view
+@cached_page('author:{username}')
+def profile_posts(request: HttpRequest, username: str) -> HttpResponse:
+    return listing(
+        request,
+        Post.objects.filter(author__username=username),
+        projections.POST_LISTING,
+        User.objects.filter(username=username),
+    )
+
+
+@read_from_replica
+@api_view
+def follow(request: HttpRequest) -> HttpResponse:
+    """Лента подписок текущего пользователя."""
+    if not request.user.is_authenticated:
+        return error(401, 'Нужна авторизация')
+    return listing(request, feed_for(request.user), projections.POST)
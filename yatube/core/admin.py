@@ -1,7 +1,56 @@
+from core.utils import estimate_count
+from django.conf import settings
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator списков админки без COUNT(*) по всей таблице.
+
+    Для списка без фильтров берётся оценка числа строк
+    (core.utils.estimate_count), если она больше
+    ADMIN_EXACT_COUNT_LIMIT. Иначе записи считаются, но не больше
+    ADMIN_EXACT_COUNT_LIMIT: дальние страницы большого отфильтрованного
+    списка недоступны, зато подсчёт не читает всю таблицу.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
 
 
 class BaseAdmin(admin.ModelAdmin):
-    """В случае остутствия данных,поле будет заполнено словом пусто."""
+    """Основа админок проекта, рассчитанная на большие таблицы.
+
+    В случае остутствия данных,поле будет заполнено словом пусто.
+    Список не выполняет COUNT(*) по таблице (EstimatedCountPaginator,
+    show_full_result_count), а поиск ищет точное совпадение
+    со значением search_fields, чтобы запрос шёл по индексу.
+    """
 
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск точным совпадением, icontains прочитал бы всю таблицу."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        query = Q()
+        for field in self.get_search_fields(request):
+            query |= Q(**{field: search_term})
+        try:
+            return queryset.filter(query), False
+        except (ValueError, ValidationError):
+            return queryset.none(), False
@@ -9,3 +9,7 @@ class CoreConfig(AppConfig):
 
     name = 'core'
     verbose_name = 'ядро'
+
+    def ready(self) -> None:
+        """Подключаем обработчики сигналов core."""
+        from core import signals  # noqa: F401
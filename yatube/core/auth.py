@@ -0,0 +1,50 @@
+"""Пользователь запроса из кеша, без запроса к базе.
+
+Загруженный бэкендом пользователь кешируется по id и поколению
+области 'user:<id>' (core.cache), которое увеличивают сохранение
+и удаление пользователя: смена профиля, пароля или активности.
+Хеш сессии проверяется так же, как в django.contrib.auth.get_user,
+поэтому смена пароля по-прежнему завершает остальные сессии, если
+поколение видят все воркеры: CachedAuthenticationMiddleware
+включается в settings только с общим кешем (SHARED_CACHE).
+"""
+import typing
+
+from core.cache import generation
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model, load_backend)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.utils.crypto import constant_time_compare
+
+USER_KEY = 'user:{}:{}'
+
+
+def get_user(request: HttpRequest) -> typing.Any:
+    """Пользователь сессии или AnonymousUser."""
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            request.session[SESSION_KEY],
+        )
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    key = USER_KEY.format(user_id, generation(f'user:{user_id}')[0])
+    user = cache.get(key)
+    if user is None:
+        user = load_backend(backend_path).get_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    if hasattr(user, 'get_session_auth_hash'):
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if not session_hash or not constant_time_compare(
+            session_hash, user.get_session_auth_hash(),
+        ):
+            request.session.flush()
+            return AnonymousUser()
+    return user
@@ -0,0 +1,200 @@
+"""Кеш страниц с поколениями, которые сбрасываются по событиям.
+
+Каждая страница зависит от набора областей (scope), например
+'posts' или 'group:<slug>'. У области есть номер поколения в кеше.
+Сигналы моделей увеличивают поколение, и закешированная страница
+со старым поколением перестаёт считаться свежей, поэтому срок жизни
+записей можно делать долгим.
+
+Пересобирает страницу только тот процесс, который взял блокировку,
+остальные в это время отдают предыдущую версию или ждут.
+
+Без общего кеша поколения живут GENERATION_TIMEOUT и начинаются
+заново: так изменения из других воркеров видны не позже, чем через
+PAGE_CACHE_TIMEOUT, в том числе клиентам с ETag.
+
+Область может быть функцией от аргументов view, которая возвращает
+список областей: так страница поста зависит от его автора и группы.
+"""
+import functools
+import hashlib
+import time
+import typing
+
+from core import routers
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import condition
+
+GENERATION_KEY = 'generation:{}'
+PAGE_KEY = 'page:{}:{}'
+LOCK_KEY = '{}:lock'
+
+
+def _initial() -> int:
+    """Начальное поколение, не совпадающее с прошлыми после вытеснения."""
+    return int(time.time() * 1000)
+
+
+def generation(*scopes: str) -> typing.Tuple[int, ...]:
+    """Возвращает текущие поколения перечисленных областей."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial(), settings.GENERATION_TIMEOUT)
+        values.update(cache.get_many(missing))
+    return tuple(values.get(key) for key in keys)
+
+
+def bump(*scopes: str) -> None:
+    """Увеличивает поколения областей после изменения данных.
+
+    Внутри транзакции поколения увеличиваются ещё раз после коммита:
+    страница, собранная до коммита по старым данным, не останется
+    свежей.
+    """
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes: typing.Sequence[str]) -> None:
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), settings.GENERATION_TIMEOUT)
+
+
+Scope = typing.Union[str, typing.Callable[..., typing.List[str]]]
+
+
+def _expand(
+    scopes: typing.Sequence[Scope], kwargs: dict, **extra,
+) -> typing.List[str]:
+    """Подставляет аргументы view в шаблоны и вызывает функции областей."""
+    expanded = []
+    for scope in scopes:
+        if callable(scope):
+            expanded.extend(scope(**kwargs))
+        else:
+            expanded.append(scope.format(**extra, **kwargs))
+    return expanded
+
+
+def _cacheable(request: HttpRequest, response: HttpResponse) -> bool:
+    """Кешируем только общие для всех ответы без cookie и CSRF-токена."""
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+        and not getattr(response, 'streaming', False)
+    )
+
+
+def page_timeout(timeout: typing.Optional[int] = None) -> int:
+    """Страница, собранная по реплике, может отставать от поколения.
+
+    Поэтому она живёт не дольше, чем реплика отстаёт от основной базы.
+    """
+    timeout = timeout or settings.PAGE_CACHE_TIMEOUT
+    if routers.used_replica():
+        return min(timeout, settings.REPLICA_MAX_LAG)
+    return timeout
+
+
+def _wait_for(key: str, current: tuple) -> typing.Optional[HttpResponse]:
+    """Ждёт, пока другой процесс положит свежую версию страницы."""
+    deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.PAGE_CACHE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == current:
+            return entry[1]
+    return None
+
+
+def cached_page(*scopes: Scope, timeout: typing.Optional[int] = None):
+    """Декоратор кеширования страницы для анонимных пользователей.
+
+    scopes - шаблоны областей, в них подставляются аргументы view,
+    например cached_page('group:{slug}').
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if (
+                request.method != 'GET'
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            current = generation(*_expand(scopes, kwargs))
+            key = PAGE_KEY.format(
+                view.__name__,
+                hashlib.md5(request.get_full_path().encode()).hexdigest(),
+            )
+            entry = cache.get(key)
+            if entry is not None and entry[0] == current:
+                return entry[1]
+            lock = LOCK_KEY.format(key)
+            if not cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+                if entry is not None:
+                    return entry[1]
+                return _wait_for(key, current) or view(
+                    request, *args, **kwargs,
+                )
+            try:
+                response = view(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    cache.set(
+                        key, (current, response), page_timeout(timeout),
+                    )
+            finally:
+                cache.delete(lock)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(*scopes: Scope):
+    """Декоратор условного GET: ETag из поколений областей страницы.
+
+    ETag считается до вызова view и без запросов к базе, поэтому
+    на неизменившуюся страницу клиент получает 304 без отрисовки.
+    В ETag входят адрес страницы, пользователь (шапка и кнопки
+    у каждого свои) и CSRF-cookie, от которой зависит токен форм.
+    В шаблон области можно подставить {user} - pk текущего
+    пользователя, например 'follow:{user}'.
+
+    Страница, собранная по реплике, может отставать от поколения,
+    под которым посчитан ETag, поэтому такой ответ уходит без ETag:
+    иначе клиент получал бы 304 на устаревшую копию до следующего
+    изменения области.
+    """
+    def etag(request: HttpRequest, *args, **kwargs) -> str:
+        current = generation(
+            *_expand(scopes, kwargs, user=request.user.pk),
+        )
+        return hashlib.md5('|'.join((
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            str(current),
+        )).encode()).hexdigest()
+
+    def decorator(view):
+        conditional = condition(etag_func=etag)(view)
+
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            response = conditional(request, *args, **kwargs)
+            if routers.used_replica() and response.has_header('ETag'):
+                del response['ETag']
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,364 @@
+"""Общий для всех процессов хоста кеш в отображённом в память файле.
+
+LocMemCache у каждого воркера свой: попадания падают с ростом числа
+воркеров, а сброс поколений из core.cache не доходит до остальных
+процессов. SharedMemoryCache хранит записи в одном файле, который
+каждый процесс отображает в память через mmap, внешний сервер
+не нужен.
+
+Файл разбит на наборы (set) по WAYS слотов фиксированного размера.
+Заголовки слотов набора лежат подряд в его начале, так что поиск
+ключа читает одну страницу памяти, а не WAYS страниц.
+Ключ попадает в набор по хешу, внутри набора при нехватке места
+вытесняется давно не читавшийся слот (LRU). Операции над набором
+выполняются под блокировкой его байтового диапазона (fcntl.lockf)
+и потоковой блокировкой, поэтому add, incr и decr атомарны между
+процессами, а номер версии слота растёт при каждой записи.
+
+Настройки OPTIONS:
+MAX_ENTRIES - число слотов (по умолчанию 4096),
+WAYS - слотов в наборе (8),
+SLOT_SIZE - размер слота в байтах (65536), значения больше
+не кешируются.
+"""
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import typing
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'YTBC0001'
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 64
+# флаги, хеш ключа, срок жизни, версия, время обращения, длина значения
+SLOT = struct.Struct('<B16sdQQI')
+USED = 1
+COMPRESSED = 2
+COMPRESS_MIN_LENGTH = 1024
+THREAD_LOCKS = 64
+
+
+class SharedMemoryCache(BaseCache):
+    """Кеш Django в файле, отображённом в память всех процессов."""
+
+    def __init__(self, location: str, params: dict) -> None:
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.ways = int(options.get('WAYS', 8))
+        self.slot_size = int(options.get('SLOT_SIZE', 65536))
+        self.sets = max(1, int(options.get('MAX_ENTRIES', 4096)) // self.ways)
+        self.index_size = -(-self.ways * SLOT.size // 64) * 64
+        self.set_size = self.index_size + self.ways * self.slot_size
+        self.size = HEADER_SIZE + self.sets * self.set_size
+        self._fd: typing.Optional[int] = None
+        self._map: typing.Optional[mmap.mmap] = None
+        self._pid: typing.Optional[int] = None
+        self._open_lock = threading.Lock()
+        self._thread_locks = [
+            threading.Lock() for _ in range(min(self.sets, THREAD_LOCKS))
+        ]
+
+    def _open(self) -> mmap.mmap:
+        """Отображает файл в память, при первом открытии размечает его.
+
+        После fork отображение открывается заново, чтобы не делить
+        с родителем дескриптор и его блокировки.
+        """
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+        with self._open_lock:
+            if self._map is not None and self._pid == os.getpid():
+                return self._map
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if self._fd is not None:
+                os.close(self._fd)
+                self._thread_locks = [
+                    threading.Lock() for _ in self._thread_locks
+                ]
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                header = HEADER.pack(
+                    MAGIC, self.sets, self.ways, self.slot_size,
+                )
+                if (
+                    os.fstat(fd).st_size != self.size
+                    or os.pread(fd, HEADER.size, 0) != header
+                ):
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, header, 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self.size)
+            self._pid = os.getpid()
+        return self._map
+
+    def _locate(self, key: str) -> typing.Tuple[bytes, int]:
+        digest = hashlib.md5(key.encode()).digest()
+        return digest, int.from_bytes(digest[:8], 'little') % self.sets
+
+    def _locked(self, number: int) -> '_SetLock':
+        self._open()
+        return _SetLock(
+            self._thread_locks[number % len(self._thread_locks)],
+            self._fd,
+            HEADER_SIZE + number * self.set_size,
+            self.set_size,
+        )
+
+    def _offset(self, number: int, way: int) -> int:
+        """Смещение заголовка слота."""
+        return HEADER_SIZE + number * self.set_size + way * SLOT.size
+
+    def _data(self, offset: int) -> int:
+        """Смещение значения слота по смещению его заголовка."""
+        number, position = divmod(offset - HEADER_SIZE, self.set_size)
+        return (
+            HEADER_SIZE
+            + number * self.set_size
+            + self.index_size
+            + position // SLOT.size * self.slot_size
+        )
+
+    def _find(
+        self, digest: bytes, number: int,
+    ) -> typing.Tuple[typing.Optional[int], tuple]:
+        """Ищет живой слот ключа в наборе, просроченный освобождает."""
+        for way in range(self.ways):
+            offset = self._offset(number, way)
+            slot = SLOT.unpack_from(self._map, offset)
+            if not slot[0] & USED or slot[1] != digest:
+                continue
+            if slot[2] and slot[2] <= time.time():
+                self._map[offset] = 0
+                return None, ()
+            return offset, slot
+        return None, ()
+
+    def _victim(self, number: int) -> int:
+        """Свободный слот набора или давно не читавшийся (LRU)."""
+        oldest, victim = None, 0
+        now = time.time()
+        for way in range(self.ways):
+            offset = self._offset(number, way)
+            flags, _, expires, _, accessed, _ = SLOT.unpack_from(
+                self._map, offset,
+            )
+            if not flags & USED or (expires and expires <= now):
+                return offset
+            if oldest is None or accessed < oldest:
+                oldest, victim = accessed, offset
+        return victim
+
+    def _read(self, offset: int, slot: tuple) -> typing.Any:
+        flags, digest, expires, version, _, length = slot
+        SLOT.pack_into(
+            self._map, offset,
+            flags, digest, expires, version, time.monotonic_ns(), length,
+        )
+        start = self._data(offset)
+        data = self._map[start:start + length]
+        if flags & COMPRESSED:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _write(
+        self,
+        digest: bytes,
+        number: int,
+        value: typing.Any,
+        expires: float,
+        offset: typing.Optional[int] = None,
+        version: int = 0,
+    ) -> bool:
+        """Пишет значение в слот ключа или в слот, выбранный LRU.
+
+        expires - абсолютный срок жизни, 0 - бессрочно.
+        """
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        flags = USED
+        if len(data) >= COMPRESS_MIN_LENGTH:
+            data = zlib.compress(data)
+            flags |= COMPRESSED
+        if len(data) > self.slot_size:
+            logger.debug('Значение %s байт не помещается в слот', len(data))
+            if offset is not None:
+                self._map[offset] = 0
+            return False
+        if offset is None:
+            offset = self._victim(number)
+        start = self._data(offset)
+        self._map[start:start + len(data)] = data
+        SLOT.pack_into(
+            self._map, offset,
+            flags,
+            digest,
+            expires,
+            version + 1,
+            time.monotonic_ns(),
+            len(data),
+        )
+        return True
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """Абсолютный срок жизни записи, None - бессрочно."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + max(timeout, 0)
+
+    def _expires(self, timeout) -> float:
+        return self.get_backend_timeout(timeout) or 0.0
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, _ = self._find(digest, number)
+            if offset is not None:
+                return False
+            return self._write(digest, number, value, self._expires(timeout))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, slot = self._find(digest, number)
+            if offset is None:
+                return default
+            return self._read(offset, slot)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, slot = self._find(digest, number)
+            self._write(
+                digest,
+                number,
+                value,
+                self._expires(timeout),
+                offset,
+                slot[3] if slot else 0,
+            )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, slot = self._find(digest, number)
+            if offset is None:
+                return False
+            flags, digest, _, slot_version, accessed, length = slot
+            SLOT.pack_into(
+                self._map, offset,
+                flags, digest, self._expires(timeout),
+                slot_version, accessed, length,
+            )
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, _ = self._find(digest, number)
+            if offset is not None:
+                self._map[offset] = 0
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно меняет число в кеше во всех процессах."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, slot = self._find(digest, number)
+            if offset is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._read(offset, slot) + delta
+            self._write(digest, number, value, slot[2], offset, slot[3])
+            return value
+
+    def version_of(self, key, version=None) -> int:
+        """Номер версии записи, растёт при каждой записи ключа.
+
+        0 - записи нет.
+        """
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        digest, number = self._locate(key)
+        with self._locked(number):
+            offset, slot = self._find(digest, number)
+            return slot[3] if offset is not None else 0
+
+    def has_key(self, key, version=None):
+        return self.version_of(key, version=version) > 0
+
+    def clear(self):
+        """Очищает файл целиком, освобождая занятую им память."""
+        self._open()
+        for lock in self._thread_locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                os.ftruncate(self._fd, HEADER_SIZE)
+                os.ftruncate(self._fd, self.size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        finally:
+            for lock in self._thread_locks:
+                lock.release()
+
+    def close(self, **kwargs):
+        """Отображение держится открытым на всё время жизни процесса."""
+
+
+class _SetLock:
+    """Блокировка набора слотов от потоков и от других процессов."""
+
+    def __init__(
+        self, thread_lock: threading.Lock, fd: int, start: int, length: int,
+    ) -> None:
+        self.thread_lock = thread_lock
+        self.fd = fd
+        self.start = start
+        self.length = length
+
+    def __enter__(self) -> None:
+        self.thread_lock.acquire()
+        try:
+            fcntl.lockf(
+                self.fd, fcntl.LOCK_EX, self.length, self.start, os.SEEK_SET,
+            )
+        except BaseException:
+            self.thread_lock.release()
+            raise
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            fcntl.lockf(
+                self.fd, fcntl.LOCK_UN, self.length, self.start, os.SEEK_SET,
+            )
+        finally:
+            self.thread_lock.release()
@@ -0,0 +1,95 @@
+"""SQLite для работы под нагрузкой.
+
+Отличия от django.db.backends.sqlite3:
+
+- при открытии соединения выполняются PRAGMA из OPTIONS['pragmas'],
+  например journal_mode=WAL, synchronous=NORMAL, mmap_size и
+  busy_timeout; cache_size='auto' выбирает кеш по размеру файла базы;
+- OPTIONS['transaction_mode'] = 'IMMEDIATE' открывает транзакции
+  atomic через BEGIN IMMEDIATE: блокировка на запись берётся сразу
+  и ожидается по busy_timeout, а не падает с database is locked
+  при попытке записи после чтения внутри транзакции;
+- отдельные запросы вне транзакции при database is locked
+  повторяются до OPTIONS['lock_retries'] раз с нарастающей паузой.
+  Такой запрос при ошибке ничего не изменил, поэтому повтор безопасен.
+"""
+import os
+import time
+
+from django.db.backends.sqlite3 import base
+
+AUTO = 'auto'
+DEFAULT_CACHE_KIB = 64 * 1024
+MAX_CACHE_KIB = 512 * 1024
+RETRY_DELAY = 0.01
+
+
+def is_locked(error: Exception) -> bool:
+    return 'is locked' in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """Курсор, повторяющий запрос вне транзакции при блокировке базы."""
+
+    wrapper = None
+
+    def _retry(self, method, query, params):
+        attempt = 0
+        while True:
+            try:
+                return method(query, params)
+            except base.Database.OperationalError as error:
+                if (
+                    not is_locked(error)
+                    or self.wrapper.in_atomic_block
+                    or attempt >= self.wrapper.lock_retries
+                ):
+                    raise
+            time.sleep(RETRY_DELAY * 2 ** attempt)
+            attempt += 1
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Соединение SQLite с PRAGMA, BEGIN IMMEDIATE и повтором запросов."""
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        self.lock_retries = params.pop('lock_retries', 0)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if name == 'cache_size' and value == AUTO:
+                value = self.auto_cache_size()
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def auto_cache_size(self) -> int:
+        """Размер кеша страниц в КиБ (отрицательный) по размеру базы."""
+        if self.is_in_memory_db():
+            return -DEFAULT_CACHE_KIB
+        try:
+            size = os.path.getsize(self.settings_dict['NAME']) // 1024
+        except OSError:
+            return -DEFAULT_CACHE_KIB
+        return -min(max(size, DEFAULT_CACHE_KIB), MAX_CACHE_KIB)
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.wrapper = self
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,182 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from core.metrics import percentile
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+SCHEMA = (
+    'CREATE TABLE bench_post ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, author_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, pub_date DATETIME NOT NULL)',
+    'CREATE INDEX bench_post_pub_date ON bench_post (pub_date)',
+    'CREATE TABLE bench_counter ('
+    'user_id INTEGER PRIMARY KEY, posts_count INTEGER NOT NULL)',
+)
+USERS = 100
+POSTS = 10000
+
+
+def _profiles(directory: str) -> dict:
+    """Стандартный бэкенд Django и профиль из settings.DATABASES."""
+    tuned = dict(settings.DATABASES['default'])
+    return {
+        'plain': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'plain.sqlite3'),
+            'CONN_MAX_AGE': 0,
+        },
+        'tuned': dict(
+            tuned,
+            NAME=os.path.join(directory, 'tuned.sqlite3'),
+            CONN_MAX_AGE=tuned.get('CONN_MAX_AGE') or 60,
+        ),
+    }
+
+
+def _create(path: str) -> None:
+    database = sqlite3.connect(path)
+    with database:
+        for sql in SCHEMA:
+            database.execute(sql)
+        database.executemany(
+            'INSERT INTO bench_counter VALUES (?, 0)',
+            ((user,) for user in range(USERS)),
+        )
+        database.executemany(
+            'INSERT INTO bench_post (author_id, text, pub_date) '
+            'VALUES (?, ?, ?)',
+            (
+                (number % USERS, f'пост {number}', timezone.now().isoformat())
+                for number in range(POSTS)
+            ),
+        )
+    database.close()
+
+
+def _write(alias: str, rng: random.Random) -> None:
+    """Как post_create: чтение, вставка и обновление счётчика."""
+    user = rng.randrange(USERS)
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT posts_count FROM bench_counter WHERE user_id = %s',
+                [user],
+            )
+            cursor.execute(
+                'INSERT INTO bench_post (author_id, text, pub_date) '
+                'VALUES (%s, %s, %s)',
+                [user, 'нагрузочный пост', timezone.now()],
+            )
+            cursor.execute(
+                'UPDATE bench_counter SET posts_count = posts_count + 1 '
+                'WHERE user_id = %s',
+                [user],
+            )
+
+
+def _read(alias: str, rng: random.Random) -> None:
+    """Как страница ленты: десять последних постов."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'SELECT id, author_id, text FROM bench_post '
+            'ORDER BY pub_date DESC LIMIT 10 OFFSET %s',
+            [rng.randrange(100)],
+        )
+        cursor.fetchall()
+
+
+def _worker(task: tuple) -> dict:
+    alias, seconds, write_ratio, seed = task
+    connections.close_all()
+    rng = random.Random(seed)
+    result = {'reads': 0, 'writes': 0, 'errors': 0, 'write_ms': []}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        writing = rng.random() < write_ratio
+        try:
+            if writing:
+                _write(alias, rng)
+                result['writes'] += 1
+                result['write_ms'].append(
+                    (time.perf_counter() - started) * 1000,
+                )
+            else:
+                _read(alias, rng)
+                result['reads'] += 1
+        except OperationalError:
+            result['errors'] += 1
+        # как в конце запроса: закрыть соединение, если оно не постоянное
+        connections[alias].close_if_unusable_or_obsolete()
+    return result
+
+
+class Command(BaseCommand):
+    """Сравнение стандартного SQLite и профиля из settings.DATABASES.
+
+    Несколько процессов одновременно читают ленту и пишут посты
+    в отдельные временные базы. Для каждого профиля выводятся
+    операции в секунду, ошибки database is locked и p95 записи.
+    """
+
+    help = 'Замеряет пропускную способность SQLite под конкурентной записью'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--output', help='Файл для отчёта в JSON')
+
+    def handle(self, *args, **options):
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, database in _profiles(directory).items():
+                _create(database['NAME'])
+                alias = f'benchmark_{name}'
+                connections.databases[alias] = database
+                connections.ensure_defaults(alias)
+                report[name] = self.run(alias, options)
+                connections[alias].close()
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text)
+        for name, stats in report.items():
+            self.stdout.write(
+                f'{name}: {stats["ops_per_second"]} оп/с, записей '
+                f'{stats["writes_per_second"]}/с, ошибок {stats["errors"]}, '
+                f'p95 записи {stats["write_p95_ms"]} мс',
+            )
+
+    @staticmethod
+    def run(alias: str, options: dict) -> dict:
+        context = multiprocessing.get_context('fork')
+        tasks = [
+            (alias, options['seconds'], options['write_ratio'], seed)
+            for seed in range(options['workers'])
+        ]
+        connections.close_all()
+        with context.Pool(options['workers']) as pool:
+            results = pool.map(_worker, tasks)
+        reads = sum(result['reads'] for result in results)
+        writes = sum(result['writes'] for result in results)
+        latencies = sorted(
+            latency for result in results for latency in result['write_ms']
+        )
+        seconds = options['seconds']
+        return {
+            'ops_per_second': round((reads + writes) / seconds, 1),
+            'reads_per_second': round(reads / seconds, 1),
+            'writes_per_second': round(writes / seconds, 1),
+            'errors': sum(result['errors'] for result in results),
+            'write_p95_ms': round(percentile(latencies, 95), 2)
+            if latencies else None,
+        }
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Обновляет снимки основной базы, из которых читают реплики.
+
+    Снимок снимается через backup API SQLite во временный файл
+    и подменяет реплику атомарным переименованием, поэтому
+    открытые соединения дочитывают старый снимок, а новые
+    видят свежий. Запускать по расписанию чаще REPLICA_MAX_LAG.
+    """
+
+    help = 'Копирует основную базу в файлы реплик'
+
+    def handle(self, *args, **options):
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                path = settings.DATABASES[alias]['NAME']
+                snapshot(source, path)
+                self.stdout.write(f'{alias}: {path}')
+        finally:
+            source.close()
+
+
+def snapshot(source: sqlite3.Connection, path: str) -> None:
+    temporary = f'{path}.tmp'
+    target = sqlite3.connect(temporary)
+    try:
+        source.backup(target)
+        # снимок только читают, WAL и его -shm файлы ему не нужны
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+    os.replace(temporary, path)
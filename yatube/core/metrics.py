@@ -0,0 +1,128 @@
+"""Метрики запросов: число SQL-запросов, время SQL, шаблонов и ответа.
+
+Замеры копятся в памяти процесса по имени view, для каждого view
+хранится скользящее окно из METRICS_WINDOW последних запросов,
+по которому считаются перцентили.
+"""
+import collections
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.template.base import Template
+
+FIELDS = ('queries', 'sql_ms', 'template_ms', 'total_ms')
+PERCENTILES = (50, 95, 99)
+
+_state = threading.local()
+_lock = threading.Lock()
+_samples: typing.Dict[str, collections.deque] = {}
+_original_render = Template.render
+
+
+class Sample:
+    """Замеры одного запроса, собираемые по ходу его обработки."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.depth = 0
+
+    def as_dict(self) -> typing.Dict[str, float]:
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 2),
+            'template_ms': round(self.template * 1000, 2),
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+
+def current() -> typing.Optional[Sample]:
+    """Замеры текущего запроса этого потока."""
+    return getattr(_state, 'sample', None)
+
+
+def start() -> Sample:
+    _state.sample = Sample()
+    return _state.sample
+
+
+def stop() -> None:
+    _state.sample = None
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """execute_wrapper для соединений: считает запросы и их время."""
+    sample = current()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.sql += time.perf_counter() - started
+
+
+def _timed_render(self, context):
+    """Template.render, измеряющий время только внешнего шаблона.
+
+    Вложенные include тоже вызывают render, их время уже входит
+    во время внешнего шаблона.
+    """
+    sample = current()
+    if sample is None:
+        return _original_render(self, context)
+    sample.depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        sample.depth -= 1
+        if not sample.depth:
+            sample.template += time.perf_counter() - started
+
+
+def instrument_templates() -> None:
+    Template.render = _timed_render
+
+
+def record(view_name: str, values: typing.Dict[str, float]) -> None:
+    """Добавляет замеры запроса в окно view."""
+    with _lock:
+        window = _samples.get(view_name)
+        if window is None:
+            window = _samples[view_name] = collections.deque(
+                maxlen=settings.METRICS_WINDOW,
+            )
+        window.append(tuple(values[field] for field in FIELDS))
+
+
+def percentile(values: typing.List[float], rank: int) -> float:
+    """Перцентиль по методу ближайшего ранга, values отсортирован."""
+    index = max(0, -(-len(values) * rank // 100) - 1)
+    return values[index]
+
+
+def snapshot() -> typing.Dict[str, dict]:
+    """Перцентили всех метрик по каждому view."""
+    with _lock:
+        windows = {name: list(window) for name, window in _samples.items()}
+    result = {}
+    for name, rows in sorted(windows.items()):
+        stats = {'count': len(rows)}
+        for position, field in enumerate(FIELDS):
+            values = sorted(row[position] for row in rows)
+            stats[field] = {
+                f'p{rank}': percentile(values, rank) for rank in PERCENTILES
+            }
+        result[name] = stats
+    return result
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
@@ -0,0 +1,141 @@
+import contextlib
+import logging
+import typing
+
+from core import auth, metrics, ratelimit, routers
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """View выполнил больше SQL-запросов, чем позволяет его бюджет."""
+
+
+class MetricsMiddleware:
+    """Замеряет SQL-запросы, время шаблонов и время ответа каждого view.
+
+    Замеры копятся в core.metrics по имени view (например
+    posts:group_list). При DEBUG они же отдаются в заголовках
+    X-Query-Count и Server-Timing.
+
+    QUERY_BUDGETS задаёт максимальное число запросов для view,
+    при превышении QUERY_BUDGET_ACTION = 'log' пишет предупреждение,
+    а 'raise' роняет запрос с QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response: typing.Callable) -> None:
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        sample = metrics.start()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql_wrapper),
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        match = request.resolver_match
+        if match is None:
+            return response
+        values = sample.as_dict()
+        metrics.record(match.view_name, values)
+        if settings.DEBUG:
+            response['X-Query-Count'] = values['queries']
+            response['Server-Timing'] = (
+                f'sql;dur={values["sql_ms"]}, '
+                f'tpl;dur={values["template_ms"]}, '
+                f'total;dur={values["total_ms"]}'
+            )
+        self.check_budget(match.view_name, values['queries'])
+        return response
+
+    @staticmethod
+    def check_budget(view_name: str, queries: int) -> None:
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or queries <= budget:
+            return
+        message = (
+            f'{view_name}: {queries} SQL-запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaMiddleware:
+    """Включает чтение из реплик для помеченных view.
+
+    Пока у пользователя есть cookie REPLICA_PIN_COOKIE, все его
+    запросы читают основную базу. Cookie ставится на
+    REPLICA_PIN_SECONDS после любого запроса, который писал в базу.
+    """
+
+    def __init__(self, get_response: typing.Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        routers.allow_replica(False)
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            routers.allow_replica(False)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.allow_replica(
+            getattr(view_func, 'replica_reads', False)
+            and request.method in ('GET', 'HEAD')
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES,
+        )
+
+
+class RateLimitMiddleware:
+    """Применяет пределы settings.RATE_LIMITS по имени view.
+
+    Проверка идёт до вызова view, поэтому отклонённый запрос
+    не доходит до базы, кроме чтения сессии.
+    """
+
+    def __init__(self, get_response: typing.Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        config = settings.RATE_LIMITS.get(request.resolver_match.view_name)
+        if config is None:
+            return None
+        return ratelimit.throttle(
+            request,
+            request.resolver_match.view_name,
+            ratelimit.Limit(**config),
+        )
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware с пользователем из кеша, см. core.auth."""
+
+    def process_request(self, request: HttpRequest) -> None:
+        request.user = SimpleLazyObject(lambda: auth.get_user(request))
@@ -1,6 +1,7 @@
+import typing
+
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.utils import timezone
+from django.db import DatabaseError, models, router, transaction
 
 User = get_user_model()
 
@@ -21,17 +22,100 @@ class Setinfo(models.Model):
 
 
 class TimestampedModel(Setinfo):
+    """Запись с датой публикации и датой последнего изменения.
+
+    pub_date ставится один раз при создании и больше не меняется,
+    поэтому редактирование не двигает запись в списках, упорядоченных
+    по дате. updated обновляется при каждом сохранении.
+
+    Повторное сохранение загруженной из базы записи пишет только
+    изменившиеся поля и updated, а без изменений не пишет ничего.
+    Если pk сброшен или заменён (копирование записи) или строку
+    успели удалить, запись сохраняется целиком, как обычно в Django.
+    """
+
     pub_date = models.DateTimeField(
         auto_now_add=True,
         db_index=True,
         verbose_name='дата публикации',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='дата изменения',
+    )
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self) -> typing.Optional[typing.List[str]]:
+        """Поля, изменённые после загрузки из базы.
+
+        Для записи, которая не загружалась из базы, вернёт None.
+        Отложенные (deferred) поля не проверяются и не загружаются.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        changed = []
+        for attname, old_value in loaded.items():
+            if (
+                attname not in self.__dict__
+                or attname == self._meta.pk.attname
+            ):
+                continue
+            value = self.__dict__[attname]
+            if getattr(value, '_committed', True) is False or (
+                value != old_value
+            ):
+                changed.append(attname)
+        return changed
+
     def save(self, *args, **kwargs):
-        """Изменяем дату после изменений если дата публикации уже есть."""
-        if self.pk:
-            self.pub_date = timezone.now()
-        return super(TimestampedModel, self).save(*args, **kwargs)
+        """Сохраняет запись, обновляя только изменённые поля."""
+        loaded = getattr(self, '_loaded_values', None)
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and loaded is not None
+            and self.pk is not None
+            and loaded.get(self._meta.pk.attname) == self.pk
+        ):
+            kwargs.pop('update_fields', None)
+            changed = self.changed_fields()
+            if not changed:
+                return
+            if self._save_changed(changed + ['updated'], *args, **kwargs):
+                return
+        super().save(*args, **kwargs)
+        self._remember_values()
+
+    def _save_changed(self, update_fields: list, *args, **kwargs) -> bool:
+        """UPDATE изменённых полей, False - если строки уже нет."""
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self,
+        )
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, update_fields=update_fields, **kwargs)
+        except DatabaseError:
+            if type(self)._base_manager.using(using).filter(
+                pk=self.pk,
+            ).exists():
+                raise
+            return False
+        self._remember_values()
+        return True
+
+    def _remember_values(self) -> None:
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
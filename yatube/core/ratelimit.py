@@ -0,0 +1,179 @@
+"""Ограничение частоты запросов корзиной токенов (token bucket).
+
+У каждого пользователя, а у анонима у каждого IP, своя корзина
+на view. Корзина вмещает burst токенов и пополняется со скоростью
+rate, запрос забирает один токен. Пустая корзина - ответ 429
+с Retry-After.
+
+Пределы для view по имени задаются в settings.RATE_LIMITS
+(их применяет core.middleware.RateLimitMiddleware), для отдельных
+view есть декоратор rate_limit. Пользователь берётся из сессии,
+без запроса к таблице пользователей.
+
+RATE_LIMIT_STORE = 'memory' - корзины в памяти процесса,
+'cache' - в кеше Django, общем для процессов при SHARED_CACHE.
+В кеше корзина читается и пишется без блокировки, так что при
+гонке двух процессов может пройти лишний запрос.
+"""
+import collections
+import functools
+import logging
+import math
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY = 'ratelimit:{}:{}'
+MAX_ENTRIES = 10000
+
+# (токенов осталось, время последнего обращения)
+State = typing.Tuple[float, float]
+
+
+class Limit:
+    """Предел: rate вида '30/m' и размер корзины burst.
+
+    По умолчанию burst равен числу запросов в rate.
+    """
+
+    def __init__(
+        self,
+        rate: str,
+        burst: typing.Optional[int] = None,
+        methods: typing.Sequence[str] = UNSAFE_METHODS,
+    ) -> None:
+        count, period = rate.split('/')
+        self.rate = int(count) / PERIODS[period]
+        self.burst = burst or int(count)
+        self.methods = methods
+
+    def take(
+        self, state: typing.Optional[State], now: float,
+    ) -> typing.Tuple[State, float]:
+        """Забирает токен, возвращает новое состояние и время ожидания.
+
+        Время ожидания 0 - запрос пропускаем.
+        """
+        tokens, updated = state or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0.0
+        return (tokens, now), (1 - tokens) / self.rate
+
+
+class MemoryStore:
+    """Корзины в памяти процесса, давно не нужные вытесняются."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.buckets: typing.OrderedDict[str, State] = (
+            collections.OrderedDict()
+        )
+        self.lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        with self.lock:
+            state, wait = limit.take(self.buckets.pop(key, None), now)
+            self.buckets[key] = state
+            if len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheStore:
+    """Корзины в кеше Django, живут до полного пополнения."""
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        state, wait = limit.take(cache.get(key), now)
+        cache.set(key, state, math.ceil(limit.burst / limit.rate) + 1)
+        return wait
+
+    def clear(self) -> None:
+        """Корзины в кеше истекают сами."""
+
+
+STORES = {
+    'memory': MemoryStore(),
+    'cache': CacheStore(),
+}
+
+
+def reset() -> None:
+    """Наполняет все корзины процесса, нужно в тестах."""
+    for store in STORES.values():
+        store.clear()
+
+
+def identity(request: HttpRequest) -> str:
+    """Пользователь из сессии или IP анонима."""
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is not None:
+        return f'user:{user_id}'
+    address = request.META.get(settings.RATE_LIMIT_IP_HEADER or '')
+    if address:
+        # начало X-Forwarded-For пишет клиент, доверять можно только
+        # адресу, который дописал наш прокси: RATE_LIMIT_PROXY_HOPS
+        # с конца списка
+        addresses = [part.strip() for part in address.split(',')]
+        hops = settings.RATE_LIMIT_PROXY_HOPS
+        address = addresses[max(len(addresses) - hops, 0)]
+    return f'ip:{address or request.META.get("REMOTE_ADDR", "")}'
+
+
+def throttle(
+    request: HttpRequest, name: str, limit: Limit,
+) -> typing.Optional[HttpResponse]:
+    """Ответ 429, если корзина запроса пуста, иначе None."""
+    if request.method not in limit.methods:
+        return None
+    key = KEY.format(name, identity(request))
+    wait = STORES[settings.RATE_LIMIT_STORE].take(key, limit, time.time())
+    if not wait:
+        return None
+    logger.warning('Превышен предел запросов %s', key)
+    response = render(
+        request,
+        'core/429.html',
+        {'retry_after': math.ceil(wait)},
+        status=429,
+    )
+    response['Retry-After'] = math.ceil(wait)
+    return response
+
+
+def rate_limit(
+    rate: str,
+    burst: typing.Optional[int] = None,
+    methods: typing.Sequence[str] = UNSAFE_METHODS,
+    name: typing.Optional[str] = None,
+) -> typing.Callable:
+    """Декоратор предела для одного view.
+
+    name - имя корзины, по умолчанию полное имя функции view.
+    """
+    limit = Limit(rate, burst, methods)
+
+    def decorator(view: typing.Callable) -> typing.Callable:
+        bucket = name or f'{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            return throttle(request, bucket, limit) or view(
+                request, *args, **kwargs,
+            )
+        return wrapper
+    return decorator
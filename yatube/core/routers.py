@@ -0,0 +1,72 @@
+"""Чтение из реплик для страниц-списков, запись в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS. Читать из них
+разрешено только view, помеченным @read_from_replica, и только
+пока ReplicaMiddleware включила это для текущего запроса.
+
+Чтобы пользователь сразу видел свои изменения (read-after-write),
+после записи запросы идут в основную базу: до конца текущего
+запроса, а затем REPLICA_PIN_SECONDS по cookie, которую ставит
+ReplicaMiddleware.
+"""
+import random
+import threading
+import typing
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def read_from_replica(view: typing.Callable) -> typing.Callable:
+    """Разрешает view читать из реплик."""
+    view.replica_reads = True
+    return view
+
+
+def allow_replica(allowed: bool) -> None:
+    """Включает чтение из реплик для текущего запроса."""
+    _state.allowed = allowed
+    _state.written = False
+    _state.used = False
+
+
+def used_replica() -> bool:
+    """Читал ли текущий запрос из реплики."""
+    return getattr(_state, 'used', False)
+
+
+def wrote() -> bool:
+    """Писал ли текущий запрос в основную базу."""
+    return getattr(_state, 'written', False)
+
+
+class ReplicaRouter:
+    """Роутер: запись и миграции - основная база, чтение - реплики."""
+
+    def db_for_read(self, model, **hints) -> typing.Optional[str]:
+        if (
+            not settings.DATABASE_REPLICAS
+            or not getattr(_state, 'allowed', False)
+            or getattr(_state, 'written', False)
+        ):
+            return PRIMARY
+        _state.used = True
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints) -> str:
+        _state.written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> typing.Optional[bool]:
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints) -> typing.Optional[bool]:
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
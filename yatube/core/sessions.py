@@ -0,0 +1,67 @@
+"""Сессии: сначала кеш, запись в базу после ответа (write-behind).
+
+Как в django.contrib.sessions.backends.cached_db, сессия читается
+из кеша и только при промахе из базы. Но изменённая в запросе сессия
+сразу пишется только в кеш, а в базу - после отправки ответа
+(сигнал request_finished) и один раз, сколько бы раз её ни сохраняли
+за запрос. Новые сессии (must_create) и удаление идут в базу сразу:
+ключ новой сессии нужно проверить на уникальность.
+
+Вне запроса (shell, команды, force_login в тестах) сессия
+сохраняется в базу сразу. Движок включается в settings только
+вместе с общим кешем (SHARED_CACHE): в кеше процесса выход
+из аккаунта не дошёл бы до остальных воркеров.
+"""
+import logging
+import threading
+import typing
+
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError, router, transaction
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def begin(**kwargs) -> None:
+    """Начало запроса: сессии копятся до его конца."""
+    _state.pending = {}
+
+
+def finish(**kwargs) -> None:
+    """Конец запроса: пишет изменённые сессии в базу."""
+    pending = getattr(_state, 'pending', None)
+    _state.pending = None
+    if pending:
+        persist(pending.values())
+
+
+def persist(sessions: typing.Iterable[Session]) -> None:
+    """Обновляет строки сессий, удалённые за это время не воскрешает."""
+    for session in sessions:
+        using = router.db_for_write(Session, instance=session)
+        try:
+            with transaction.atomic(using=using):
+                session.save(force_update=True, using=using)
+        except DatabaseError:
+            logger.info('Сессия удалена до записи в базу')
+
+
+class SessionStore(cached_db.SessionStore):
+    """Сессия в кеше с отложенной записью в базу."""
+
+    def save(self, must_create: bool = False) -> None:
+        pending = getattr(_state, 'pending', None)
+        if must_create or pending is None or self.session_key is None:
+            return super().save(must_create)
+        data = self._get_session()
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        pending[self.session_key] = self.create_model_instance(data)
+
+    def delete(self, session_key: typing.Optional[str] = None) -> None:
+        pending = getattr(_state, 'pending', None)
+        if pending:
+            pending.pop(session_key or self.session_key, None)
+        super().delete(session_key)
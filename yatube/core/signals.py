@@ -0,0 +1,17 @@
+from core import sessions
+from core.cache import bump
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs) -> None:
+    """Сбрасывает закешированного пользователя, см. core.auth."""
+    bump(f'user:{instance.pk}')
+
+
+request_started.connect(sessions.begin)
+request_finished.connect(sessions.finish)
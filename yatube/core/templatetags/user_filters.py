@@ -1,3 +1,4 @@
+from core import utils
 from django import template
 
 register = template.Library()
@@ -14,3 +15,9 @@ def addclass(field, css: None) -> None:
             'class': css,
         },
     )
+
+
+@register.filter
+def page_window(page) -> range:
+    """Номера страниц вокруг текущей вместо всего page_range."""
+    return utils.page_window(page)
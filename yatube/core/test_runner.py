@@ -0,0 +1,20 @@
+"""Запуск тестов через manage.py test."""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner, в котором фоновые задачи выполняются сразу.
+
+    Пул процессов core.workers в тестах не нужен: результат задачи
+    проверяется сразу после запроса.
+    """
+
+    def setup_test_environment(self, **kwargs) -> None:
+        super().setup_test_environment(**kwargs)
+        self._inline_workers = override_settings(WORKER_PROCESSES=0)
+        self._inline_workers.enable()
+
+    def teardown_test_environment(self, **kwargs) -> None:
+        self._inline_workers.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,6 +1,33 @@
+import multiprocessing
+import sqlite3
+import tempfile
+import threading
 from http import HTTPStatus
 
-from django.test import Client, TestCase
+from core import auth, metrics, ratelimit, routers, sessions
+from core.cache import conditional_page
+from core.cache_backends import SharedMemoryCache
+from core.management.commands.snapshot_replicas import snapshot
+from core.middleware import QueryBudgetExceeded, ReplicaMiddleware
+from core.utils import CursorPaginator, page_window
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import counters
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -16,3 +43,605 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class CursorPaginatorTests(TestCase):
+    """Проверка курсорной пагинации по (pub_date, pk)."""
+
+    NUMBER_OF_POSTS: int = 15
+    PER_PAGE: int = 10
+
+    @classmethod
+    def setUpClass(cls: TestCase):
+        super().setUpClass()
+        author = User.objects.create_user(username='cursor_author')
+        Post.objects.bulk_create(
+            Post(text=f'пост {number}', author=author)
+            for number in range(cls.NUMBER_OF_POSTS)
+        )
+        cls.paginator = CursorPaginator(Post.objects.all(), cls.PER_PAGE)
+
+    def test_pages_follow_each_other(self):
+        """Проверка что курсоры ведут на следующую и обратно."""
+        first = self.paginator.get_page()
+        self.assertEqual(len(first), self.PER_PAGE)
+        self.assertFalse(first.has_previous())
+        second = self.paginator.get_page(first.next_cursor)
+        self.assertEqual(len(second), self.NUMBER_OF_POSTS - self.PER_PAGE)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверка что испорченный курсор отдаёт первую страницу."""
+        page = self.paginator.get_page('broken')
+        self.assertEqual(list(page), list(self.paginator.get_page()))
+
+    def test_view_switches_to_cursor(self):
+        """Проверка что параметр cursor включает курсорную пагинацию."""
+        response = self.client.get(reverse('posts:index') + '?cursor=')
+        self.assertTrue(response.context['page_obj'].is_cursor)
+
+    def test_profile_uses_cursor(self):
+        """Проверка что профиль листается курсором."""
+        response = self.client.get(
+            reverse('posts:profile', args=('cursor_author',)),
+        )
+        page = response.context['page_obj']
+        self.assertTrue(page.is_cursor)
+        self.assertContains(response, f'cursor={page.next_cursor}')
+        self.assertNotContains(response, 'page=')
+
+    @override_settings(PAGINATION_WINDOW=2)
+    def test_page_window(self):
+        """Проверка что нумерованный пагинатор выводит окно страниц."""
+        paginator = Paginator(range(100), 1)
+        self.assertEqual(list(page_window(paginator.page(1))), [1, 2, 3])
+        self.assertEqual(
+            list(page_window(paginator.page(50))), [48, 49, 50, 51, 52],
+        )
+        self.assertEqual(list(page_window(paginator.page(100))), [98, 99, 100])
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Проверка замеров запросов и бюджетов SQL-запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='metrics_author')
+        cls.staff = User.objects.create_user(
+            username='metrics_staff', is_staff=True,
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='metrics', description='описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'пост {i}', author=cls.author, group=cls.group)
+            for i in range(settings.LIMIT_POSTS + 1)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.staff, text='к')
+
+    def setUp(self):
+        metrics.reset()
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    @override_settings(QUERY_BUDGET_ACTION='raise')
+    def test_views_fit_query_budgets(self):
+        """Проверка что страницы укладываются в бюджеты запросов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'metrics_author'}),
+            reverse('posts:post_detail', kwargs={'pk': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=пост',
+            reverse('posts:post_create'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+
+    @override_settings(QUERY_BUDGET_ACTION='raise')
+    def test_image_posts_fit_query_budgets(self):
+        """Проверка бюджетов для постов с картинками без миниатюр."""
+        Post.objects.bulk_create(
+            Post(
+                text=f'пост с картинкой {i}',
+                author=self.author,
+                group=self.group,
+                image=f'posts/photo_{i}.jpg',
+            )
+            for i in range(settings.LIMIT_POSTS)
+        )
+        # bulk_create не вызывает сигналы счётчиков
+        counters.recount_groups()
+        counters.recount_users()
+        post = Post.objects.filter(image__startswith='posts/').first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'metrics_author'}),
+            reverse('posts:post_detail', kwargs={'pk': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '/media/posts/photo_')
+
+    @override_settings(
+        QUERY_BUDGET_ACTION='raise', QUERY_BUDGETS={'posts:index': 0},
+    )
+    def test_budget_exceeded_raises(self):
+        """Проверка что превышение бюджета роняет запрос."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        """Проверка заголовков с замерами в режиме DEBUG."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint(self):
+        """Проверка что перцентили доступны только персоналу."""
+        self.client.get(reverse('posts:index'))
+        stats = self.client.get(reverse('metrics')).json()
+        self.assertEqual(stats['posts:index']['count'], 1)
+        self.assertIn('p99', stats['posts:index']['total_ms'])
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class TimestampedModelTests(TestCase):
+    """Проверка дат публикации и изменения записей."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='timestamps')
+        cls.first = Post.objects.create(text='первый', author=cls.author)
+        cls.second = Post.objects.create(text='второй', author=cls.author)
+
+    def test_edit_keeps_pub_date_and_order(self):
+        """Проверка что правка не двигает пост в списке."""
+        post = Post.objects.get(pk=self.first.pk)
+        post.text = 'первый, исправленный'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.pub_date, self.first.pub_date)
+        self.assertGreater(post.updated, self.first.updated)
+        self.assertEqual(Post.objects.first(), self.second)
+
+    def test_save_writes_only_changed_fields(self):
+        """Проверка что UPDATE содержит только изменённые поля."""
+        post = Post.objects.get(pk=self.first.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        self.assertEqual(len(queries), 0)
+        post.text = 'новый текст'
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        update = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        )
+        self.assertIn('"text"', update)
+        self.assertNotIn('"pub_date"', update)
+        self.assertNotIn('"comments_count"', update)
+
+    def test_copy_with_reset_pk(self):
+        """Проверка что запись со сброшенным pk сохраняется копией."""
+        post = Post.objects.get(pk=self.first.pk)
+        post.pk = None
+        post.save()
+        self.assertNotEqual(post.pk, self.first.pk)
+        self.assertEqual(Post.objects.filter(text='первый').count(), 2)
+
+    def test_save_of_deleted_row_inserts_it(self):
+        """Проверка что загруженная и удалённая запись вставляется снова."""
+        post = Post.objects.get(pk=self.second.pk)
+        Post.objects.filter(pk=post.pk).delete()
+        post.text = 'восстановленный'
+        post.save()
+        self.assertEqual(
+            Post.objects.get(pk=self.second.pk).text, 'восстановленный',
+        )
+
+
+def _bump_shared(path: str, times: int) -> None:
+    cache = SharedMemoryCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    """Проверка общего для процессов кеша в памяти."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/cache.mmap'
+        self.cache = SharedMemoryCache(self.path, {})
+
+    def test_basic_operations(self):
+        """Проверка set, add, get_many, incr и delete."""
+        self.cache.set('page', {'html': 'x' * 5000})
+        self.assertEqual(self.cache.get('page'), {'html': 'x' * 5000})
+        self.assertFalse(self.cache.add('page', 'другое'))
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.assertEqual(self.cache.incr('a', 10), 11)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('short', 1, timeout=0)
+        self.assertIsNone(self.cache.get('short'))
+
+    def test_key_version_grows_on_write(self):
+        """Проверка что версия записи растёт при каждой записи."""
+        self.assertEqual(self.cache.version_of('key'), 0)
+        self.cache.set('key', 1)
+        self.cache.incr('key')
+        self.assertEqual(self.cache.version_of('key'), 2)
+
+    def test_lru_eviction(self):
+        """Проверка вытеснения давно не читавшейся записи."""
+        cache = SharedMemoryCache(
+            self.path + '.lru', {'OPTIONS': {'MAX_ENTRIES': 2, 'WAYS': 2}},
+        )
+        cache.set('old', 1)
+        cache.set('fresh', 2)
+        cache.get('old')
+        cache.set('new', 3)
+        self.assertEqual(cache.get_many(['old', 'fresh', 'new']), {
+            'old': 1, 'new': 3,
+        })
+
+    def test_incr_is_atomic_across_processes(self):
+        """Проверка что incr из нескольких процессов ничего не теряет."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_bump_shared, args=(self.path, 200))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 800)
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    """Проверка профиля SQLite: PRAGMA, BEGIN IMMEDIATE и повтор."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/db.sqlite3'
+        self.connections = ConnectionHandler({
+            'default': {
+                'ENGINE': 'core.db_backends.sqlite3',
+                'NAME': self.path,
+                'OPTIONS': {
+                    'timeout': 0,
+                    'transaction_mode': 'IMMEDIATE',
+                    'lock_retries': 6,
+                    'pragmas': {
+                        'journal_mode': 'WAL',
+                        'synchronous': 'NORMAL',
+                        'cache_size': 'auto',
+                        'busy_timeout': 0,
+                    },
+                },
+            },
+        })
+        self.addCleanup(self.connections.close_all)
+        self.database = self.connections['default']
+
+    def test_pragmas_applied(self):
+        """Проверка что PRAGMA выполняются при открытии соединения."""
+        with self.database.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA cache_size')
+            self.assertLess(cursor.fetchone()[0], 0)
+
+    def test_locked_write_is_retried(self):
+        """Проверка повтора записи, пока база занята другим процессом."""
+        with self.database.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        other = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False,
+        )
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        release = threading.Timer(0.05, lambda: other.execute('COMMIT'))
+        release.start()
+        self.addCleanup(release.cancel)
+        with self.database.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRouterTests(TestCase):
+    """Проверка чтения из реплик и закрепления за основной базой."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.addCleanup(routers.allow_replica, False)
+
+    def test_reads_go_to_replica_until_write(self):
+        """Проверка что после записи запрос читает основную базу."""
+        routers.allow_replica(True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica_0')
+        self.assertTrue(routers.used_replica())
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_go_to_primary_by_default(self):
+        """Проверка что без разрешения чтение идёт в основную базу."""
+        routers.allow_replica(False)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertFalse(routers.used_replica())
+
+    def test_replicas_are_not_migrated(self):
+        """Проверка что миграции не применяются к репликам."""
+        self.assertFalse(self.router.allow_migrate('replica_0', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def test_pin_cookie_disables_replica(self):
+        """Проверка что cookie закрепления отключает реплики."""
+        middleware = ReplicaMiddleware(lambda request: None)
+        view = routers.read_from_replica(lambda request: None)
+        factory = RequestFactory()
+        middleware.process_view(factory.get('/'), view, (), {})
+        self.assertEqual(self.router.db_for_read(Post), 'replica_0')
+        request = factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        middleware.process_view(request, view, (), {})
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        middleware.process_view(factory.post('/'), view, (), {})
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_sets_pin_cookie(self):
+        """Проверка что после записи ставится cookie закрепления."""
+        user = User.objects.create_user(username='writer')
+        post = Post.objects.create(author=user, text='Пост')
+        client = Client()
+        client.force_login(user)
+        response = client.post(
+            reverse('posts:add_comment', kwargs={'pk': post.pk}),
+            {'text': 'Комментарий'},
+        )
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertGreaterEqual(
+            settings.REPLICA_PIN_SECONDS, settings.REPLICA_MAX_LAG,
+        )
+
+    def test_replica_page_has_no_etag(self):
+        """Проверка что страница из реплики не получает ETag."""
+        @conditional_page('posts')
+        def view(request):
+            if request.GET.get('replica'):
+                routers.allow_replica(True)
+                self.router.db_for_read(Post)
+            return HttpResponse('ok')
+        factory = RequestFactory()
+        request = factory.get('/')
+        request.user = AnonymousUser()
+        self.assertTrue(view(request).has_header('ETag'))
+        request = factory.get('/', {'replica': 1})
+        request.user = AnonymousUser()
+        self.assertFalse(view(request).has_header('ETag'))
+
+    def test_snapshot(self):
+        """Проверка что снимок содержит данные основной базы."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/replica.sqlite3'
+        source = sqlite3.connect(':memory:')
+        self.addCleanup(source.close)
+        source.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        source.execute('INSERT INTO item VALUES (1)')
+        source.commit()
+        snapshot(source, path)
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT COUNT(*) FROM item').fetchone()[0], 1,
+        )
+
+
+class RateLimitTests(TestCase):
+    """Проверка ограничения частоты запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='spammer')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        ratelimit.reset()
+        self.addCleanup(ratelimit.reset)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:add_comment', kwargs={'pk': self.post.pk})
+
+    def test_bucket_refills(self):
+        """Проверка что корзина пополняется со скоростью rate."""
+        limit = ratelimit.Limit('2/s', burst=2)
+        state, wait = limit.take(None, 0)
+        state, wait = limit.take(state, 0)
+        self.assertEqual(wait, 0)
+        state, wait = limit.take(state, 0)
+        self.assertEqual(wait, 0.5)
+        state, wait = limit.take(state, 0.5)
+        self.assertEqual(wait, 0)
+
+    def test_memory_store_evicts_oldest(self):
+        """Проверка что хранилище в памяти ограничено по размеру."""
+        store = ratelimit.MemoryStore(max_entries=2)
+        limit = ratelimit.Limit('1/m')
+        for key in ('a', 'b', 'c'):
+            store.take(key, limit, 0)
+        self.assertEqual(list(store.buckets), ['b', 'c'])
+
+    def test_too_many_requests(self):
+        """Проверка что сверх предела отдаётся 429 без записи в базу."""
+        with override_settings(
+            RATE_LIMITS={'posts:add_comment': {'rate': '2/m'}},
+        ):
+            for _ in range(2):
+                self.client.post(self.url, {'text': 'Комментарий'})
+            with self.assertNumQueries(1):
+                response = self.client.post(self.url, {'text': 'Лишний'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_users_have_own_buckets(self):
+        """Проверка что у пользователей и адресов свои корзины."""
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        with override_settings(
+            RATE_LIMITS={'posts:add_comment': {'rate': '1/m'}},
+        ):
+            self.client.post(self.url, {'text': 'Комментарий'})
+            response = other.post(self.url, {'text': 'Комментарий'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+            response = Client().post(self.url, {'text': 'Комментарий'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+            response = Client().post(self.url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(
+        RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_PROXY_HOPS=1,
+    )
+    def test_forwarded_address(self):
+        """Проверка что адрес берётся от прокси, а не от клиента."""
+        request = RequestFactory().get(
+            '/', HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.7',
+        )
+        request.session = {}
+        self.assertEqual(ratelimit.identity(request), 'ip:10.0.0.7')
+        request.META['HTTP_X_FORWARDED_FOR'] = '2.2.2.2, 10.0.0.7'
+        self.assertEqual(ratelimit.identity(request), 'ip:10.0.0.7')
+        with override_settings(RATE_LIMIT_PROXY_HOPS=2):
+            self.assertEqual(ratelimit.identity(request), 'ip:2.2.2.2')
+        request.META['HTTP_X_FORWARDED_FOR'] = '10.0.0.7'
+        with override_settings(RATE_LIMIT_PROXY_HOPS=2):
+            self.assertEqual(ratelimit.identity(request), 'ip:10.0.0.7')
+
+    def test_safe_methods_are_not_limited(self):
+        """Проверка что без methods GET не ограничивается."""
+        url = reverse('posts:profile_follow', args=(self.user.username,))
+        with override_settings(
+            RATE_LIMITS={'posts:profile_follow': {'rate': '1/m'}},
+        ):
+            for _ in range(2):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    @override_settings(
+        RATE_LIMIT_STORE='cache',
+        RATE_LIMITS={'posts:add_comment': {'rate': '1/m'}},
+    )
+    def test_cache_store(self):
+        """Проверка что корзины могут храниться в общем кеше."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.post(self.url, {'text': 'Комментарий'})
+        response = self.client.post(self.url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertIsNotNone(cache.get(
+            f'ratelimit:posts:add_comment:user:{self.user.pk}',
+        ))
+
+    def test_decorator(self):
+        """Проверка декоратора предела для отдельного view."""
+        view = ratelimit.rate_limit('1/h')(lambda request: 'ok')
+        request = RequestFactory().post('/')
+        request.session = {}
+        self.assertEqual(view(request), 'ok')
+        self.assertEqual(view(request).status_code, 429)
+
+
+@override_settings(
+    SESSION_ENGINE='core.sessions',
+    MIDDLEWARE=settings.CACHED_AUTH_MIDDLEWARE,
+)
+class CachedAuthTests(TestCase):
+    """Тестирование сессий и пользователя запроса из кеша."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cached_user')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.session = sessions.SessionStore(
+            self.client.session.session_key,
+        )
+        return request
+
+    def test_warm_request_makes_no_queries(self):
+        """Проверка что сессия и пользователь читаются без базы."""
+        self.assertEqual(auth.get_user(self.request()), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(auth.get_user(self.request()), self.user)
+        post = Post.objects.create(author=self.user, text='Пост')
+        url = reverse('posts:post_detail', args=(post.pk,))
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_password_change_logs_out(self):
+        """Проверка что смена пароля сбрасывает кеш и сессию."""
+        self.assertTrue(auth.get_user(self.request()).is_authenticated)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        self.assertFalse(auth.get_user(self.request()).is_authenticated)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_write_behind(self):
+        """Проверка что сессия пишется в базу только в конце запроса."""
+        key = self.client.session.session_key
+        sessions.begin()
+        self.addCleanup(sessions.finish)
+        store = sessions.SessionStore(key)
+        store['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            store.save()
+        self.assertEqual(sessions.SessionStore(key)['theme'], 'dark')
+        self.assertNotIn(
+            'theme', Session.objects.get(pk=key).get_decoded(),
+        )
+        sessions.finish()
+        self.assertEqual(
+            Session.objects.get(pk=key).get_decoded()['theme'], 'dark',
+        )
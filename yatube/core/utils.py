@@ -1,16 +1,233 @@
+import base64
+import typing
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
+from django.db import connections, router
+from django.db.models import Model, Q, QuerySet
 from django.http import HttpRequest
+from django.utils.dateparse import parse_datetime
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Наследует django.core.paginator.Page, который ждут шаблоны,
+    но вместо номеров страниц отдаёт непрозрачные курсоры.
+    """
+
+    is_cursor = True
+
+    def __init__(
+        self,
+        object_list: list,
+        paginator: 'CursorPaginator',
+        has_next: bool,
+        has_previous: bool,
+    ) -> None:
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self) -> str:
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self) -> typing.Optional[str]:
+        """Курсор страницы со следующими, более старыми записями."""
+        if not self._has_next:
+            return None
+        return self.paginator.encode(CURSOR_NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self) -> typing.Optional[str]:
+        """Курсор страницы с предыдущими, более новыми записями."""
+        if not self._has_previous:
+            return None
+        return self.paginator.encode(CURSOR_PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Курсорная (keyset) пагинация по паре (pub_date, pk).
+
+    Вместо COUNT(*) и LIMIT/OFFSET читает per_page + 1 строку
+    начиная с ключа последней показанной записи, поэтому глубокие
+    страницы стоят столько же, сколько первая.
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        per_page: int,
+        date_field: str = 'pub_date',
+    ) -> None:
+        super().__init__(queryset, per_page)
+        self.queryset = queryset
+        self.date_field = date_field
+
+    def _key(self, item) -> typing.Tuple:
+        if isinstance(item, dict):
+            return item[self.date_field], item.get('pk', item.get('id'))
+        return getattr(item, self.date_field), item.pk
+
+    def encode(self, direction: str, item) -> str:
+        """Упаковывает ключ записи в непрозрачный курсор."""
+        date, pk = self._key(item)
+        raw = f'{direction}|{date.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor: str) -> typing.Optional[typing.Tuple]:
+        """Распаковывает курсор, для испорченного курсора вернёт None."""
+        try:
+            raw = base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4),
+            ).decode()
+            direction, date, pk = raw.split('|')
+            date = parse_datetime(date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return None
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or date is None:
+            return None
+        return direction, date, pk
+
+    def get_page(self, cursor: typing.Optional[str] = None) -> CursorPage:
+        """Возвращает страницу после курсора или первую страницу."""
+        field = self.date_field
+        decoded = self.decode(cursor) if cursor else None
+        if decoded is None:
+            rows = list(
+                self.queryset.order_by(f'-{field}', '-pk')[:self.per_page + 1],
+            )
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, False,
+            )
+        direction, date, pk = decoded
+        if direction == CURSOR_NEXT:
+            rows = list(
+                self.queryset.filter(
+                    Q(**{f'{field}__lt': date})
+                    | Q(**{field: date, 'pk__lt': pk}),
+                ).order_by(f'-{field}', '-pk')[:self.per_page + 1],
+            )
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, True,
+            )
+        rows = list(
+            self.queryset.filter(
+                Q(**{f'{field}__gt': date})
+                | Q(**{field: date, 'pk__gt': pk}),
+            ).order_by(field, 'pk')[:self.per_page + 1],
+        )
+        return CursorPage(
+            rows[:self.per_page][::-1], self, True, len(rows) > self.per_page,
+        )
 
 
 def paginate(
     request: HttpRequest,
-    queryset: list,
+    queryset: typing.Union[QuerySet, list],
     posts_limit: int = settings.LIMIT_POSTS,
-) -> None:
+    mode: typing.Optional[str] = None,
+    count: typing.Optional[int] = None,
+) -> typing.Union[Page, CursorPage]:
     """Функция постраничного разделения.
 
     В зависимости от объемов входящей информации,
     вынесена в отдельную область.
+
+    mode='pages' - нумерованные страницы django Paginator,
+    mode='cursor' - курсорная пагинация без COUNT(*) и OFFSET.
+    По умолчанию берётся settings.PAGINATION_MODE, а запрос
+    с параметром cursor всегда обслуживается курсорной пагинацией.
+    Готовые списки всегда делятся на нумерованные страницы,
+    а QuerySet и совместимые с ним объекты (posts.feed.MergedFeed)
+    можно листать курсором.
+    count - заранее известное число записей (например, из счётчика),
+    тогда Paginator не выполняет COUNT(*).
+    """
+    if 'cursor' in request.GET:
+        mode = 'cursor'
+    if (
+        (mode or settings.PAGINATION_MODE) == 'cursor'
+        and not isinstance(queryset, list)
+    ):
+        return CursorPaginator(queryset, posts_limit).get_page(
+            request.GET.get('cursor'),
+        )
+    paginator = Paginator(queryset, posts_limit)
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
+
+
+def page_window(page: Page, radius: typing.Optional[int] = None) -> range:
+    """Номера страниц вокруг текущей для нумерованного пагинатора.
+
+    Весь paginator.page_range на длинных списках - тысячи ссылок
+    в каждой странице, поэтому выводится только окно из radius
+    (по умолчанию settings.PAGINATION_WINDOW) страниц по обе стороны
+    от текущей.
+    """
+    if radius is None:
+        radius = settings.PAGINATION_WINDOW
+    return range(
+        max(page.number - radius, 1),
+        min(page.number + radius, page.paginator.num_pages) + 1,
+    )
+
+
+def estimate_count(model: typing.Type[Model]) -> typing.Optional[int]:
+    """Примерное число строк таблицы модели без COUNT(*).
+
+    PostgreSQL держит оценку в pg_class.reltuples. SQLite берёт её
+    из sqlite_stat1, если выполнялся ANALYZE, иначе из MAX(rowid):
+    это точное число строк, пока из таблицы не удаляли записи.
+    None - оценки нет.
     """
-    return Paginator(queryset, posts_limit).get_page(request.GET.get('page'))
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table],
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+        if connection.vendor != 'sqlite':
+            return None
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'sqlite_stat1'",
+        )
+        if cursor.fetchone():
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [table],
+            )
+            row = cursor.fetchone()
+            if row:
+                return int(row[0].split()[0])
+        cursor.execute(
+            f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}',
+        )
+        return cursor.fetchone()[0] or 0
@@ -1,7 +1,10 @@
 from http import HTTPStatus
 
+from core import metrics as request_metrics
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import (HttpRequest, HttpResponseForbidden,
-                         HttpResponseNotFound, HttpResponseServerError)
+                         HttpResponseNotFound, HttpResponseServerError,
+                         JsonResponse)
 from django.shortcuts import render
 
 
@@ -25,7 +28,7 @@ def permission_denied(
     return render(
         request,
         'core/403.html',
-        HTTPStatus.FORBIDDEN.value,
+        status=HTTPStatus.FORBIDDEN.value,
     )
 
 
@@ -39,5 +42,14 @@ def server_error(request: HttpRequest) -> HttpResponseServerError:
     return render(
         request,
         'core/500.html',
-        HTTPStatus.INTERNAL_SERVER_ERROR.value,
+        status=HTTPStatus.INTERNAL_SERVER_ERROR.value,
+    )
+
+
+@staff_member_required
+def metrics(request: HttpRequest) -> JsonResponse:
+    """Перцентили замеров MetricsMiddleware по каждому view."""
+    return JsonResponse(
+        request_metrics.snapshot(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
     )
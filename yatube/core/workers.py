@@ -0,0 +1,79 @@
+"""Локальная очередь фоновых задач на пуле процессов.
+
+Тяжёлая работа с изображениями не должна выполняться в потоке
+запроса, поэтому задачи уходят в ProcessPoolExecutor. Результат
+обрабатывает callback в родительском процессе.
+
+При WORKER_PROCESSES = 0 задачи выполняются сразу в текущем
+процессе: так настроены тесты (core.test_runner и фикстура
+в tests/conftest.py). По умолчанию пул занимает все ядра.
+"""
+import logging
+import typing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+_executor: typing.Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker() -> None:
+    """Не делим с родителем соединения с БД, унаследованные при fork."""
+    connections.close_all()
+
+
+def _executor_instance() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.WORKER_PROCESSES,
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _run_callback(callback: typing.Callable, result) -> None:
+    try:
+        callback(result)
+    finally:
+        connection.close()
+
+
+def _done(callback: typing.Callable, future: Future) -> None:
+    try:
+        result = future.result()
+    except Exception:
+        logger.exception('Фоновая задача завершилась с ошибкой')
+        return
+    _run_callback(callback, result)
+
+
+def submit(
+    func: typing.Callable,
+    *args,
+    callback: typing.Optional[typing.Callable] = None,
+) -> None:
+    """Ставит задачу в очередь, callback получит её результат."""
+    if not settings.WORKER_PROCESSES:
+        try:
+            result = func(*args)
+        except Exception:
+            logger.exception('Фоновая задача завершилась с ошибкой')
+            return
+        if callback is not None:
+            callback(result)
+        return
+    future = _executor_instance().submit(func, *args)
+    if callback is not None:
+        future.add_done_callback(lambda done: _done(callback, done))
+
+
+def wait() -> None:
+    """Дожидается выполнения всех задач и останавливает пул."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -1,6 +1,7 @@
 from core.admin import BaseAdmin
 from django.contrib import admin
 from posts.models import Comment, Follow, Group, Post
+from posts.search import filter_text
 
 
 @admin.register(Post)
@@ -9,16 +10,28 @@ class PostAdmin(BaseAdmin):
     Настройки отображения модели 'Статьи' в интерфейсе админки.
 
     list_display: перечисляем поля, которые должны отображаться.
-    list_editable: опция для измнения поля group в любом посте.
-    search_fields: интерфейс для поиска по тексту постов.
-    list_filter: фильтрация по дате.
+    list_select_related: авторы и группы загружаются тем же запросом.
+    raw_id_fields: автор и группа выбираются по id, без полных списков.
+    search_fields: интерфейс для поиска по тексту постов,
+    запрос выполняется по полнотекстовому индексу FTS5.
+    list_filter: фильтрация по дате, запросов к базе не требует.
+    date_hierarchy: переход по датам публикации.
     empty_value_display: вывод в поле текста '-пусто',
     если информация отсутствует.
     """
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту идёт через полнотекстовый индекс."""
+        if not search_term:
+            return queryset, False
+        return filter_text(queryset, 'posts_post_fts', search_term), False
 
 
 @admin.register(Group)
@@ -28,27 +41,53 @@ class GroupAdmin(BaseAdmin):
 
     list_display: перечисляем поля, которые должны отображаться.
     list_editable: опция для измнения поля заголовка в любом посте.
-    search_fields: интерфейс для поиска группы по уникальному номеру.
-    list_filter: фильтрация по заголовку.
+    search_fields: поиск группы по точному адресу (slug).
     empty_value_display: вывод в поле текста '-пусто',
     если информация отсутствует.
     """
 
-    list_display = ('pk', 'title')
+    list_display = ('pk', 'title', 'slug', 'posts_count')
     list_editable = ('title',)
-    list_filter = ('title',)
-    search_fields = ('pk',)
+    search_fields = ('slug',)
 
 
 @admin.register(Comment)
 class CommentAdmin(BaseAdmin):
-    list_display = ('post', 'author', 'text', 'pub_date')
-    list_filter = ('text', 'pub_date')
-    search_fields = ('post', 'author', 'text')
+    """
+    Настройки отображения модели 'Комментарии' в интерфейсе админки.
+
+    list_select_related: посты и авторы загружаются тем же запросом.
+    raw_id_fields: пост и автор выбираются по id.
+    search_fields: поиск по полнотекстовому индексу FTS5.
+    list_filter: фильтрация по дате вместо фильтра по тексту.
+    date_hierarchy: переход по датам публикации.
+    """
+
+    list_display = ('pk', 'post', 'author', 'text', 'pub_date')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post', 'author')
+    search_fields = ('text',)
+    list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту идёт через полнотекстовый индекс."""
+        if not search_term:
+            return queryset, False
+        return filter_text(queryset, 'posts_comment_fts', search_term), False
 
 
 @admin.register(Follow)
 class FollowAdmin(BaseAdmin):
-    list_display = ('user', 'author')
-    list_filter = ('user', 'author')
-    search_fields = ('user', 'author')
+    """
+    Настройки отображения модели 'Подписки' в интерфейсе админки.
+
+    list_select_related: пользователи загружаются тем же запросом.
+    raw_id_fields: пользователи выбираются по id.
+    search_fields: поиск по точному имени подписчика или автора.
+    """
+
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
@@ -6,3 +6,7 @@ class PostsConfig(AppConfig):
 
     name = 'posts'
     verbose_name = 'посты'
+
+    def ready(self) -> None:
+        """Подключаем обработчики сигналов моделей posts."""
+        from posts import signals  # noqa: F401
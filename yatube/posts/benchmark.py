@@ -0,0 +1,426 @@
+"""Нагрузочный стенд для страниц приложения posts.
+
+seed() заполняет базу реалистичным набором данных: популярность
+авторов и постов распределена по степенному закону, так что у
+немногих авторов тысячи подписчиков, а у большинства единицы.
+run() прогоняет страницы через тестовый клиент Django или через
+запущенный сервер и считает перцентили задержки, число SQL-запросов
+и пропускную способность. Результаты сохраняются в JSON и
+сравниваются с предыдущим прогоном через compare().
+
+Прогон от одного пользователя быстро исчерпал бы RATE_LIMITS,
+и замерялся бы ответ 429. Через тестовый клиент пределы снимаются
+на время прогона, сервер для --url запускают с RATE_LIMITS_DISABLED=1;
+ответы 429 считаются в отчёте отдельно (throttled).
+"""
+import bisect
+import contextlib
+import itertools
+import platform
+import random
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import requests
+from core.metrics import percentile
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from posts import counters, feed
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+PASSWORD = 'benchmark'
+VIEWS = (
+    'index',
+    'group_list',
+    'profile',
+    'post_detail',
+    'follow_index',
+    'post_create',
+)
+
+
+class PowerLaw:
+    """Выбор индекса из range(size) с весом 1 / (ранг + 1) ** exponent.
+
+    Ранги перемешаны, поэтому самые популярные объекты
+    не совпадают с первыми созданными.
+    """
+
+    def __init__(
+        self, size: int, exponent: float, rng: random.Random,
+    ) -> None:
+        self.rng = rng
+        self.order = list(range(size))
+        rng.shuffle(self.order)
+        self.cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** exponent for rank in range(size)
+        ))
+
+    def choice(self) -> int:
+        point = self.rng.random() * self.cum_weights[-1]
+        rank = bisect.bisect(self.cum_weights, point)
+        return self.order[min(rank, len(self.order) - 1)]
+
+
+def _batches(items: typing.Iterable, size: int) -> typing.Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(model, objects: typing.Iterable, batch_size: int, log) -> int:
+    """Вставляет объекты пачками, каждая пачка в своей транзакции."""
+    total = 0
+    for batch in _batches(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+        log(f'{model.__name__}: {total}')
+    return total
+
+
+def seed(
+    users: int,
+    posts: int,
+    comments: int,
+    follows_per_user: int,
+    groups: int,
+    seed: int = 0,
+    batch_size: int = 5000,
+    log: typing.Callable[[str], None] = lambda message: None,
+) -> None:
+    """Заполняет базу данными для нагрузочного прогона.
+
+    follows_per_user - среднее число подписок, само число подписок
+    пользователя распределено по Парето. Все пользователи получают
+    пароль PASSWORD. Записи вставляются через bulk_create без
+    сигналов, поэтому счётчики и ленты пересобираются в конце,
+    а поисковый индекс обновляют триггеры.
+    """
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    password = make_password(PASSWORD)
+    _insert(
+        User,
+        (
+            User(
+                username=f'bench_{number}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                password=password,
+            )
+            for number in range(users)
+        ),
+        batch_size,
+        log,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith='bench_').order_by(
+            'pk',
+        ).values_list('pk', flat=True),
+    )
+    _insert(
+        Group,
+        (
+            Group(
+                title=fake.sentence(nb_words=3)[:200],
+                slug=f'bench-{number}',
+                description=fake.paragraph(),
+            )
+            for number in range(groups)
+        ),
+        batch_size,
+        log,
+    )
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    writers = PowerLaw(len(user_ids), 1.1, rng)
+    _insert(
+        Post,
+        (
+            Post(
+                text=fake.paragraph(nb_sentences=rng.randint(1, 8)),
+                author_id=user_ids[writers.choice()],
+                group_id=rng.choice(group_ids) if rng.random() < 0.7 else None,
+            )
+            for _ in range(posts)
+        ),
+        batch_size,
+        log,
+    )
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    commented = PowerLaw(len(post_ids), 1.0, rng)
+    _insert(
+        Comment,
+        (
+            Comment(
+                text=fake.sentence(),
+                post_id=post_ids[commented.choice()],
+                author_id=rng.choice(user_ids),
+            )
+            for _ in range(comments)
+        ),
+        batch_size,
+        log,
+    )
+    popular = PowerLaw(len(user_ids), 1.2, rng)
+    _insert(
+        Follow,
+        (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in {
+                user_ids[popular.choice()]
+                for _ in range(
+                    int(rng.paretovariate(2) * follows_per_user / 2),
+                )
+            } - {user_id}
+        ),
+        batch_size,
+        log,
+    )
+    log('Пересчёт счётчиков')
+    counters.recount_groups()
+    counters.recount_posts()
+    counters.recount_users()
+    log('Сборка лент подписок')
+    feed.rebuild()
+
+
+def dataset() -> typing.Dict[str, int]:
+    """Размер набора данных, на котором идёт прогон."""
+    return {
+        'users': User.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+        'groups': Group.objects.count(),
+    }
+
+
+class Targets:
+    """Случайные адреса страниц для прогона."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.reader = UserCounters.objects.filter(
+            following_count__gt=0,
+        ).order_by('-following_count').values_list(
+            'user__username', flat=True,
+        ).first()
+        if self.reader is None:
+            raise ValueError('В базе нет подписок, сначала seed_benchmark')
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.authors = list(
+            UserCounters.objects.order_by('-followers_count').values_list(
+                'user__username', flat=True,
+            )[:1000],
+        )
+        bounds = Post.objects.order_by('pk').values_list('pk', flat=True)
+        self.first_post = bounds.first()
+        self.last_post = bounds.last()
+
+    def request(self, view: str) -> typing.Tuple[str, str, dict]:
+        """Метод, адрес и данные формы очередного запроса к view."""
+        if view == 'post_create':
+            return 'post', reverse('posts:post_create'), {
+                'text': f'Нагрузочный пост {time.time()}',
+            }
+        kwargs = {}
+        query = {}
+        if view == 'index':
+            query = {'page': self.rng.randint(1, 5)}
+        elif view == 'group_list':
+            kwargs = {'slug': self.rng.choice(self.slugs)}
+        elif view == 'profile':
+            kwargs = {'username': self.rng.choice(self.authors)}
+        elif view == 'post_detail':
+            kwargs = {
+                'pk': self.rng.randint(self.first_post, self.last_post),
+            }
+        return 'get', reverse(f'posts:{view}', kwargs=kwargs), query
+
+
+class QueryCounter:
+    """execute_wrapper, считающий SQL-запросы тестового клиента."""
+
+    def __init__(self) -> None:
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class ClientDriver:
+    """Запросы через django.test.Client в текущем процессе."""
+
+    def __init__(self, username: str) -> None:
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=username))
+
+    def __call__(
+        self, method: str, url: str, data: dict,
+    ) -> typing.Tuple[int, typing.Optional[int]]:
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = getattr(self.client, method)(url, data)
+        return response.status_code, counter.queries
+
+
+class HttpDriver:
+    """Запросы к запущенному серверу, по сессии на поток.
+
+    Число запросов к БД берётся из заголовка X-Query-Count,
+    который сервер отдаёт при DEBUG.
+    """
+
+    def __init__(self, base_url: str, username: str) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.local = threading.local()
+
+    def session(self) -> requests.Session:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            url = self.base_url + reverse('users:login')
+            session.get(url)
+            session.post(url, {
+                'username': self.username,
+                'password': PASSWORD,
+                'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+            })
+        return session
+
+    def __call__(
+        self, method: str, url: str, data: dict,
+    ) -> typing.Tuple[int, typing.Optional[int]]:
+        session = self.session()
+        if method == 'post':
+            data = dict(
+                data, csrfmiddlewaretoken=session.cookies.get('csrftoken'),
+            )
+            response = session.post(
+                self.base_url + url, data, allow_redirects=False,
+            )
+        else:
+            response = session.get(self.base_url + url, params=data)
+        queries = response.headers.get('X-Query-Count')
+        return response.status_code, queries and int(queries)
+
+
+def _measure(driver, request: tuple) -> typing.Tuple[float, int, int]:
+    started = time.perf_counter()
+    status, queries = driver(*request)
+    return (time.perf_counter() - started) * 1000, status, queries
+
+
+def _summary(samples: list, elapsed: float) -> typing.Dict[str, float]:
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(sample[1] >= 400 for sample in samples),
+        'throttled': sum(sample[1] == 429 for sample in samples),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_mean': queries and round(sum(queries) / len(queries), 2),
+        'queries_max': queries and max(queries),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+    }
+
+
+def run(
+    views: typing.Sequence[str] = VIEWS,
+    per_view: int = 200,
+    warmup: int = 20,
+    url: typing.Optional[str] = None,
+    concurrency: int = 1,
+    seed: int = 0,
+) -> dict:
+    """Прогоняет страницы и возвращает отчёт для сохранения в JSON."""
+    targets = Targets(random.Random(seed))
+    if url:
+        driver = HttpDriver(url, targets.reader)
+        limits = contextlib.nullcontext()
+    else:
+        driver, concurrency = ClientDriver(targets.reader), 1
+        limits = override_settings(RATE_LIMITS={})
+    report = {
+        'meta': {
+            'started': timezone.now().isoformat(),
+            'target': url or 'client',
+            'requests': per_view,
+            'concurrency': concurrency,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset(),
+        },
+        'views': {},
+    }
+    with limits:
+        for view in views:
+            report['views'][view] = _run_view(
+                driver, targets, view, per_view, warmup, concurrency,
+            )
+    return report
+
+
+def _run_view(
+    driver,
+    targets: Targets,
+    view: str,
+    per_view: int,
+    warmup: int,
+    concurrency: int,
+) -> typing.Dict[str, float]:
+    for _ in range(warmup):
+        driver(*targets.request(view))
+    batch = [targets.request(view) for _ in range(per_view)]
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(
+                lambda request: _measure(driver, request), batch,
+            ))
+    else:
+        samples = [_measure(driver, request) for request in batch]
+    return _summary(samples, time.perf_counter() - started)
+
+
+def compare(
+    report: dict, baseline: dict, tolerance: float,
+) -> typing.List[str]:
+    """Ищет ухудшения относительно прошлого прогона.
+
+    Ухудшением считается рост p95 больше чем на tolerance
+    и любой рост максимального числа SQL-запросов.
+    """
+    regressions = []
+    for view, current in report['views'].items():
+        previous = baseline.get('views', {}).get(view)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{view}: p95 {previous["p95_ms"]} -> {current["p95_ms"]} мс',
+            )
+        if (current['queries_max'] or 0) > (previous['queries_max'] or 0):
+            regressions.append(
+                f'{view}: запросов {previous["queries_max"]} -> '
+                f'{current["queries_max"]}',
+            )
+    return regressions
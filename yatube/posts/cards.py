@@ -0,0 +1,49 @@
+"""Кеш отрисованных карточек постов для всех лент.
+
+Ключ карточки содержит id поста и отпечаток всего, что в ней
+показано: даты изменения поста, миниатюр и имени автора. Изменение
+любого из них даёт новый ключ, поэтому карточки не нужно сбрасывать,
+а старые версии просто истекают. Главная, группа, профиль, подписки
+и поиск показывают одни и те же карточки и берут их из одного кеша.
+"""
+import hashlib
+import typing
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from posts.models import Post
+
+CARD_KEY = 'card:{}:{}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post: Post) -> str:
+    """Ключ карточки с отпечатком показанных в ней данных."""
+    stamp = '|'.join((
+        post.updated.isoformat() if post.updated else '',
+        post.thumbnails,
+        post.author.username,
+        post.author.get_full_name(),
+    ))
+    return CARD_KEY.format(
+        post.pk, hashlib.md5(stamp.encode()).hexdigest(),
+    )
+
+
+def render_cards(posts: typing.Iterable[Post]) -> typing.Dict[str, str]:
+    """Карточки постов по ключам, одним get_many для всей страницы.
+
+    Отрисовываются и кладутся в кеш только отсутствующие карточки.
+    """
+    keyed = {card_key(post): post for post in posts}
+    cards = cache.get_many(keyed)
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, {'post': post})
+        for key, post in keyed.items()
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return cards
@@ -0,0 +1,108 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Обработчики сигналов меняют счётчики атомарными UPDATE с F(),
+а функции recount_* пересчитывают их целиком одним запросом
+на таблицу и исправляют накопившиеся расхождения.
+"""
+import typing
+
+from django.db import connections, router, transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def _update(queryset, **deltas: int) -> int:
+    """UPDATE счётчиков, который не уводит их ниже нуля."""
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+
+
+def change(
+    model: typing.Type,
+    pk: typing.Optional[int],
+    **deltas: int,
+) -> None:
+    """Сдвигает счётчики записи модели на указанные величины."""
+    if pk is None:
+        return
+    _update(model.objects.filter(pk=pk), **deltas)
+
+
+def change_user(user_id: int, **deltas: int) -> None:
+    """Сдвигает счётчики пользователя.
+
+    Если счётчиков ещё нет, при увеличении они создаются пересчётом.
+    """
+    with transaction.atomic():
+        updated = _update(
+            UserCounters.objects.filter(user_id=user_id), **deltas,
+        )
+        if not updated and all(delta > 0 for delta in deltas.values()):
+            recount_users(User.objects.filter(pk=user_id))
+
+
+def _count(queryset, field: str) -> Coalesce:
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field,
+            ).annotate(total=Count('pk')).values('total'),
+        ),
+        0,
+    )
+
+
+def recount_groups() -> int:
+    """Пересчитывает количество постов во всех группах."""
+    return Group.objects.update(posts_count=_count(Post.objects, 'group'))
+
+
+def recount_posts() -> int:
+    """Пересчитывает количество комментариев у всех постов."""
+    return Post.objects.update(
+        comments_count=_count(Comment.objects, 'post'),
+    )
+
+
+def _create_missing(users) -> None:
+    """Создаёт нулевые счётчики одним INSERT ... SELECT.
+
+    Строки не проходят через память процесса, поэтому загрузка
+    миллионов пользователей не растит потребление памяти.
+    """
+    zero = Value(0, output_field=IntegerField())
+    rows = users.order_by().filter(counters__isnull=True).annotate(
+        zero_posts=zero, zero_followers=zero, zero_following=zero,
+    ).values_list('pk', 'zero_posts', 'zero_followers', 'zero_following')
+    sql, params = rows.query.sql_with_params()
+    columns = ', '.join(
+        UserCounters._meta.get_field(name).column
+        for name in (
+            'user', 'posts_count', 'followers_count', 'following_count',
+        )
+    )
+    connection = connections[router.db_for_write(UserCounters)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{UserCounters._meta.db_table} ({columns}) {sql} '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}',
+            params,
+        )
+
+
+def recount_users(users: typing.Optional[typing.Any] = None) -> int:
+    """Создаёт недостающие счётчики пользователей и пересчитывает их."""
+    users = User.objects.all() if users is None else users
+    _create_missing(users)
+    return UserCounters.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
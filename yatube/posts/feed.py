@@ -0,0 +1,238 @@
+"""Материализованная лента подписок.
+
+Записи FeedEntry раскладываются по подписчикам в момент публикации
+поста (fan-out-on-write), поэтому страница подписок читает один
+диапазон индекса (user, -pub_date) вместо соединения Follow и Post.
+
+Посты авторов, у которых подписчиков не меньше FEED_FANOUT_LIMIT,
+не раскладываются: их подмешиваем в ленту при чтении (fan-out-on-read),
+иначе одна публикация порождала бы огромное число записей. Такие
+посты читаются отдельным запросом по индексу автора и сливаются
+с лентой в Python (MergedFeed). Когда автор переходит порог,
+его записи удаляются из лент или раскладываются заново
+(followers_changed).
+"""
+import heapq
+import itertools
+import typing
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from posts.models import FeedEntry, Follow, Post, User, UserCounters
+
+
+def is_celebrity(author_id: int) -> bool:
+    """Проверяет, читается ли лента автора при запросе."""
+    return UserCounters.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def celebrity_ids(user: User) -> typing.List[int]:
+    """Возвращает авторов из подписок, чьи посты не раскладываются."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__counters__followers_count__gte=settings.FEED_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True),
+    )
+
+
+def fan_out_post(post: Post) -> None:
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in Follow.objects.filter(
+                author_id=post.author_id,
+            ).values_list('user_id', flat=True).iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def followers_changed(author_id: int, delta: int) -> None:
+    """Переводит автора через порог FEED_FANOUT_LIMIT.
+
+    Ставший популярным автор пропадает из материализованных лент,
+    его посты читаются при запросе. Опустившийся ниже порога
+    раскладывается всем подписчикам, в том числе подписавшимся,
+    пока записи для него не создавались.
+    """
+    count = UserCounters.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True,
+    ).first() or 0
+    limit = settings.FEED_FANOUT_LIMIT
+    if count - delta < limit <= count:
+        FeedEntry.objects.filter(author_id=author_id).delete()
+    elif count < limit <= count - delta:
+        backfill_author(author_id)
+
+
+def backfill_author(author_id: int) -> None:
+    """Раскладывает все посты автора по лентам его подписчиков."""
+    rows = Post.objects.order_by().filter(
+        author_id=author_id, author__following__user__isnull=False,
+    ).values_list('author__following__user_id', 'pk', 'author_id', 'pub_date')
+    with transaction.atomic():
+        FeedEntry.objects.filter(author_id=author_id).delete()
+        _insert_entries(rows)
+
+
+def add_author(user_id: int, author_id: int) -> None:
+    """Добавляет в ленту подписчика все посты автора."""
+    if is_celebrity(author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in Post.objects.filter(
+                author_id=author_id,
+            ).values_list('pk', 'pub_date').iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id: int, author_id: int) -> None:
+    """Убирает из ленты подписчика посты автора после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class MergedFeed:
+    """Посты нескольких QuerySet, слитые в Python по одному порядку.
+
+    Каждая часть читается своим запросом по индексу и не дальше
+    нужного среза. Поддерживает то, что нужно пагинаторам и API:
+    filter, select_related, values, order_by, срезы, count и exists.
+    """
+
+    ordered = True
+
+    def __init__(
+        self,
+        parts: typing.Sequence[QuerySet],
+        ordering: typing.Sequence[str] = ('-pub_date', '-pk'),
+    ) -> None:
+        self.ordering = tuple(ordering)
+        self.parts = [part.order_by(*self.ordering) for part in parts]
+
+    def _map(self, method: str, *args, **kwargs) -> 'MergedFeed':
+        return MergedFeed(
+            [getattr(part, method)(*args, **kwargs) for part in self.parts],
+            self.ordering,
+        )
+
+    def filter(self, *args, **kwargs) -> 'MergedFeed':
+        return self._map('filter', *args, **kwargs)
+
+    def select_related(self, *fields: str) -> 'MergedFeed':
+        return self._map('select_related', *fields)
+
+    def values(self, *fields: str) -> 'MergedFeed':
+        return self._map('values', *fields)
+
+    def order_by(self, *fields: str) -> 'MergedFeed':
+        return MergedFeed(self.parts, fields)
+
+    def count(self) -> int:
+        return sum(part.count() for part in self.parts)
+
+    def exists(self) -> bool:
+        return any(part.exists() for part in self.parts)
+
+    def _key(self, item) -> tuple:
+        return tuple(
+            item[name] if isinstance(item, dict) else getattr(item, name)
+            for name in (field.lstrip('-') for field in self.ordering)
+        )
+
+    def _merged(self, stop: typing.Optional[int]) -> typing.Iterator:
+        """Записи частей по порядку, без повторов, не больше stop."""
+        previous = None
+        for item in heapq.merge(
+            *(part[:stop] if stop is not None else part
+              for part in self.parts),
+            key=self._key,
+            reverse=self.ordering[0].startswith('-'),
+        ):
+            key = self._key(item)
+            if key != previous:
+                previous = key
+                yield item
+
+    def __iter__(self) -> typing.Iterator:
+        return self._merged(None)
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        if index.step or index.stop is None or (index.start or 0) < 0:
+            return list(self)[index]
+        return list(
+            itertools.islice(self._merged(index.stop), index.start, None),
+        )
+
+
+def feed_for(user: User) -> typing.Union[QuerySet, MergedFeed]:
+    """Возвращает посты ленты подписок пользователя."""
+    entries = Post.objects.filter(feed_entries__user=user)
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        return entries
+    return MergedFeed(
+        [entries, Post.objects.filter(author_id__in=celebrities)],
+    )
+
+
+def _insert_entries(rows: QuerySet) -> None:
+    """INSERT ... SELECT записей ленты из values_list(user, post, ...)."""
+    sql, params = rows.query.sql_with_params()
+    columns = ', '.join(
+        FeedEntry._meta.get_field(name).column
+        for name in ('user', 'post', 'author', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} ({columns}) {sql}',
+            params,
+        )
+
+
+def rebuild(users: typing.Optional[QuerySet] = None) -> int:
+    """Пересобирает ленты пользователей по текущим подпискам.
+
+    Записи вставляются одним INSERT ... SELECT из соединения
+    подписок и постов, без обхода подписок в Python. Счётчики
+    подписчиков должны быть актуальны: по ним отсекаются посты
+    авторов с FEED_FANOUT_LIMIT подписчиков и больше.
+    Возвращает количество обработанных подписок.
+    """
+    follows = Follow.objects.all()
+    entries = FeedEntry.objects.all()
+    lookups = {'author__following__user__isnull': False}
+    if users is not None:
+        follows = follows.filter(user__in=users)
+        entries = entries.filter(user__in=users)
+        lookups['author__following__user__in'] = users
+    rows = Post.objects.order_by().filter(**lookups).exclude(
+        author__counters__followers_count__gte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('author__following__user_id', 'pk', 'author_id', 'pub_date')
+    with transaction.atomic():
+        entries.delete()
+        _insert_entries(rows)
+    return follows.count()
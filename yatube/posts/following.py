@@ -0,0 +1,93 @@
+"""Подписан ли зритель на авторов страницы: не больше запроса на страницу.
+
+FollowState живёт один запрос (см. for_request). Тег
+{% prefetch_follow_state %} заранее сообщает ему авторов страницы,
+и первая же проверка отвечает сразу за всех.
+
+Если пользователь подписан не больше чем на FOLLOW_STATE_CACHE_LIMIT
+авторов, весь набор его подписок кешируется по поколению области
+'follow:<user_id>', которое меняют сигналы подписки, и проверки
+обходятся без базы. Иначе подписки на авторов страницы читаются
+одним запросом с IN.
+"""
+import typing
+
+from core.cache import generation, page_timeout
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+from posts.models import Follow
+
+FOLLOWING_KEY = 'following:{}:{}'
+# подписок слишком много, чтобы держать их в кеше
+TOO_MANY = 'too-many'
+
+
+class FollowState:
+    """Подписки пользователя на авторов в пределах одного запроса."""
+
+    def __init__(self, user) -> None:
+        self.user_id = user.pk if user.is_authenticated else None
+        self.following: typing.Optional[typing.FrozenSet[int]] = None
+        self.too_many = False
+        self.known: typing.Dict[int, bool] = {}
+        self.pending: typing.Set[int] = set()
+
+    def want(self, author_ids: typing.Iterable[int]) -> None:
+        """Запоминает авторов, о которых скоро спросят."""
+        if self.user_id is not None:
+            self.pending.update(author_ids)
+
+    def follows(self, author_id: int) -> bool:
+        """Подписан ли пользователь на автора."""
+        if self.user_id is None or author_id == self.user_id:
+            return False
+        if self.following is None and author_id not in self.known:
+            self.pending.add(author_id)
+            self._resolve()
+        if self.following is not None:
+            return author_id in self.following
+        return self.known[author_id]
+
+    def _resolve(self) -> None:
+        if not self.too_many:
+            self.following = self._all_following()
+            self.too_many = self.following is None
+        if self.too_many:
+            wanted = self.pending - self.known.keys()
+            found = set(
+                Follow.objects.filter(
+                    user_id=self.user_id, author_id__in=wanted,
+                ).values_list('author_id', flat=True),
+            )
+            self.known.update(
+                {author_id: author_id in found for author_id in wanted},
+            )
+        self.pending.clear()
+
+    def _all_following(self) -> typing.Optional[typing.FrozenSet[int]]:
+        """Все подписки из кеша или базы, None - если их слишком много."""
+        key = FOLLOWING_KEY.format(
+            self.user_id, generation(f'follow:{self.user_id}')[0],
+        )
+        following = cache.get(key)
+        if following is None:
+            limit = settings.FOLLOW_STATE_CACHE_LIMIT
+            authors = list(
+                Follow.objects.filter(user_id=self.user_id).values_list(
+                    'author_id', flat=True,
+                )[:limit + 1],
+            )
+            following = (
+                frozenset(authors) if len(authors) <= limit else TOO_MANY
+            )
+            cache.set(key, following, page_timeout())
+        return None if following == TOO_MANY else following
+
+
+def for_request(request: HttpRequest) -> FollowState:
+    """FollowState текущего запроса."""
+    state = getattr(request, 'follow_state', None)
+    if state is None:
+        state = request.follow_state = FollowState(request.user)
+    return state
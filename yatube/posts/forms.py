@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from posts.models import Comment, Post
 
 
@@ -18,6 +20,16 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка поста',
         }
 
+    def clean_image(self):
+        """Отсекает слишком большие файлы до обработки картинки."""
+        image = self.cleaned_data['image']
+        if image and image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                'Картинка больше '
+                f'{filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)}',
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,299 @@
+"""Граф подписок в памяти процесса и рекомендации «кого читать».
+
+Подписки хранятся в виде CSR (compressed sparse row): для каждого
+пользователя в массиве offsets лежит начало его строки, а в targets
+подряд отсортированные id авторов. Зеркальные массивы хранят
+подписчиков автора. На миллион подписок это 16 Мб массивов array
+вместо сотен мегабайт множеств и кортежей, а проверка подписки -
+двоичный поиск внутри строки.
+
+Граф читается из Follow одним запросом к основной базе при первом
+обращении и затем раз в FOLLOW_GRAPH_REFRESH_SECONDS. Перечитывает
+один запрос и без общей блокировки: остальные тем временем получают
+старый граф, а подписки и отписки, сделанные во время чтения,
+записываются в журнал и накатываются на новый граф перед подменой.
+Подписки и отписки в этом процессе обработчики сигналов сразу
+дописывают в дельты поверх массивов, а когда дельт становится много,
+массивы пересобираются без обращения к базе. Подписки, сделанные
+в других процессах, появляются в графе после перечитывания.
+"""
+import bisect
+import collections
+import heapq
+import threading
+import time
+import typing
+from array import array
+
+from django.conf import settings
+from posts.models import Follow, User
+
+Edge = typing.Tuple[int, int]
+
+
+def _csr(
+    rows: array, columns: array, size: int,
+) -> typing.Tuple[array, array]:
+    """Строит CSR по рёбрам, отсортированным по (row, column).
+
+    Подсчётом вместо сортировки, поэтому рёбра, отсортированные
+    только по column, дают строки, отсортированные по row.
+    """
+    offsets = array('l', [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for index in range(size):
+        offsets[index + 1] += offsets[index]
+    targets = array('l', [0]) * len(rows)
+    position = offsets[:-1]
+    for row, column in zip(rows, columns):
+        targets[position[row]] = column
+        position[row] += 1
+    return offsets, targets
+
+
+class FollowGraph:
+    """Подписки (user -> author) и обратные рёбра в CSR с дельтами."""
+
+    def __init__(self, users: array, authors: array) -> None:
+        """users и authors - рёбра, отсортированные по (user, author)."""
+        self.lock = threading.RLock()
+        self.loaded = time.time()
+        self._build(users, authors)
+
+    def _build(self, users: array, authors: array) -> None:
+        self.size = max(max(users, default=0), max(authors, default=0)) + 1
+        self.edges = len(users)
+        self.out_offsets, self.out_targets = _csr(users, authors, self.size)
+        self.in_offsets, self.in_sources = _csr(authors, users, self.size)
+        self.added: typing.Set[Edge] = set()
+        self.added_out: typing.Dict[int, typing.Set[int]] = {}
+        self.added_in: typing.Dict[int, typing.Set[int]] = {}
+        self.removed: typing.Set[Edge] = set()
+
+    @classmethod
+    def load(cls) -> 'FollowGraph':
+        """Читает все подписки одним запросом к основной базе.
+
+        Реплика может отставать, а дельты поверх старого графа
+        после подмены теряются.
+        """
+        users, authors = array('l'), array('l')
+        edges = Follow.objects.using('default').order_by(
+            'user_id', 'author_id',
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in edges.iterator():
+            users.append(user_id)
+            authors.append(author_id)
+        return cls(users, authors)
+
+    @staticmethod
+    def _row(offsets: array, targets: array, node: int) -> array:
+        if node + 1 >= len(offsets):
+            return array('l')
+        return targets[offsets[node]:offsets[node + 1]]
+
+    def _stored(self, user_id: int, author_id: int) -> bool:
+        if user_id + 1 >= len(self.out_offsets):
+            return False
+        low, high = self.out_offsets[user_id], self.out_offsets[user_id + 1]
+        index = bisect.bisect_left(self.out_targets, author_id, low, high)
+        return index < high and self.out_targets[index] == author_id
+
+    def follows(self, user_id: int, author_id: int) -> bool:
+        """Подписан ли user_id на author_id."""
+        edge = (user_id, author_id)
+        with self.lock:
+            if edge in self.added:
+                return True
+            return edge not in self.removed and self._stored(*edge)
+
+    def mutual(self, first_id: int, second_id: int) -> bool:
+        """Подписаны ли пользователи друг на друга."""
+        return (
+            self.follows(first_id, second_id)
+            and self.follows(second_id, first_id)
+        )
+
+    def following(self, user_id: int) -> typing.List[int]:
+        """Авторы, на которых подписан пользователь."""
+        with self.lock:
+            row = self._row(self.out_offsets, self.out_targets, user_id)
+            stored = [
+                author_id for author_id in row
+                if (user_id, author_id) not in self.removed
+            ] if self.removed else list(row)
+            return stored + sorted(self.added_out.get(user_id, ()))
+
+    def followers(self, author_id: int) -> typing.List[int]:
+        """Подписчики автора."""
+        with self.lock:
+            row = self._row(self.in_offsets, self.in_sources, author_id)
+            stored = [
+                user_id for user_id in row
+                if (user_id, author_id) not in self.removed
+            ] if self.removed else list(row)
+            return stored + sorted(self.added_in.get(author_id, ()))
+
+    def add(self, user_id: int, author_id: int) -> None:
+        """Подписка, сделанная после загрузки графа."""
+        edge = (user_id, author_id)
+        with self.lock:
+            if edge in self.removed:
+                self.removed.discard(edge)
+            elif not self._stored(*edge) and edge not in self.added:
+                self.added.add(edge)
+                self.added_out.setdefault(user_id, set()).add(author_id)
+                self.added_in.setdefault(author_id, set()).add(user_id)
+            self._compact_if_needed()
+
+    def remove(self, user_id: int, author_id: int) -> None:
+        """Отписка, сделанная после загрузки графа."""
+        edge = (user_id, author_id)
+        with self.lock:
+            if edge in self.added:
+                self.added.discard(edge)
+                self.added_out[user_id].discard(author_id)
+                self.added_in[author_id].discard(user_id)
+            elif self._stored(*edge):
+                self.removed.add(edge)
+            self._compact_if_needed()
+
+    def _compact_if_needed(self) -> None:
+        """Вливает дельты в массивы, когда их накопилось много."""
+        deltas = len(self.added) + len(self.removed)
+        if deltas <= max(settings.FOLLOW_GRAPH_MAX_DELTA, self.edges // 8):
+            return
+        size = max(
+            self.size,
+            max((user_id + 1 for user_id, _ in self.added), default=0),
+        )
+        users, authors = array('l'), array('l')
+        for user_id in range(size):
+            for author_id in sorted(self.following(user_id)):
+                users.append(user_id)
+                authors.append(author_id)
+        self._build(users, authors)
+
+    def recommend(
+        self, user_id: int, limit: int,
+    ) -> typing.List[typing.Tuple[int, int]]:
+        """Друзья друзей: (автор, число общих подписок) по убыванию.
+
+        Каждый подписчик пользователя получает ещё одну связь:
+        подписаться в ответ - частая рекомендация.
+        Обходится не больше FOLLOW_GRAPH_FANOUT подписок
+        на каждом шаге, так что ответ не зависит от размера графа.
+        """
+        fanout = settings.FOLLOW_GRAPH_FANOUT
+        friends = self.following(user_id)
+        following = set(friends)
+        counts: typing.Counter[int] = collections.Counter()
+        for friend_id in friends[:fanout]:
+            counts.update(self.following(friend_id)[:fanout])
+        counts.update(self.followers(user_id)[:fanout])
+        counts.pop(user_id, None)
+        for author_id in following:
+            counts.pop(author_id, None)
+        return heapq.nsmallest(
+            limit, counts.items(), key=lambda item: (-item[1], item[0]),
+        )
+
+    def similar(
+        self, author_id: int, limit: int,
+    ) -> typing.List[typing.Tuple[int, int]]:
+        """Авторы, которых читают подписчики автора: (автор, читателей)."""
+        fanout = settings.FOLLOW_GRAPH_FANOUT
+        counts: typing.Counter[int] = collections.Counter()
+        for follower_id in self.followers(author_id)[:fanout]:
+            counts.update(self.following(follower_id)[:fanout])
+        counts.pop(author_id, None)
+        return heapq.nsmallest(
+            limit, counts.items(), key=lambda item: (-item[1], item[0]),
+        )
+
+
+_graph: typing.Optional[FollowGraph] = None
+# Подписки и отписки во время перечитывания: (подписка, user, author).
+# None - граф сейчас никто не перечитывает.
+_journal: typing.Optional[typing.List[typing.Tuple[bool, int, int]]] = None
+_lock = threading.Lock()
+_loading = threading.Lock()
+
+
+def _stale(current: typing.Optional[FollowGraph]) -> bool:
+    return (
+        current is None
+        or time.time() - current.loaded
+        >= settings.FOLLOW_GRAPH_REFRESH_SECONDS
+    )
+
+
+def graph() -> FollowGraph:
+    """Граф процесса, перечитывается раз в FOLLOW_GRAPH_REFRESH_SECONDS.
+
+    Пока граф перечитывается, остальные запросы получают старый;
+    ждут загрузки только запросы, пришедшие до первой.
+    """
+    global _graph, _journal
+    with _lock:
+        current = _graph
+        if not _stale(current) or (
+            current is not None and _journal is not None
+        ):
+            return current
+    with _loading:
+        with _lock:
+            if not _stale(_graph):
+                return _graph
+            _journal = []
+        try:
+            loaded = FollowGraph.load()
+            with _lock:
+                for following, user_id, author_id in _journal:
+                    if following:
+                        loaded.add(user_id, author_id)
+                    else:
+                        loaded.remove(user_id, author_id)
+                _graph = loaded
+        finally:
+            with _lock:
+                _journal = None
+        return loaded
+
+
+def followed(user_id: int, author_id: int) -> None:
+    """Добавляет подписку в уже загруженный граф."""
+    with _lock:
+        if _journal is not None:
+            _journal.append((True, user_id, author_id))
+        if _graph is not None:
+            _graph.add(user_id, author_id)
+
+
+def unfollowed(user_id: int, author_id: int) -> None:
+    """Убирает подписку из уже загруженного графа."""
+    with _lock:
+        if _journal is not None:
+            _journal.append((False, user_id, author_id))
+        if _graph is not None:
+            _graph.remove(user_id, author_id)
+
+
+def reset() -> None:
+    """Забывает граф, следующее обращение прочитает его заново."""
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def users(
+    pairs: typing.List[typing.Tuple[int, int]],
+) -> typing.List[typing.Tuple[User, int]]:
+    """Пользователи рекомендаций с числом общих связей, одним запросом."""
+    found = User.objects.in_bulk([user_id for user_id, _ in pairs])
+    return [
+        (found[user_id], common)
+        for user_id, common in pairs
+        if user_id in found
+    ]
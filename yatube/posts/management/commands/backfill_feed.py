@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from posts.feed import rebuild
+from posts.models import User
+
+
+class Command(BaseCommand):
+    """Пересборка материализованной ленты подписок.
+
+    Нужна после первичного развёртывания FeedEntry и для
+    восстановления лент, например после изменения FEED_FANOUT_LIMIT.
+    """
+
+    help = 'Заполняет ленты подписок по текущим подпискам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='пересобрать ленты только этих пользователей',
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        processed = rebuild(users)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {processed}'),
+        )
@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    """Нагрузочный прогон страниц приложения posts.
+
+    Без --url запросы идут через тестовый клиент в текущем
+    процессе, с --url - к запущенному серверу. Отчёт пишется
+    в JSON, а с --baseline сравнивается с прошлым отчётом:
+    при ухудшении команда завершается с ошибкой, что роняет CI.
+    """
+
+    help = 'Замеряет задержку, SQL-запросы и пропускную способность'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=benchmark.VIEWS,
+            default=benchmark.VIEWS,
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--url', help='Адрес запущенного сервера')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для отчёта в JSON')
+        parser.add_argument('--baseline', help='Отчёт прошлого прогона')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый рост p95 относительно --baseline',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark.run(
+                views=options['views'],
+                per_view=options['requests'],
+                warmup=options['warmup'],
+                url=options['url'],
+                concurrency=options['concurrency'],
+                seed=options['seed'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text)
+        else:
+            self.stdout.write(text)
+        for view, stats in report['views'].items():
+            self.stderr.write(
+                f'{view}: p50 {stats["p50_ms"]} p95 {stats["p95_ms"]} '
+                f'p99 {stats["p99_ms"]} мс, запросов {stats["queries_max"]}, '
+                f'{stats["throughput_rps"]} rps',
+            )
+        if not options['baseline']:
+            return
+        with open(options['baseline'], encoding='utf-8') as baseline:
+            regressions = benchmark.compare(
+                report, json.load(baseline), options['tolerance'],
+            )
+        if regressions:
+            raise CommandError('Ухудшения: ' + '; '.join(regressions))
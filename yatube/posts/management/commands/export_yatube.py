@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from posts import transfer
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка пользователей, групп, постов и подписок.
+
+    Пишет JSONL в файл (.gz, .bz2 и .xz сжимаются) или в stdout,
+    таблицы читаются пачками и в память целиком не загружаются.
+    """
+
+    help = 'Выгружает данные yatube в JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки, '-' - stdout")
+        parser.add_argument(
+            '--types',
+            default=','.join(name for name, _, _ in transfer.TYPES),
+            help='Типы записей через запятую',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transfer.open_stream(options['path'], 'w') as stream:
+            exported = transfer.export(
+                stream,
+                options['types'].split(','),
+                options['chunk_size'],
+            )
+        if options['path'] != '-':
+            self.stdout.write(self.style.SUCCESS(f'Выгружено: {exported}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from posts import transfer
+
+
+class Command(BaseCommand):
+    """Потоковая загрузка выгрузки export_yatube.
+
+    Записи вставляются пачками через bulk_create, затем
+    пересчитываются счётчики, ленты подписок и поисковый индекс.
+    Миниатюры картинок строит команда warm_thumbnails.
+    """
+
+    help = 'Загружает данные yatube из JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки, '-' - stdin")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transfer.open_stream(options['path'], 'r') as stream:
+            loaded = transfer.load(
+                stream,
+                options['batch_size'],
+                log=self.stdout.write if options['verbosity'] > 1 else (
+                    lambda message: None
+                ),
+            )
+        self.stdout.write(self.style.SUCCESS(f'Загружено: {loaded}'))
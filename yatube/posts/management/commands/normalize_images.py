@@ -0,0 +1,26 @@
+from core import workers
+from django.core.management.base import BaseCommand
+from posts import uploads
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """Нормализация картинок, загруженных до posts.uploads.
+
+    Картинки без записанных размеров пережимаются в пуле процессов
+    WORKER_PROCESSES, после чего для них строятся миниатюры.
+    """
+
+    help = 'Уменьшает и пережимает картинки постов'
+
+    def handle(self, *args, **options):
+        scheduled = 0
+        for post_id, image_name in Post.objects.exclude(image='').filter(
+            image_bytes__isnull=True,
+        ).values_list('pk', 'image').iterator():
+            uploads.schedule(post_id, image_name)
+            scheduled += 1
+        workers.wait()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {scheduled}'),
+        )
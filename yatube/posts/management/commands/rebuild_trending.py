@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from posts import trending
+
+
+class Command(BaseCommand):
+    """Пересборка рейтинга популярных постов.
+
+    Рейтинг собирается заново по недавним комментариям,
+    накопленные просмотры при этом теряются.
+    """
+
+    help = 'Собирает рейтинг популярных постов по комментариям'
+
+    def handle(self, *args, **options):
+        count = trending.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Постов в рейтинге: {count}'),
+        )
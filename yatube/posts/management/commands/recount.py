@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from posts import counters
+
+
+class Command(BaseCommand):
+    """Пересчёт денормализованных счётчиков.
+
+    Исправляет расхождения счётчиков групп, постов и пользователей
+    с реальными данными, по одному UPDATE на таблицу.
+    """
+
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def handle(self, *args, **options):
+        groups = counters.recount_groups()
+        posts = counters.recount_posts()
+        users = counters.recount_users()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано групп: {groups}, постов: {posts}, '
+                f'пользователей: {users}',
+            ),
+        )
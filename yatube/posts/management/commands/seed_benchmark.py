@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    """Заполнение базы данными для нагрузочного прогона.
+
+    По умолчанию создаёт 100 тысяч пользователей, миллион постов
+    и пять миллионов комментариев. Для быстрого прогона в CI
+    размеры уменьшаются параметром --scale.
+    """
+
+    help = 'Заполняет базу реалистичными данными для benchmark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=5_000_000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Множитель для количества пользователей, постов, '
+                 'комментариев и групп',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        benchmark.seed(
+            users=max(2, int(options['users'] * scale)),
+            posts=max(1, int(options['posts'] * scale)),
+            comments=int(options['comments'] * scale),
+            follows_per_user=options['follows_per_user'],
+            groups=max(1, int(options['groups'] * scale)),
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbosity'] > 1 else (
+                lambda message: None
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано: {benchmark.dataset()}'),
+        )
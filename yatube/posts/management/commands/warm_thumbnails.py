@@ -0,0 +1,36 @@
+from core import workers
+from django.core.management.base import BaseCommand
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """Прогрев миниатюр уже загруженных картинок постов.
+
+    Задачи уходят в пул процессов WORKER_PROCESSES, команда
+    дожидается их завершения.
+    """
+
+    help = 'Строит миниатюры для картинок всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='перестроить и уже готовые миниатюры',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnails='')
+        scheduled = 0
+        for post_id, image_name in posts.values_list(
+            'pk', 'image',
+        ).iterator():
+            thumbnails.schedule(post_id, image_name)
+            scheduled += 1
+        workers.wait()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {scheduled}'),
+        )
@@ -0,0 +1,77 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field,
+            ).annotate(total=Count('pk')).values('total'),
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    Group.objects.update(posts_count=count(Post.objects, 'group'))
+    Post.objects.update(comments_count=count(Comment.objects, 'post'))
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.values_list(
+                'pk', flat=True,
+            ).iterator()
+        ),
+    )
+    UserCounters.objects.update(
+        posts_count=count(Post.objects, 'author'),
+        followers_count=count(Follow.objects, 'author'),
+        following_count=count(Follow.objects, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0023_auto_20261018_0144'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='количество постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='количество подписок')),
+            ],
+            options={
+                'verbose_name': 'счётчики пользователя',
+                'verbose_name_plural': 'счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
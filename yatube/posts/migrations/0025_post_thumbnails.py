@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_auto_20261018_0147'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='миниатюры'),
+        ),
+    ]
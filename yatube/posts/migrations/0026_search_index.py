@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# SQL записан здесь, а не взят из posts.search: миграция должна
+# создавать те индексы, какими они были на момент её написания.
+INDEXES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+    "text, content='{table}', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} "
+    "BEGIN INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} "
+    "BEGIN INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF text "
+    "ON {table} BEGIN INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO {index}({index}) VALUES ('rebuild')",
+)
+
+
+def create_index(apps, schema_editor):
+    """FTS5 есть только у SQLite."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for index, table in INDEXES:
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql.format(index=index, table=table))
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for index, _ in INDEXES:
+        for suffix in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'pub_date'], name='comment_post_pub_date_idx'),
+        ),
+    ]
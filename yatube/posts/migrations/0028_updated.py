@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_updated(apps, schema_editor):
+    """Дата изменения старых записей берётся из даты публикации."""
+    for name in ('Post', 'Comment'):
+        model = apps.get_model('posts', name)
+        model.objects.update(updated=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_comment_post_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
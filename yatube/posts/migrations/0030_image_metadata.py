@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0029_post_scope_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_bytes',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='размер картинки в байтах'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='ширина картинки'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0030_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trending',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='пост')),
+                ('rank', models.FloatField(db_index=True, verbose_name='ранг')),
+            ],
+            options={
+                'verbose_name': 'рейтинг поста',
+                'verbose_name_plural': 'рейтинг постов',
+                'ordering': ('-rank',),
+            },
+        ),
+    ]
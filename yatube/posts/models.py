@@ -1,10 +1,51 @@
+import json
+
 from core.models import TimestampedModel
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
+DERIVED_FIELDS = ('posts_count',)
+
+
+def protect_derived_fields(instance: models.Model, kwargs: dict) -> None:
+    """Исключает производные поля из UPDATE уже сохранённой записи.
+
+    Счётчики меняются только точечными UPDATE в обработчиках
+    сигналов, сохранение устаревшего значения из памяти затёрло бы их.
+    Посты и комментарии и так пишут только изменённые поля,
+    см. core.models.TimestampedModel.
+    """
+    if instance._state.adding or kwargs.get('update_fields') is not None:
+        return
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in DERIVED_FIELDS
+    ]
+
+
+class CountedModel(models.Model):
+    """Запись, сохранение которой сдвигает денормализованные счётчики.
+
+    Строка и UPDATE счётчиков в обработчиках post_save выполняются
+    в одной транзакции, и при ошибке не остаётся ни записи,
+    ни сдвига счётчиков. Сигналы post_delete и так отправляются
+    внутри транзакции удаления.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self,
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     """
@@ -13,11 +54,17 @@ class Group(models.Model):
     title: название группы.
     slug: уникальный адрес группы, часть URL.
     description: текст, описывающий сообщество.
+    posts_count: счётчик постов группы, ведётся сигналами.
     """
 
     title = models.CharField('название группы', max_length=200)
     slug = models.SlugField('уникальный адрес', unique=True)
     description = models.TextField('описание группы')
+    posts_count = models.PositiveIntegerField(
+        'количество постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         """Возвращает в консоль сокращенное название группы."""
@@ -27,14 +74,20 @@ class Group(models.Model):
             else self.title
         )
 
+    def save(self, *args, **kwargs):
+        """Не перезаписываем производные поля при сохранении модели."""
+        protect_derived_fields(self, kwargs)
+        return super().save(*args, **kwargs)
 
-class Post(TimestampedModel):
+
+class Post(TimestampedModel, CountedModel):
     """
     Модель для хранения статей.
 
     Наследует из TimestampedModel:
     text: текст.
-    pud_date: дата публикации статьи.
+    pud_date: дата публикации статьи, не меняется при редактировании.
+    updated: дата последнего изменения статьи.
     author: автор статьи, установлена связь с таблицей User,
     при удалении из таблицы User автора,
     также будут удалены все связанные статьи.
@@ -43,6 +96,10 @@ class Post(TimestampedModel):
     group: название сообщества, к которому относится статья,
     установлена связь с моделью Group, чтобы при добавлении
     новой записи можно было сослаться на данную модель.
+    image_width, image_height, image_bytes: размеры и вес картинки
+    после нормализации (posts.uploads).
+    comments_count: счётчик комментариев, ведётся сигналами.
+    thumbnails: JSON с адресами и размерами готовых миниатюр.
     """
 
     group = models.ForeignKey(
@@ -58,10 +115,46 @@ class Post(TimestampedModel):
         upload_to='posts/',
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'ширина картинки',
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'высота картинки',
+        null=True,
+        editable=False,
+    )
+    image_bytes = models.PositiveIntegerField(
+        'размер картинки в байтах',
+        null=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'количество комментариев',
+        default=0,
+        editable=False,
+    )
+    thumbnails = models.TextField(
+        'миниатюры',
+        blank=True,
+        default='',
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = (
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         """Возвращает в консоль сокращенный текст поста."""
@@ -71,14 +164,20 @@ class Post(TimestampedModel):
             else self.text
         )
 
+    @cached_property
+    def thumbs(self) -> dict:
+        """Готовые миниатюры картинки по именам геометрий."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
 
-class Comment(TimestampedModel):
+class Comment(TimestampedModel, CountedModel):
     """
     Модель для хранения комментариев.
 
     Наследует из TimestampedModel:
     text: текст.
     pud_date: дата добавления комментария.
+    updated: дата последнего изменения комментария.
     author: автор статьи, установлена связь с таблицей User,
     при удалении из таблицы User автора,
     также будут удалены все связанные комментарии.
@@ -98,6 +197,12 @@ class Comment(TimestampedModel):
     class Meta:
         default_related_name = 'comments'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('post', 'pub_date'),
+                name='comment_post_pub_date_idx',
+            ),
+        )
         verbose_name_plural = 'комментарии'
         verbose_name = 'комментарий'
 
@@ -110,7 +215,7 @@ class Comment(TimestampedModel):
         )
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     """
     Модель для хранения данных о подписках.
 
@@ -154,3 +259,127 @@ class Follow(models.Model):
     def __str__(self) -> str:
         """Возвращает в консоль текст о новом подписчике."""
         return f'{self.user} подписался на {self.author}'
+
+
+class UserCounters(models.Model):
+    """
+    Модель для хранения счётчиков пользователя.
+
+    user: пользователь, которому принадлежат счётчики.
+    posts_count: количество постов пользователя.
+    followers_count: количество подписчиков.
+    following_count: количество подписок.
+    Счётчики меняются через F() в обработчиках сигналов,
+    расхождения исправляет команда recount.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='пользователь',
+    )
+    posts_count = models.PositiveIntegerField('количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name_plural = 'счётчики пользователей'
+        verbose_name = 'счётчики пользователя'
+
+    def __str__(self) -> str:
+        """Возвращает в консоль счётчики пользователя."""
+        return f'{self.user_id}: {self.posts_count} постов'
+
+
+class FeedEntry(models.Model):
+    """
+    Модель для хранения материализованной ленты подписок.
+
+    user: подписчик, в ленту которого попала запись.
+    post: пост автора, на которого подписан пользователь.
+    author: автор поста, нужен для удаления записей при отписке.
+    pub_date: копия даты публикации поста, по ней
+    лента читается одним диапазоном индекса (user, -pub_date).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор',
+    )
+    pub_date = models.DateTimeField('дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='feed_user_post_unique',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='feed_user_pub_date_idx',
+                fields=['user', '-pub_date'],
+            ),
+            models.Index(
+                name='feed_user_author_idx',
+                fields=['user', 'author'],
+            ),
+        ]
+        ordering = ('-pub_date',)
+        verbose_name_plural = 'записи ленты'
+        verbose_name = 'запись ленты'
+
+    def __str__(self) -> str:
+        """Возвращает в консоль текст о записи в ленте."""
+        return f'{self.post_id} в ленте {self.user}'
+
+
+class Trending(models.Model):
+    """
+    Модель для хранения рейтинга популярных постов.
+
+    post: пост, у которого были просмотры или комментарии.
+    rank: логарифм затухающего веса поста, приведённого
+    к началу эпохи, см. posts.trending. Больше rank - выше
+    пост в рейтинге в любой момент времени.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='пост',
+    )
+    rank = models.FloatField('ранг', db_index=True)
+
+    class Meta:
+        ordering = ('-rank',)
+        verbose_name_plural = 'рейтинг постов'
+        verbose_name = 'рейтинг поста'
+
+    def __str__(self) -> str:
+        """Возвращает в консоль ранг поста."""
+        return f'{self.post_id}: {self.rank:.3f}'
@@ -0,0 +1,141 @@
+"""Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Индексы posts_post_fts и posts_comment_fts хранят только токены
+(external content), а синхронизируются триггерами на вставку,
+изменение и удаление строк. Поэтому индекс обновляется и при
+bulk_create, и при UPDATE через queryset.
+
+Индексы создаёт миграция MIGRATION. При пересоздании таблицы миграцией
+SQLite удаляет её триггеры, так что, пока MIGRATION применена,
+install() вызывается и после каждой миграции.
+"""
+import re
+import typing
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from posts.models import Post
+
+MIGRATION = ('posts', '0026_search_index')
+
+INDEXES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+    "text, content='{table}', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} "
+    "BEGIN INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} "
+    "BEGIN INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF text "
+    "ON {table} BEGIN INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+SEARCH_SQL = (
+    'SELECT post_id FROM ('
+    'SELECT rowid AS post_id, bm25(posts_post_fts) AS rank '
+    'FROM posts_post_fts WHERE posts_post_fts MATCH %s '
+    'UNION ALL '
+    'SELECT c.post_id, bm25(posts_comment_fts) * %s AS rank '
+    'FROM posts_comment_fts JOIN posts_comment c '
+    'ON c.id = posts_comment_fts.rowid '
+    'WHERE posts_comment_fts MATCH %s'
+    ') GROUP BY post_id ORDER BY MIN(rank) LIMIT %s'
+)
+
+
+def available(using=connection) -> bool:
+    """FTS5 есть только у SQLite."""
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection, rebuild: bool = False) -> None:
+    """Создаёт индексы и триггеры, если их ещё нет."""
+    if not available(using):
+        return
+    tables = using.introspection.table_names()
+    if any(table not in tables for _, table in INDEXES):
+        return
+    with using.cursor() as cursor:
+        for index, table in INDEXES:
+            for sql in CREATE_SQL:
+                cursor.execute(sql.format(index=index, table=table))
+            if rebuild:
+                cursor.execute(
+                    f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+                )
+
+
+def uninstall(using=connection) -> None:
+    """Удаляет индексы вместе с триггерами."""
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for index, _ in INDEXES:
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+def match_expression(query: str) -> str:
+    """Превращает пользовательский ввод в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, последнее ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_text(queryset: QuerySet, index: str, query: str) -> QuerySet:
+    """Оставляет в queryset записи, чей текст найден в индексе."""
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT rowid FROM {index} WHERE {index} MATCH %s', (match,),
+        ),
+    )
+
+
+def search_post_ids(query: str) -> typing.List[int]:
+    """Возвращает id постов, упорядоченные по релевантности.
+
+    Совпадение в комментарии весит меньше совпадения в самом посте.
+    """
+    match = match_expression(query)
+    if not match:
+        return []
+    if not available():
+        return list(
+            Post.objects.filter(
+                Q(text__icontains=query) | Q(comments__text__icontains=query),
+            ).values_list('pk', flat=True).distinct()[
+                :settings.SEARCH_MAX_RESULTS
+            ],
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SEARCH_SQL,
+            (
+                match,
+                settings.SEARCH_COMMENT_WEIGHT,
+                match,
+                settings.SEARCH_MAX_RESULTS,
+            ),
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,159 @@
+from core.cache import bump
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from posts import counters, feed, graph, search, trending, uploads
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def post_scopes(post: Post) -> list:
+    """Области кеша страниц, которые показывают пост."""
+    scopes = ['posts', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance: Post, **kwargs) -> None:
+    """Запоминает группу и картинку поста до редактирования."""
+    instance._old_state = None
+    if instance.pk:
+        instance._old_state = Post.objects.filter(
+            pk=instance.pk,
+        ).values_list('group_id', 'group__slug', 'image').first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance: Post, created: bool, **kwargs) -> None:
+    """Раскладывает новый пост по лентам и сбрасывает кеш страниц."""
+    scopes = post_scopes(instance)
+    old_group_id, old_group_slug, old_image = (
+        getattr(instance, '_old_state', None) or (None, None, '')
+    )
+    if old_group_slug:
+        scopes.append(f'group:{old_group_slug}')
+    bump(*scopes)
+    if (instance.image.name or '') != (old_image or ''):
+        schedule_processing(instance, created)
+    if created:
+        counters.change(Group, instance.group_id, posts_count=1)
+        counters.change_user(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+        return
+    if old_group_id != instance.group_id:
+        counters.change(Group, old_group_id, posts_count=-1)
+        counters.change(Group, instance.group_id, posts_count=1)
+
+
+def schedule_processing(post: Post, created: bool) -> None:
+    """Сбрасывает данные старой картинки и заказывает обработку новой.
+
+    Нормализация и миниатюры выполняются после коммита в пуле
+    процессов, см. posts.uploads.
+    """
+    if not created:
+        Post.objects.filter(pk=post.pk).update(
+            thumbnails='',
+            image_width=None,
+            image_height=None,
+            image_bytes=None,
+        )
+    post_id, image_name = post.pk, post.image.name
+    transaction.on_commit(
+        lambda: uploads.schedule(post_id, image_name),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance: Post, **kwargs) -> None:
+    """Сбрасывает кеш страниц и счётчики удалённого поста."""
+    bump(*post_scopes(instance))
+    counters.change(Group, instance.group_id, posts_count=-1)
+    counters.change_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(
+    sender, instance: Comment, created: bool, **kwargs,
+) -> None:
+    """Сбрасывает кеш страницы поста и считает комментарий."""
+    bump(f'post:{instance.post_id}')
+    if created:
+        counters.change(Post, instance.post_id, comments_count=1)
+        trending.record(
+            instance.post_id, settings.TRENDING_WEIGHTS['comment'],
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance: Comment, **kwargs) -> None:
+    """Сбрасывает кеш страницы поста и счётчик комментариев."""
+    bump(f'post:{instance.post_id}')
+    counters.change(Post, instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance: Group, **kwargs) -> None:
+    """Сбрасывает кеш страниц, где показана группа."""
+    bump('posts', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance: Follow, created: bool, **kwargs) -> None:
+    """Добавляет посты автора в ленту нового подписчика."""
+    bump(
+        f'author:{instance.author.username}', f'follow:{instance.user_id}',
+    )
+    if created:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        feed.followers_changed(instance.author_id, 1)
+        feed.add_author(instance.user_id, instance.author_id)
+        graph.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance: Follow, **kwargs) -> None:
+    """Убирает посты автора из ленты после отписки."""
+    bump(
+        f'author:{instance.author.username}', f'follow:{instance.user_id}',
+    )
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    feed.remove_author(instance.user_id, instance.author_id)
+    feed.followers_changed(instance.author_id, -1)
+    graph.unfollowed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance: User, created: bool, **kwargs) -> None:
+    """Заводит счётчики новому пользователю."""
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(request_finished)
+def request_done(sender, **kwargs) -> None:
+    """Сохраняет рейтинг постов уже после отправки ответа."""
+    trending.flush_due()
+
+
+@receiver(post_migrate)
+def migrated(sender, using: str, **kwargs) -> None:
+    """Возвращает триггеры поиска после пересоздания таблиц миграциями.
+
+    Если миграция индекса откачена (migrate posts 0025), индекс
+    не создаётся заново.
+    """
+    if sender.name != 'posts':
+        return
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if search.MIGRATION in applied:
+        search.install(connection)
@@ -0,0 +1,265 @@
+"""Ленты RSS, Atom и JSON Feed: общая, группы и автора.
+
+Лента собирается из одного запроса последних SYNDICATION_ITEMS
+постов по индексу (группа или автор, pub_date) и отдаётся потоком.
+Готовый ответ кешируется по поколению области (см. core.cache),
+поэтому пока в области ничего не менялось, опрос ленты не трогает
+базу, а клиент с ETag получает 304.
+
+ETag считается по содержимому ленты, а не по поколению: лента,
+собранная по отстающей реплике, получает свой ETag и не выдаётся
+за свежую. Last-Modified не отдаётся: дата последней записи
+уменьшается при удалении поста, и клиент с If-Modified-Since
+получил бы 304 на копию с удалённым постом.
+"""
+import hashlib
+import json
+import typing
+from xml.sax.saxutils import escape, quoteattr
+
+from core.cache import generation, page_timeout
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.http import (Http404, HttpRequest, HttpResponse,
+                         StreamingHttpResponse)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+
+SYNDICATION_KEY = 'syndication:v2:{}:{}:{}:{}'
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+FIELDS = (
+    'pk',
+    'text',
+    'pub_date',
+    'updated',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+    'group__title',
+)
+
+
+class Channel:
+    """Заголовок ленты и её записи."""
+
+    def __init__(
+        self,
+        request: HttpRequest,
+        title: str,
+        description: str,
+        link: str,
+        entries: typing.List[dict],
+    ) -> None:
+        self.request = request
+        self.title = title
+        self.description = description
+        self.link = request.build_absolute_uri(link)
+        self.feed_url = request.build_absolute_uri(request.path)
+        self.entries = entries
+        self.updated = max(
+            (entry['updated'] for entry in entries), default=timezone.now(),
+        )
+
+    def url(self, entry: dict) -> str:
+        return self.request.build_absolute_uri(
+            reverse('posts:post_detail', args=(entry['pk'],)),
+        )
+
+    def author_url(self, entry: dict) -> str:
+        return self.request.build_absolute_uri(
+            reverse('posts:profile', args=(entry['author__username'],)),
+        )
+
+    @staticmethod
+    def author(entry: dict) -> str:
+        name = f'{entry["author__first_name"]} {entry["author__last_name"]}'
+        return name.strip() or entry['author__username']
+
+    @staticmethod
+    def title_of(entry: dict) -> str:
+        return Truncator(entry['text'].strip().split('\n')[0]).chars(
+            settings.SYNDICATION_TITLE_LENGTH,
+        )
+
+
+def text(value: str) -> str:
+    return escape(value or '')
+
+
+def rss(channel: Channel) -> typing.Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+        f'<title>{text(channel.title)}</title>'
+        f'<link>{text(channel.link)}</link>'
+        f'<description>{text(channel.description)}</description>'
+        f'<atom:link href={quoteattr(channel.feed_url)} rel="self"/>'
+        f'<language>{settings.LANGUAGE_CODE}</language>'
+        f'<lastBuildDate>{rfc2822_date(channel.updated)}</lastBuildDate>'
+    )
+    for entry in channel.entries:
+        url = text(channel.url(entry))
+        category = ''
+        if entry['group__slug']:
+            category = f'<category>{text(entry["group__title"])}</category>'
+        yield (
+            f'<item><title>{text(channel.title_of(entry))}</title>'
+            f'<link>{url}</link>'
+            f'<guid isPermaLink="true">{url}</guid>'
+            f'<pubDate>{rfc2822_date(entry["pub_date"])}</pubDate>'
+            f'<dc:creator>{text(channel.author(entry))}</dc:creator>'
+            f'{category}'
+            f'<description>{text(entry["text"])}</description></item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def atom(channel: Channel) -> typing.Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        f'xml:lang="{settings.LANGUAGE_CODE}">'
+        f'<title>{text(channel.title)}</title>'
+        f'<subtitle>{text(channel.description)}</subtitle>'
+        f'<id>{text(channel.feed_url)}</id>'
+        f'<link href={quoteattr(channel.link)} rel="alternate"/>'
+        f'<link href={quoteattr(channel.feed_url)} rel="self"/>'
+        f'<updated>{rfc3339_date(channel.updated)}</updated>'
+    )
+    for entry in channel.entries:
+        url = channel.url(entry)
+        category = ''
+        if entry['group__slug']:
+            category = (
+                f'<category term={quoteattr(entry["group__slug"])} '
+                f'label={quoteattr(entry["group__title"])}/>'
+            )
+        yield (
+            f'<entry><title>{text(channel.title_of(entry))}</title>'
+            f'<id>{text(url)}</id>'
+            f'<link href={quoteattr(url)} rel="alternate"/>'
+            f'<published>{rfc3339_date(entry["pub_date"])}</published>'
+            f'<updated>{rfc3339_date(entry["updated"])}</updated>'
+            f'<author><name>{text(channel.author(entry))}</name>'
+            f'<uri>{text(channel.author_url(entry))}</uri></author>'
+            f'{category}'
+            f'<content type="text">{text(entry["text"])}</content></entry>'
+        )
+    yield '</feed>\n'
+
+
+def json_feed(channel: Channel) -> typing.Iterator[str]:
+    """JSON Feed 1.1, https://www.jsonfeed.org/version/1.1/."""
+    head = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': channel.title,
+        'home_page_url': channel.link,
+        'feed_url': channel.feed_url,
+        'description': channel.description,
+        'language': settings.LANGUAGE_CODE,
+    }, ensure_ascii=False)
+    yield head[:-1] + ', "items": ['
+    for number, entry in enumerate(channel.entries):
+        item = {
+            'id': channel.url(entry),
+            'url': channel.url(entry),
+            'title': channel.title_of(entry),
+            'content_text': entry['text'],
+            'date_published': rfc3339_date(entry['pub_date']),
+            'date_modified': rfc3339_date(entry['updated']),
+            'authors': [{
+                'name': channel.author(entry),
+                'url': channel.author_url(entry),
+            }],
+        }
+        if entry['group__slug']:
+            item['tags'] = [entry['group__title']]
+        yield (', ' if number else '') + json.dumps(item, ensure_ascii=False)
+    yield ']}\n'
+
+
+RENDERERS = {
+    'rss': rss,
+    'atom': atom,
+    'json': json_feed,
+}
+
+
+def _stored(
+    chunks: typing.Iterator[str], key: str, etag: str, timeout: int,
+) -> typing.Iterator[bytes]:
+    """Отдаёт ленту потоком и кладёт её в кеш, когда она дописана."""
+    parts = []
+    for chunk in chunks:
+        data = chunk.encode()
+        parts.append(data)
+        yield data
+    cache.set(key, (etag, b''.join(parts)), timeout)
+
+
+def _etag(request: HttpRequest, fmt: str, info: dict, entries: list) -> str:
+    """ETag по всему, из чего собирается тело ленты."""
+    content = json.dumps(
+        [fmt, request.build_absolute_uri(request.path), info, entries],
+        default=str,
+        ensure_ascii=False,
+    )
+    return f'"{hashlib.md5(content.encode()).hexdigest()}"'
+
+
+def respond(
+    request: HttpRequest,
+    fmt: str,
+    scope: str,
+    posts: QuerySet,
+    channel: typing.Callable[[], typing.Optional[dict]],
+) -> HttpResponse:
+    """Отдаёт ленту области scope в формате fmt.
+
+    channel возвращает title, description и link ленты или None,
+    если владельца ленты нет. Он вызывается только без кеша.
+    """
+    if fmt not in RENDERERS:
+        raise Http404
+    key = SYNDICATION_KEY.format(
+        fmt,
+        scope,
+        generation(scope)[0],
+        hashlib.md5(request.get_host().encode()).hexdigest(),
+    )
+    stored = cache.get(key)
+    if stored is not None:
+        etag, body = stored
+    else:
+        entries = list(
+            posts.order_by('-pub_date', '-pk').values(*FIELDS)[
+                :settings.SYNDICATION_ITEMS
+            ],
+        )
+        info = channel()
+        if info is None:
+            raise Http404
+        feed = Channel(request, entries=entries, **info)
+        etag, body = _etag(request, fmt, info, entries), None
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    if body is not None:
+        response = HttpResponse(body, content_type=CONTENT_TYPES[fmt])
+    else:
+        response = StreamingHttpResponse(
+            _stored(RENDERERS[fmt](feed), key, etag, page_timeout()),
+            content_type=CONTENT_TYPES[fmt],
+        )
+    response['ETag'] = etag
+    return response
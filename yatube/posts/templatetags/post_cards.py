@@ -0,0 +1,58 @@
+from django import template
+from django.utils.safestring import mark_safe
+from posts.cards import card_key, render_cards
+from posts.following import for_request
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_cards(context: template.Context, posts) -> str:
+    """Достаёт из кеша карточки всех постов страницы разом.
+
+    Ставится перед циклом по постам, дальше {% post_card %}
+    берёт готовую карточку из контекста.
+    """
+    context['post_cards'] = render_cards(posts)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context: template.Context, post) -> str:
+    """Выводит карточку поста из кеша."""
+    key = card_key(post)
+    card = context.get('post_cards', {}).get(key)
+    if card is None:
+        card = render_cards([post])[key]
+    return mark_safe(card)
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_follow_state(context: template.Context, posts) -> str:
+    """Сообщает, на каких авторов страницы будут кнопки подписки.
+
+    Тогда подписки на всех авторов читаются одним запросом
+    при первой кнопке, а не запросом на каждую.
+    """
+    request = context.get('request')
+    if request is not None:
+        for_request(request).want(post.author_id for post in posts)
+    return ''
+
+
+@register.inclusion_tag(
+    'posts/includes/follow_button.html', takes_context=True,
+)
+def follow_button(context: template.Context, author) -> dict:
+    """Кнопка подписки на автора или отписки от него."""
+    request = context.get('request')
+    shown = (
+        request is not None
+        and request.user.is_authenticated
+        and request.user.pk != author.pk
+    )
+    return {
+        'author': author,
+        'shown': shown,
+        'following': shown and for_request(request).follows(author.pk),
+    }
@@ -0,0 +1,73 @@
+from core.admin import EstimatedCountPaginator
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from mixer.backend.django import mixer
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    """Тестирование списков админки на больших таблицах."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password',
+        )
+        cls.group = mixer.blend(Group)
+        cls.create_rows(0, 5)
+
+    @classmethod
+    def create_rows(cls, start: int, stop: int) -> None:
+        for number in range(start, stop):
+            author = User.objects.create_user(
+                username=f'admin_author_{number}',
+            )
+            post = Post.objects.create(
+                text=f'пост {number}', author=author, group=cls.group,
+            )
+            Comment.objects.create(post=post, author=author, text='текст')
+            Follow.objects.create(user=cls.admin, author=author)
+            mixer.blend(Group)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_have_no_n_plus_one(self):
+        """Проверка что число запросов списка не зависит от числа строк."""
+        urls = [
+            reverse(f'admin:posts_{model}_changelist')
+            for model in ('post', 'comment', 'follow', 'group')
+        ]
+        before = [self.queries(url) for url in urls]
+        self.create_rows(5, 15)
+        self.assertEqual([self.queries(url) for url in urls], before)
+
+    def test_exact_search(self):
+        """Проверка поиска подписок по точному имени."""
+        url = reverse('admin:posts_follow_changelist')
+        response = self.client.get(url, {'q': 'admin_author_1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(url, {'q': 'admin_author'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_estimated_count(self):
+        """Проверка оценки числа строк и ограниченного подсчёта."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, Post.objects.order_by('-pk')[0].pk)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 2,
+        )
+        self.assertEqual(paginator.count, 3)
@@ -0,0 +1,51 @@
+import copy
+
+from django.test import TestCase, override_settings
+from posts import benchmark
+from posts.models import FeedEntry, Post, UserCounters
+
+
+class BenchmarkTests(TestCase):
+    """Тестирование нагрузочного стенда на маленьком наборе данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Заполняем базу небольшим набором данных."""
+        super().setUpClass()
+
+        benchmark.seed(
+            users=20, posts=60, comments=120, follows_per_user=3, groups=2,
+        )
+
+    def test_seed_builds_derived_data(self):
+        """Проверка что после заполнения пересобраны счётчики и ленты."""
+        self.assertEqual(benchmark.dataset()['posts'], 60)
+        self.assertEqual(UserCounters.objects.count(), 20)
+        self.assertEqual(
+            sum(UserCounters.objects.values_list('posts_count', flat=True)),
+            Post.objects.count(),
+        )
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_run_and_compare(self):
+        """Проверка отчёта прогона и поиска ухудшений."""
+        report = benchmark.run(per_view=3, warmup=1)
+        self.assertEqual(set(report['views']), set(benchmark.VIEWS))
+        for view, stats in report['views'].items():
+            with self.subTest(view=view):
+                self.assertEqual(stats['errors'], 0)
+                self.assertGreater(stats['queries_max'], 0)
+        self.assertEqual(benchmark.compare(report, report, 0.25), [])
+        slower = copy.deepcopy(report)
+        slower['views']['index']['p95_ms'] *= 2
+        slower['views']['index']['queries_max'] += 1
+        self.assertEqual(len(benchmark.compare(slower, report, 0.25)), 2)
+
+    @override_settings(RATE_LIMITS={'posts:post_create': {'rate': '1/m'}})
+    def test_run_ignores_rate_limits(self):
+        """Проверка что прогон замеряет публикацию, а не ответ 429."""
+        stats = benchmark.run(
+            views=['post_create'], per_view=5, warmup=2,
+        )['views']['post_create']
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['throttled'], 0)
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from mixer.backend.django import mixer
+from posts.cards import CARD_TEMPLATE, card_key
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    """Тестирование кеша карточек постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора с постом в группе."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(
+            username='card_author', first_name='Анна',
+        )
+        cls.group = mixer.blend(Group)
+        cls.post = Post.objects.create(
+            text='Текст карточки', author=cls.author, group=cls.group,
+        )
+        cls.reader = User.objects.create_user(username='card_reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_listings_share_cards(self):
+        """Проверка что карточка рисуется один раз на все ленты."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        self.assertContains(response, 'Текст карточки')
+        for url in (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTemplateNotUsed(response, CARD_TEMPLATE)
+                self.assertContains(response, 'Текст карточки')
+
+    def test_key_follows_post_and_author(self):
+        """Проверка что правка поста или имени автора меняет ключ."""
+        post = Post.objects.select_related('author').get(pk=self.post.pk)
+        key = card_key(post)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertNotEqual(card_key(post), key)
+        key = card_key(post)
+        post.author.first_name = 'Мария'
+        self.assertNotEqual(card_key(post), key)
@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase
+from mixer.backend.django import mixer
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    """Тестирование денормализованных счётчиков."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора, читателя, группу и пост."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='counter_author')
+        cls.reader = User.objects.create_user(username='counter_reader')
+        cls.group = mixer.blend(Group)
+        cls.post = Post.objects.create(
+            text='пост со счётчиками',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def test_post_counters(self):
+        """Проверка счётчиков постов автора и группы."""
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1,
+        )
+        self.post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 0,
+        )
+
+    def test_comment_counter_survives_post_save(self):
+        """Проверка что сохранение поста не затирает счётчик комментариев."""
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        post.text = 'отредактированный пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_follow_counters(self):
+        """Проверка счётчиков подписчиков и подписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers_count, 1,
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).following_count, 1,
+        )
+        Follow.objects.all().delete()
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers_count, 0,
+        )
+
+    def test_failed_save_keeps_counters(self):
+        """Проверка что запись и счётчики откатываются вместе."""
+        def fail(sender, **kwargs):
+            raise RuntimeError('сбой после обновления счётчиков')
+
+        post_save.connect(fail, sender=Comment)
+        self.addCleanup(post_save.disconnect, fail, sender=Comment)
+        with self.assertRaises(RuntimeError):
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='к',
+            )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_recount_users_creates_counters_in_sql(self):
+        """Проверка что недостающие счётчики создаются одним запросом."""
+        UserCounters.objects.all().delete()
+        User.objects.bulk_create(
+            User(username=f'counter_bulk_{number}') for number in range(50)
+        )
+        with self.assertNumQueries(2):
+            counters.recount_users()
+        self.assertEqual(UserCounters.objects.count(), User.objects.count())
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1,
+        )
+
+    def test_recount_repairs_drift(self):
+        """Проверка что команда recount исправляет расхождения."""
+        Group.objects.update(posts_count=42)
+        UserCounters.objects.filter(user=self.author).delete()
+        call_command('recount', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1,
+        )
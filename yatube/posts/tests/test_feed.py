@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.feed import MergedFeed, feed_for
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    """Тестирование материализованной ленты подписок."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора, подписчика и пост до подписки."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.follower = User.objects.create_user(username='feed_follower')
+        cls.old_post = Post.objects.create(
+            text='пост до подписки',
+            author=cls.author,
+        )
+
+    def test_follow_adds_existing_posts(self):
+        """Проверка что при подписке в ленту попадают старые посты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertIn(self.old_post, feed_for(self.follower))
+
+    def test_new_post_fans_out(self):
+        """Проверка что новый пост раскладывается по подписчикам."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='новый пост', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists(),
+        )
+
+    def test_unfollow_clears_feed(self):
+        """Проверка что после отписки посты автора уходят из ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.filter(user=self.follower).delete()
+        self.assertFalse(feed_for(self.follower).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_read_on_demand(self):
+        """Проверка что посты популярных авторов читаются при запросе."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='пост звезды', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            list(feed_for(self.follower)), [post, self.old_post],
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_merged(self):
+        """Проверка слияния ленты с постами популярного автора."""
+        writer = User.objects.create_user(username='feed_writer')
+        Follow.objects.create(user=self.follower, author=writer)
+        Follow.objects.create(user=writer, author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(text=f'пост {number}', author=author)
+            for number, author in enumerate((writer, self.author, writer))
+        ]
+        # writer тоже перешёл порог, записей в ленте нет ни у кого
+        self.assertFalse(FeedEntry.objects.exists())
+        feed = feed_for(self.follower)
+        self.assertIsInstance(feed, MergedFeed)
+        self.assertEqual(list(feed), posts[::-1] + [self.old_post])
+        self.assertEqual(feed[1:3], [posts[1], posts[0]])
+        self.assertEqual(feed.count(), 4)
+        self.assertEqual(
+            [row['pk'] for row in feed.values('pk', 'pub_date')[:2]],
+            [posts[2].pk, posts[1].pk],
+        )
+        self.client.force_login(self.follower)
+        page = self.client.get(reverse('api:follow'), {'limit': 2}).json()
+        page = self.client.get(
+            reverse('api:follow'), {'limit': 2, 'cursor': page['next_cursor']},
+        ).json()
+        self.assertEqual(
+            [item['id'] for item in page['results']],
+            [posts[0].pk, self.old_post.pk],
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_threshold_crossing(self):
+        """Проверка перехода автора через порог в обе стороны."""
+        other = User.objects.create_user(username='feed_other')
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(author=self.author).exists())
+        follow = Follow.objects.create(user=other, author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(author=self.author).exists())
+        self.assertEqual(list(feed_for(other)), [self.old_post])
+        Follow.objects.filter(user=self.follower).delete()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user_id', 'post_id')),
+            [(other.pk, self.old_post.pk)],
+        )
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_backfill_command(self):
+        """Проверка что команда восстанавливает ленту."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feed', stdout=StringIO())
+        self.assertIn(self.old_post, feed_for(self.follower))
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.following import FollowState
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowStateTests(TestCase):
+    """Тестирование кнопок подписки на страницах со списками постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='state_reader')
+        cls.followed = User.objects.create_user(username='state_followed')
+        cls.stranger = User.objects.create_user(username='state_stranger')
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        for author in (cls.followed, cls.stranger, cls.reader):
+            Post.objects.create(text='пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_following_set_is_cached(self):
+        """Проверка что подписки читаются одним запросом и кешируются."""
+        ids = (self.followed.pk, self.stranger.pk)
+        state = FollowState(self.reader)
+        state.want(ids)
+        with self.assertNumQueries(1):
+            self.assertTrue(state.follows(self.followed.pk))
+            self.assertFalse(state.follows(self.stranger.pk))
+            self.assertFalse(state.follows(self.reader.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(FollowState(self.reader).follows(ids[0]))
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        self.assertTrue(FollowState(self.reader).follows(ids[1]))
+
+    @override_settings(FOLLOW_STATE_CACHE_LIMIT=0)
+    def test_many_subscriptions_use_in_query(self):
+        """Проверка запроса с IN по авторам страницы при многих подписках."""
+        FollowState(self.reader).follows(self.followed.pk)
+        state = FollowState(self.reader)
+        state.want((self.followed.pk, self.stranger.pk))
+        with self.assertNumQueries(1):
+            self.assertTrue(state.follows(self.followed.pk))
+            self.assertFalse(state.follows(self.stranger.pk))
+
+    def test_buttons_on_listing_and_profile(self):
+        """Проверка кнопок подписки в ленте и в профиле."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            reverse('posts:profile_unfollow', args=(self.followed.username,)),
+        )
+        self.assertContains(
+            response,
+            reverse('posts:profile_follow', args=(self.stranger.username,)),
+        )
+        self.assertNotContains(
+            response,
+            reverse('posts:profile_follow', args=(self.reader.username,)),
+        )
+        response = self.client.get(
+            reverse('posts:profile', args=(self.followed.username,)),
+        )
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
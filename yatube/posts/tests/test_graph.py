@@ -0,0 +1,139 @@
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts import graph
+from posts.graph import FollowGraph
+from posts.models import Follow
+
+User = get_user_model()
+
+
+def build(*edges) -> FollowGraph:
+    return FollowGraph(
+        array('l', [user for user, _ in sorted(edges)]),
+        array('l', [author for _, author in sorted(edges)]),
+    )
+
+
+class FollowGraphTests(SimpleTestCase):
+    """Тестирование графа подписок в CSR."""
+
+    def setUp(self):
+        # 1 читает 2 и 3, 2 читает 3 и 4, 3 читает 1 и 4
+        self.graph = build((1, 2), (1, 3), (2, 3), (2, 4), (3, 1), (3, 4))
+
+    def test_lookups(self):
+        """Проверка подписок, подписчиков и взаимной подписки."""
+        self.assertEqual(self.graph.following(1), [2, 3])
+        self.assertEqual(self.graph.followers(4), [2, 3])
+        self.assertEqual(self.graph.followers(1), [3])
+        self.assertEqual(self.graph.following(100), [])
+        self.assertTrue(self.graph.follows(2, 4))
+        self.assertFalse(self.graph.follows(4, 2))
+        self.assertTrue(self.graph.mutual(1, 3))
+        self.assertFalse(self.graph.mutual(1, 2))
+
+    def test_deltas(self):
+        """Проверка подписок и отписок поверх массивов."""
+        self.graph.add(1, 4)
+        self.graph.add(7, 1)
+        self.graph.remove(1, 2)
+        self.assertEqual(self.graph.following(1), [3, 4])
+        self.assertEqual(self.graph.followers(1), [3, 7])
+        self.assertFalse(self.graph.follows(1, 2))
+        self.graph.add(1, 2)
+        self.graph.remove(7, 1)
+        self.assertTrue(self.graph.follows(1, 2))
+        self.assertEqual(self.graph.followers(1), [3])
+
+    @override_settings(FOLLOW_GRAPH_MAX_DELTA=1)
+    def test_compaction(self):
+        """Проверка что накопленные дельты вливаются в массивы."""
+        self.graph.add(9, 1)
+        self.graph.remove(2, 3)
+        self.assertEqual(self.graph.edges, 6)
+        self.assertFalse(self.graph.added or self.graph.removed)
+        self.assertEqual(self.graph.following(9), [1])
+        self.assertEqual(self.graph.followers(3), [1])
+
+    @override_settings(FOLLOW_GRAPH_MAX_DELTA=1)
+    def test_compaction_of_removals(self):
+        """Проверка пересборки, когда накопились только отписки."""
+        self.graph.remove(1, 2)
+        self.graph.remove(2, 3)
+        self.assertEqual(self.graph.edges, 4)
+        self.assertFalse(self.graph.removed)
+        self.assertEqual(self.graph.following(1), [3])
+        self.assertEqual(self.graph.followers(3), [1])
+
+    def test_recommendations(self):
+        """Проверка друзей друзей и похожих авторов."""
+        self.assertEqual(self.graph.recommend(1, 5), [(4, 2)])
+        self.assertEqual(self.graph.recommend(4, 5), [(2, 1), (3, 1)])
+        self.assertEqual(self.graph.similar(4, 1), [(1, 1)])
+
+
+class FollowGraphSignalsTests(TestCase):
+    """Тестирование загрузки графа и рекомендаций на страницах."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='graph_reader')
+        cls.friend = User.objects.create_user(username='graph_friend')
+        cls.author = User.objects.create_user(username='graph_author')
+        cls.other = User.objects.create_user(username='graph_other')
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.reader, author=cls.other)
+        Follow.objects.create(user=cls.friend, author=cls.author)
+
+    def setUp(self):
+        graph.reset()
+        self.addCleanup(graph.reset)
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_signals_update_loaded_graph(self):
+        """Проверка что подписки сразу попадают в загруженный граф."""
+        self.assertFalse(graph.graph().follows(self.reader.pk, self.author.pk))
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(graph.graph().follows(self.reader.pk, self.author.pk))
+        follow.delete()
+        self.assertFalse(graph.graph().follows(self.reader.pk, self.author.pk))
+
+    def test_pages_show_recommendations(self):
+        """Проверка рекомендаций на странице подписок и в профиле."""
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['recommended'], [(self.author, 1)])
+        response = self.client.get(
+            reverse('posts:profile', args=(self.friend.username,)),
+        )
+        self.assertEqual(response.context['similar'], [(self.other, 1)])
+        self.assertContains(response, 'Читатели автора читают также')
+
+    @override_settings(FOLLOW_GRAPH_REFRESH_SECONDS=0)
+    def test_refresh_keeps_changes_made_during_load(self):
+        """Проверка перечитывания графа без блокировки и потери подписок."""
+        stale = graph.graph()
+        test = self
+
+        class SlowGraph(FollowGraph):
+            @classmethod
+            def load(cls):
+                # пока граф читается, другие запросы получают старый
+                test.assertIs(graph.graph(), stale)
+                graph.followed(test.reader.pk, test.author.pk)
+                graph.unfollowed(test.reader.pk, test.other.pk)
+                return super().load()
+
+        graph.FollowGraph = SlowGraph
+        self.addCleanup(setattr, graph, 'FollowGraph', FollowGraph)
+        fresh = graph.graph()
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(fresh.follows(self.reader.pk, self.author.pk))
+        self.assertFalse(fresh.follows(self.reader.pk, self.other.pk))
+        self.assertIsNone(graph._journal)
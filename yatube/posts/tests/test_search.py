@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Post
+from posts.search import (MIGRATION, match_expression, search_post_ids,
+                          uninstall)
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Тестирование полнотекстового поиска."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём посты и комментарий с искомыми словами."""
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='search_author')
+        cls.post = Post.objects.create(
+            text='Кошки любят рыбу',
+            author=cls.user,
+        )
+        cls.commented = Post.objects.create(
+            text='Пост без ключевого слова',
+            author=cls.user,
+        )
+        Comment.objects.create(
+            post=cls.commented,
+            author=cls.user,
+            text='а кошки ещё и молоко',
+        )
+
+    def test_match_expression_is_safe(self):
+        """Проверка что спецсимволы запроса не ломают MATCH."""
+        self.assertEqual(match_expression('"кот" OR -'), '"кот" "OR"*')
+        self.assertEqual(match_expression('!!!'), '')
+
+    def test_post_ranked_above_comment(self):
+        """Проверка что совпадение в посте выше, чем в комментарии."""
+        self.assertEqual(
+            search_post_ids('кошки'), [self.post.pk, self.commented.pk],
+        )
+
+    def test_index_follows_updates(self):
+        """Проверка что изменение и удаление попадают в индекс."""
+        Post.objects.filter(pk=self.post.pk).update(text='Собаки')
+        self.assertEqual(search_post_ids('рыбу'), [])
+        self.assertEqual(search_post_ids('собак'), [self.post.pk])
+
+    def test_search_page(self):
+        """Проверка что страница поиска выводит найденные посты."""
+        response = self.client.get(reverse('posts:search'), {'q': 'рыбу'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_rolled_back_index_is_not_reinstalled(self):
+        """Проверка что после отката миграции индекса он не создаётся."""
+        connection = connections['default']
+        uninstall(connection)
+        MigrationRecorder(connection).record_unapplied(*MIGRATION)
+        emit_post_migrate_signal(0, False, 'default')
+        self.assertNotIn(
+            'posts_post_fts', connection.introspection.table_names(),
+        )
@@ -0,0 +1,112 @@
+import json
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTests(TestCase):
+    """Тестирование лент RSS, Atom и JSON Feed."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора с постом в группе."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(
+            username='feed_author', first_name='Анна',
+        )
+        cls.group = Group.objects.create(
+            title='Группа <и> лента', slug='feed', description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='Первая строка & поста\nвторая', author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def body(response) -> bytes:
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def test_formats(self):
+        """Проверка что все форматы разбираются и содержат пост."""
+        for name, args in (
+            ('posts:posts_feed', ()),
+            ('posts:group_feed', (self.group.slug,)),
+            ('posts:profile_feed', (self.author.username,)),
+        ):
+            for fmt in ('rss', 'atom'):
+                with self.subTest(name=name, fmt=fmt):
+                    response = self.client.get(
+                        reverse(name, args=args + (fmt,)),
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIn('Первая строка & поста', ''.join(
+                        ElementTree.fromstring(
+                            self.body(response),
+                        ).itertext(),
+                    ))
+        response = self.client.get(
+            reverse('posts:posts_feed', args=('json',)),
+        )
+        item = json.loads(self.body(response))['items'][0]
+        self.assertEqual(item['title'], 'Первая строка & поста')
+        self.assertEqual(item['authors'][0]['name'], 'Анна')
+        self.assertEqual(item['tags'], [self.group.title])
+
+    def test_cached_and_conditional(self):
+        """Проверка кеша ленты и ответа 304 до новых записей."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'rss'))
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        content = self.body(response)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'],
+            )
+        self.assertEqual(self.body(cached), content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group,
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый пост'.encode(), self.body(response))
+
+    def test_etag_follows_content(self):
+        """Проверка что ETag меняется при удалении и не зависит от кеша."""
+        url = reverse('posts:group_feed', args=(self.group.slug, 'atom'))
+        post = Post.objects.create(
+            text='Удаляемый пост', author=self.author, group=self.group,
+        )
+        etag = self.client.get(url)['ETag']
+        post.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Удаляемый пост'.encode(), self.body(response))
+        cache.clear()
+        fresh = self.client.get(url)
+        self.assertEqual(fresh['ETag'], response['ETag'])
+
+    def test_not_found(self):
+        """Проверка 404 для неизвестных формата, группы и автора."""
+        for url in (
+            reverse('posts:posts_feed', args=('xml',)),
+            reverse('posts:group_feed', args=('missing', 'rss')),
+            reverse('posts:profile_feed', args=('missing', 'atom')),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
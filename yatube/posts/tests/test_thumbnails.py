@@ -0,0 +1,63 @@
+import shutil
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts.models import Post
+
+User = get_user_model()
+
+
+def jpeg(name: str = 'photo.jpg') -> SimpleUploadedFile:
+    file = BytesIO()
+    Image.new('RGB', size=(640, 480), color=(0, 155, 0)).save(file, 'jpeg')
+    return SimpleUploadedFile(
+        name=name,
+        content=file.getvalue(),
+        content_type='image/jpeg',
+    )
+
+
+@override_settings(MEDIA_ROOT=settings.TEMP_MEDIA_ROOT, WORKER_PROCESSES=0)
+class ThumbnailTests(TestCase):
+    """Тестирование предварительной генерации миниатюр."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='thumb_author')
+        cls.post = Post.objects.create(
+            text='пост с картинкой',
+            author=cls.user,
+            image=jpeg(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_warm_command_stores_geometries(self):
+        """Проверка что команда сохраняет все геометрии в посте."""
+        call_command('warm_thumbnails', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(
+            set(post.thumbs), set(settings.THUMBNAIL_GEOMETRIES),
+        )
+        self.assertEqual(post.thumbs['card']['width'], 300)
+
+    def test_template_uses_stored_thumbnail(self):
+        """Проверка что карточка берёт готовую миниатюру из поста."""
+        Post.objects.filter(pk=self.post.pk).update(
+            thumbnails='{"card": {"url": "/media/ready.jpg", '
+                       '"width": 300, "height": 300}}',
+        )
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        self.assertContains(response, '/media/ready.jpg')
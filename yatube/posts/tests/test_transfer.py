@@ -0,0 +1,74 @@
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts import transfer
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+from posts.search import search_post_ids
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    """Тестирование выгрузки и загрузки данных в JSONL."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора, читателя, пост с комментарием и подписку."""
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='transfer_author')
+        cls.reader = User.objects.create_user(username='transfer_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='transfer', description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='Перенесённый пост', author=cls.author, group=cls.group,
+        )
+        cls.pub_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.pub_date)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def reload(self, stream: io.StringIO) -> dict:
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        stream.seek(0)
+        return transfer.load(stream, batch_size=1)
+
+    def test_round_trip(self):
+        """Проверка что загрузка восстанавливает данные и производные."""
+        stream = io.StringIO()
+        exported = transfer.export(stream, chunk_size=1)
+        self.assertEqual(exported['user'], 2)
+        record = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(record['type'], 'user')
+        self.assertEqual(self.reload(stream), exported)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertEqual(post.author.counters.followers_count, 1)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists(),
+        )
+        self.assertEqual(search_post_ids('перенесённый'), [post.pk])
+        created = Post.objects.create(text='Новый', author=post.author)
+        self.assertGreater(created.pk, post.pk)
+
+    def test_commands_compress(self):
+        """Проверка выгрузки и загрузки сжатого файла командами."""
+        with tempfile.NamedTemporaryFile(suffix='.jsonl.gz') as file:
+            call_command('export_yatube', file.name, stdout=io.StringIO())
+            with open(file.name, 'rb') as raw:
+                self.assertEqual(raw.read(2), b'\x1f\x8b')
+            Post.objects.all().delete()
+            call_command('import_yatube', file.name, stdout=io.StringIO())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
@@ -0,0 +1,119 @@
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from mixer.backend.django import mixer
+from posts import trending
+from posts.models import Comment, Group, Post, Trending
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    """Тестирование рейтинга популярных постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём автора, группу и посты в группе и без неё."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='trending_author')
+        cls.group = mixer.blend(Group)
+        cls.grouped = Post.objects.create(
+            text='пост в группе', author=cls.author, group=cls.group,
+        )
+        cls.lonely = Post.objects.create(text='пост', author=cls.author)
+
+    def setUp(self):
+        trending.reset()
+        self.addCleanup(trending.reset)
+        cache.clear()
+
+    def test_combine_adds_weights(self):
+        """Проверка что rank суммы равен логарифму суммы весов."""
+        now = time.time()
+        rank = trending.combine(
+            trending.rank_of(1, now), trending.rank_of(3, now),
+        )
+        self.assertAlmostEqual(trending.score(rank, now), 4)
+        self.assertAlmostEqual(
+            trending.score(rank, now + settings.TRENDING_HALF_LIFE), 2,
+        )
+
+    def test_ranking(self):
+        """Проверка порядка постов и рейтинга группы."""
+        trending.record(self.grouped.pk, 1)
+        trending.record(self.lonely.pk, 1)
+        trending.record(self.lonely.pk, 1)
+        self.assertEqual(trending.flush(), 2)
+        self.assertEqual(
+            trending.ranked(), [self.lonely.pk, self.grouped.pk],
+        )
+        self.assertEqual(trending.ranked(self.group.pk), [self.grouped.pk])
+        trending.record(self.grouped.pk, 5)
+        trending.flush()
+        self.assertEqual(
+            trending.ranked(), [self.grouped.pk, self.lonely.pk],
+        )
+
+    def test_old_events_are_pruned(self):
+        """Проверка что затухшие посты удаляются из таблицы."""
+        day_ago = time.time() - 24 * 60 * 60
+        trending.record(self.lonely.pk, 1, at=day_ago)
+        trending.record(self.grouped.pk, 1)
+        trending.flush()
+        self.assertEqual(
+            list(Trending.objects.values_list('post_id', flat=True)),
+            [self.grouped.pk],
+        )
+
+    def test_events_of_deleted_posts_are_skipped(self):
+        """Проверка что события удалённого поста не роняют сброс."""
+        post = Post.objects.create(text='удалят', author=self.author)
+        trending.record(post.pk, 1)
+        post.delete()
+        trending.flush()
+        self.assertFalse(Trending.objects.exists())
+
+    def test_views_and_comments_count(self):
+        """Проверка что просмотры и комментарии попадают в рейтинг."""
+        client = Client()
+        client.get(reverse('posts:post_detail', args=(self.lonely.pk,)))
+        Comment.objects.create(
+            post=self.grouped, author=self.author, text='комментарий',
+        )
+        trending.flush()
+        self.assertEqual(
+            trending.ranked(), [self.grouped.pk, self.lonely.pk],
+        )
+
+    def test_pages(self):
+        """Проверка страниц рейтинга: посты из памяти одним запросом."""
+        trending.record(self.grouped.pk, 1)
+        trending.flush()
+        url = reverse('posts:trending')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.context['posts'], [self.grouped])
+        response = self.client.get(
+            reverse('posts:group_trending', args=(self.group.slug,)),
+        )
+        self.assertEqual(response.context['posts'], [self.grouped])
+        self.assertContains(response, self.group.title)
+
+    def test_rebuild(self):
+        """Проверка пересборки рейтинга по комментариям."""
+        Comment.objects.create(
+            post=self.lonely, author=self.author, text='комментарий',
+        )
+        trending.reset()
+        Trending.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_trending', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(trending.ranked(), [self.lonely.pk])
@@ -0,0 +1,90 @@
+import shutil
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from posts.forms import PostForm
+from posts.models import Post
+
+User = get_user_model()
+
+ORIENTATION = 0x0112
+
+
+def photo(name: str = 'camera.jpg') -> SimpleUploadedFile:
+    """Снимок 400x200 с EXIF: повернуть на 90 градусов."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    file = BytesIO()
+    Image.new('RGB', size=(400, 200), color=(0, 0, 155)).save(
+        file, 'jpeg', exif=exif.tobytes(), quality=100,
+    )
+    return SimpleUploadedFile(
+        name=name, content=file.getvalue(), content_type='image/jpeg',
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=settings.TEMP_MEDIA_ROOT,
+    WORKER_PROCESSES=0,
+    IMAGE_MAX_SIZE=(100, 100),
+    IMAGE_FORMAT='JPEG',
+)
+class UploadTests(TestCase):
+    """Тестирование нормализации загруженных картинок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='upload_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_photo_is_rotated_resized_and_stripped(self):
+        """Проверка поворота, уменьшения и удаления EXIF."""
+        post = Post.objects.create(
+            text='снимок', author=self.user, image=photo(),
+        )
+        original = post.image.name
+        call_command('normalize_images', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        self.assertFalse(default_storage.exists(original))
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        self.assertEqual(post.image_bytes, post.image.size)
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (50, 100))
+            self.assertNotIn('exif', stored.info)
+        self.assertTrue(post.thumbs)
+
+    def test_small_image_is_kept(self):
+        """Проверка что мелкую картинку без метаданных не пережимаем."""
+        file = BytesIO()
+        Image.effect_noise((60, 40), 64).convert('RGB').save(
+            file, 'jpeg', quality=20,
+        )
+        post = Post.objects.create(
+            text='сжатая картинка',
+            author=self.user,
+            image=SimpleUploadedFile('small.jpg', file.getvalue()),
+        )
+        call_command('normalize_images', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/small.jpg')
+        self.assertEqual((post.image_width, post.image_height), (60, 40))
+        self.assertEqual(post.image_bytes, len(file.getvalue()))
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_form_rejects_large_upload(self):
+        """Проверка что форма отклоняет слишком большой файл."""
+        form = PostForm(data={'text': 'пост'}, files={'image': photo()})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
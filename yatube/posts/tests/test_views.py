@@ -1,5 +1,7 @@
+import hashlib
 import shutil
 
+from core.cache import LOCK_KEY, PAGE_KEY
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -7,7 +9,7 @@ from django.core.cache import cache
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from mixer.backend.django import mixer
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post
 from posts.tests.common import image
 
 User = get_user_model()
@@ -163,16 +165,74 @@ class PostViewTests(TestCase):
         post = Post.objects.create(
             text='пост под кеш',
             author=self.user)
-        content_add = self.client_user.get(
+        content_add = self.anon.get(
             reverse('posts:index')).content
-        post.delete()
-        content_delete = self.client_user.get(
+        Post.objects.filter(pk=post.pk).update(text='без сигналов')
+        content_cached = self.anon.get(
             reverse('posts:index')).content
-        self.assertEqual(content_add, content_delete)
-        cache.clear()
-        content_cache_clear = self.client_user.get(
+        self.assertEqual(content_add, content_cached)
+        post.delete()
+        content_delete = self.anon.get(
             reverse('posts:index')).content
-        self.assertNotEqual(content_add, content_cache_clear)
+        self.assertNotEqual(content_add, content_delete)
+
+    def test_cache_invalidated_by_comment(self):
+        """Проверка что комментарий сбрасывает кеш страницы поста."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertIsNotNone(self.anon.get(url).context)
+        self.assertIsNone(self.anon.get(url).context)
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text='комментарий под кеш',
+        )
+        self.assertIsNotNone(self.anon.get(url).context)
+
+    def test_cache_serves_stale_page_while_rebuilding(self):
+        """Проверка что при занятой блокировке отдаётся прошлая версия."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        content = self.anon.get(url).content
+        Post.objects.create(
+            text='пост во время пересборки',
+            author=self.user,
+            group=self.group,
+        )
+        key = PAGE_KEY.format(
+            'group_posts', hashlib.md5(url.encode()).hexdigest(),
+        )
+        cache.add(LOCK_KEY.format(key), 1)
+        self.assertEqual(content, self.anon.get(url).content)
+        cache.delete(LOCK_KEY.format(key))
+        self.assertNotEqual(content, self.anon.get(url).content)
+
+    def test_post_page_scopes(self):
+        """Проверка что страницу поста сбрасывают только его автор и пост."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.anon.get(url)['ETag']
+        other = User.objects.create_user(username='other_author')
+        Post.objects.create(text='чужой пост', author=other)
+        response = self.anon.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='ещё пост автора', author=self.user)
+        response = self.anon.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get(self):
+        """Проверка ответа 304, пока страница не изменилась."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        # первый ответ ставит CSRF-cookie, от неё зависит ETag формы
+        self.client_user.get(url)
+        etag = self.client_user.get(url)['ETag']
+        # только сессия и пользователь, страница не собирается
+        with self.assertNumQueries(2):
+            response = self.client_user.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(etag, self.anon.get(url)['ETag'])
+        Comment.objects.create(
+            post=self.post, author=self.user, text='новый комментарий',
+        )
+        response = self.client_user.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
 
 
 class PaginatorViewsTest(TestCase):
@@ -228,7 +288,12 @@ class PaginatorViewsTest(TestCase):
                     f'Ошибка: Пагинатор не выводит на первую страницу'
                     f'{template} 10 постов',
                 )
-                response = self.client_auth.get(reverse_name + '?page=2')
+                page = response.context['page_obj']
+                if getattr(page, 'is_cursor', False):
+                    second = f'?cursor={page.next_cursor}'
+                else:
+                    second = '?page=2'
+                response = self.client_auth.get(reverse_name + second)
                 self.assertEqual(
                     len(response.context['page_obj']),
                     self.NUMBER_OF_POSTS_SECOND_PAGE,
@@ -237,6 +302,64 @@ class PaginatorViewsTest(TestCase):
                 )
 
 
+class CommentsPaginationTest(TestCase):
+    """Тестирование курсорной пагинации комментариев поста."""
+
+    NUMBER_OF_COMMENTS: int = 25
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаём пост с комментариями."""
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(
+            text='Обсуждаемый пост', author=cls.user,
+        )
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'комментарий {i}')
+            for i in range(cls.NUMBER_OF_COMMENTS)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """Проверка что на странице поста только первая страница."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.LIMIT_COMMENTS)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, comments.next_cursor)
+
+    def test_comments_fragment_and_json(self):
+        """Проверка подгрузки следующей страницы фрагментом и JSON."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        first = self.client.get(url).context['comments']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, {'cursor': first.next_cursor, 'format': 'json'},
+            )
+        data = response.json()
+        self.assertEqual(
+            len(data['comments']),
+            self.NUMBER_OF_COMMENTS - settings.LIMIT_COMMENTS,
+        )
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['comments'][0]['author'], 'commentator')
+        shown = {comment.pk for comment in first}
+        self.assertFalse(shown & {item['id'] for item in data['comments']})
+
+    def test_comments_of_missing_post(self):
+        """Проверка что для несуществующего поста вернётся 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk + 1,)),
+        )
+        self.assertEqual(response.status_code, 404)
+
+
 class FollowViewsTest(TestCase):
     """Тестирование view-функций отвечающих за работу подписки."""
 
@@ -303,6 +426,17 @@ class FollowViewsTest(TestCase):
             reverse('posts:follow_index'))
         self.assertIn(post, response.context['page_obj'].object_list)
 
+    def test_follow_index_etag_follows_subscriptions(self):
+        """Проверка что подписка меняет ETag ленты подписок."""
+        url = reverse('posts:follow_index')
+        etag = self.client_author.get(url)['ETag']
+        Follow.objects.create(
+            user=self.post_follower,
+            author=self.post_author)
+        response = self.client_author.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.post, response.context['page_obj'].object_list)
+
     def test_notfollow_on_authors(self):
         """Проверка записей у тех кто не подписан."""
         post = Post.objects.create(
@@ -0,0 +1,62 @@
+"""Предварительная генерация миниатюр картинок постов.
+
+Миниатюры всех геометрий из THUMBNAIL_GEOMETRIES строятся в пуле
+процессов сразу после загрузки картинки. Их адреса и размеры
+сохраняются в Post.thumbnails, и шаблоны не вызывают sorl.thumbnail
+в потоке запроса.
+"""
+import json
+import typing
+
+from core import workers
+from core.cache import bump
+from django.conf import settings
+from posts.models import Post
+from sorl.thumbnail import get_thumbnail
+
+
+def build(image_name: str) -> typing.Dict[str, dict]:
+    """Строит миниатюры картинки, выполняется в процессе пула."""
+    thumbnails = {}
+    for name, (geometry, options) in settings.THUMBNAIL_GEOMETRIES.items():
+        thumbnail = get_thumbnail(image_name, geometry, **options)
+        if not thumbnail.exists():
+            continue
+        thumbnails[name] = {
+            'url': thumbnail.url,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+        }
+    return thumbnails
+
+
+def store(post_id: int, image_name: str, thumbnails: dict) -> None:
+    """Сохраняет миниатюры, если картинка поста не успела смениться."""
+    if not thumbnails:
+        return
+    posts = Post.objects.filter(pk=post_id, image=image_name)
+    if not posts.update(thumbnails=json.dumps(thumbnails)):
+        return
+    # страницы и их ETag должны перейти с картинки на миниатюры
+    refresh_pages(post_id)
+
+
+def refresh_pages(post_id: int) -> None:
+    """Сбрасывает кеш страниц, где показана картинка поста."""
+    author, group = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug',
+    ).first()
+    bump('posts', f'post:{post_id}', f'author:{author}')
+    if group:
+        bump(f'group:{group}')
+
+
+def schedule(post_id: int, image_name: str) -> None:
+    """Ставит генерацию миниатюр картинки поста в очередь."""
+    if not image_name:
+        return
+    workers.submit(
+        build,
+        image_name,
+        callback=lambda thumbnails: store(post_id, image_name, thumbnails),
+    )
@@ -0,0 +1,216 @@
+"""Потоковые выгрузка и загрузка данных в JSONL.
+
+Каждая строка файла - одна запись: {"type": "post", "id": 1, ...}.
+Записи идут в порядке TYPES, поэтому пользователи и группы
+загружаются раньше ссылающихся на них постов. Файлы с расширением
+.gz, .bz2 и .xz сжимаются, '-' - стандартные вход и выход.
+
+Выгрузка читает таблицы пачками по первичному ключу, загрузка
+вставляет пачками через bulk_create, так что расход памяти
+не зависит от объёма данных. Счётчики, ленты подписок, поисковый
+индекс и рейтинг популярных постов не переносятся, а пересобираются
+после загрузки.
+"""
+import bz2
+import contextlib
+import datetime
+import gzip
+import json
+import lzma
+import sys
+import typing
+
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Model
+from django.utils.dateparse import parse_datetime
+from posts import counters, feed, graph, search, trending
+from posts.models import Comment, Follow, Group, Post, User
+
+TYPES = (
+    ('user', User, (
+        'id', 'username', 'password', 'first_name', 'last_name', 'email',
+        'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    )),
+    ('group', Group, ('id', 'title', 'slug', 'description')),
+    ('post', Post, (
+        'id', 'text', 'author_id', 'group_id', 'image', 'image_width',
+        'image_height', 'image_bytes', 'pub_date', 'updated',
+    )),
+    ('comment', Comment, (
+        'id', 'post_id', 'author_id', 'text', 'pub_date', 'updated',
+    )),
+    ('follow', Follow, ('id', 'user_id', 'author_id')),
+)
+OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+@contextlib.contextmanager
+def open_stream(path: str, mode: str) -> typing.Iterator[typing.TextIO]:
+    """Открывает файл по расширению, '-' - stdin или stdout."""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+        return
+    opener = OPENERS.get(path[path.rfind('.'):], open)
+    with opener(path, mode + 't', encoding='utf-8') as stream:
+        yield stream
+
+
+def _encode(value: typing.Any) -> str:
+    """Даты с микросекундами, DjangoJSONEncoder округлил бы их."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def _rows(
+    model: typing.Type[Model], fields: tuple, chunk_size: int,
+) -> typing.Iterator[dict]:
+    """Строки таблицы пачками по первичному ключу."""
+    last = 0
+    while True:
+        batch = list(
+            model.objects.filter(pk__gt=last).order_by('pk').values(
+                *fields,
+            )[:chunk_size],
+        )
+        if not batch:
+            return
+        yield from batch
+        last = batch[-1]['id']
+
+
+def export(
+    stream: typing.TextIO,
+    types: typing.Sequence[str] = tuple(name for name, _, _ in TYPES),
+    chunk_size: int = 5000,
+) -> typing.Dict[str, int]:
+    """Выгружает записи в поток, возвращает их количество по типам."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_encode)
+    exported = {}
+    for name, model, fields in TYPES:
+        if name not in types:
+            continue
+        exported[name] = 0
+        for row in _rows(model, fields, chunk_size):
+            stream.write(encoder.encode({'type': name, **row}))
+            stream.write('\n')
+            exported[name] += 1
+    return exported
+
+
+@contextlib.contextmanager
+def keep_timestamps(*models: typing.Type[Model]) -> typing.Iterator[None]:
+    """Отключает auto_now и auto_now_add, чтобы даты не сбросились.
+
+    bulk_create вызывает pre_save полей, и без этого все посты
+    получили бы дату загрузки.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _builder(
+    model: typing.Type[Model], fields: tuple,
+) -> typing.Callable[[dict], Model]:
+    dates = {
+        name for name in fields
+        if model._meta.get_field(name).get_internal_type() == 'DateTimeField'
+    }
+
+    def build(record: dict) -> Model:
+        values = {name: record[name] for name in fields if name in record}
+        for name in dates & values.keys():
+            if values[name] is not None:
+                values[name] = parse_datetime(values[name])
+        return model(**values)
+    return build
+
+
+def _flush(model: typing.Type[Model], batch: list) -> None:
+    with transaction.atomic():
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+    batch.clear()
+
+
+def load(
+    stream: typing.TextIO,
+    batch_size: int = 5000,
+    log: typing.Callable[[str], None] = lambda message: None,
+) -> typing.Dict[str, int]:
+    """Загружает записи из потока, возвращает их количество по типам.
+
+    Записи с уже занятым первичным ключом пропускаются. Сигналы
+    моделей при bulk_create не отправляются, триггеры поиска на время
+    загрузки снимаются, а после неё пересчитываются счётчики,
+    собираются ленты, индекс поиска и рейтинг и сбрасывается
+    кеш страниц.
+    """
+    models = {name: model for name, model, _ in TYPES}
+    builders = {
+        name: _builder(model, fields) for name, model, fields in TYPES
+    }
+    loaded = dict.fromkeys(models, 0)
+    current, batch = None, []
+    search.uninstall()
+    try:
+        with keep_timestamps(*models.values()):
+            for line in stream:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                name = record.pop('type')
+                if name not in models:
+                    raise ValueError(f'Неизвестный тип записи: {name}')
+                if name != current or len(batch) >= batch_size:
+                    if batch:
+                        _flush(models[current], batch)
+                        log(f'{current}: {loaded[current]}')
+                    current = name
+                batch.append(builders[name](record))
+                loaded[name] += 1
+            if batch:
+                _flush(models[current], batch)
+                log(f'{current}: {loaded[current]}')
+        _reset_sequences(models.values())
+    finally:
+        log('Сборка поискового индекса')
+        search.install(rebuild=True)
+    log('Пересчёт счётчиков')
+    counters.recount_groups()
+    counters.recount_posts()
+    counters.recount_users()
+    log('Сборка лент подписок')
+    feed.rebuild()
+    log('Сборка рейтинга популярных постов')
+    trending.rebuild()
+    graph.reset()
+    cache.clear()
+    return loaded
+
+
+def _reset_sequences(models: typing.Iterable[typing.Type[Model]]) -> None:
+    """Сдвигает автоинкремент за загруженные ключи, как loaddata."""
+    statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
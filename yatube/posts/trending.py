@@ -0,0 +1,220 @@
+"""Рейтинг популярных постов с затуханием по времени.
+
+Просмотр поста и комментарий добавляют ему вес из TRENDING_WEIGHTS,
+который вдвое убывает за TRENDING_HALF_LIFE секунд. Хранится не сам
+вес, а rank = log2(вес) + t / TRENDING_HALF_LIFE, то есть вес,
+приведённый к началу эпохи. Веса всех постов затухают одинаково,
+поэтому порядок по rank со временем не меняется и старые записи
+не нужно пересчитывать, а вес в момент now равен
+2 ** (rank - now / TRENDING_HALF_LIFE).
+
+События копятся в памяти процесса и раз в TRENDING_FLUSH_SECONDS
+после ответа складываются в таблицу Trending, там же удаляются посты,
+чей вес упал ниже TRENDING_MIN_SCORE. Страницы рейтинга берут первые
+TRENDING_SIZE постов из списков в памяти, которые перечитываются
+из таблицы не чаще раза в TRENDING_FLUSH_SECONDS, так что цена
+страницы не зависит от числа постов и событий.
+"""
+import datetime
+import functools
+import logging
+import math
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse
+from posts.models import Comment, Post, Trending
+
+logger = logging.getLogger(__name__)
+
+NEVER = float('-inf')
+
+_lock = threading.Lock()
+# приращения rank, ещё не сложенные в таблицу
+_pending: typing.Dict[int, float] = {}
+# первые TRENDING_SIZE постов: None - все посты, иначе id группы
+_boards: typing.Dict[typing.Optional[int], typing.List[int]] = {}
+_flushed = _loaded = time.time()
+
+
+def rank_of(weight: float, at: float) -> float:
+    """rank события с весом weight в момент at."""
+    return math.log2(weight) + at / settings.TRENDING_HALF_LIFE
+
+
+def combine(first: float, second: float) -> float:
+    """rank суммы весов, log2(2 ** first + 2 ** second) без переполнения."""
+    if first < second:
+        first, second = second, first
+    if second == NEVER:
+        return first
+    return first + math.log2(1 + 2 ** (second - first))
+
+
+def score(rank: float, at: typing.Optional[float] = None) -> float:
+    """Вес поста в момент at."""
+    at = time.time() if at is None else at
+    return 2 ** (rank - at / settings.TRENDING_HALF_LIFE)
+
+
+def record(
+    post_id: int, weight: float, at: typing.Optional[float] = None,
+) -> None:
+    """Добавляет посту вес события."""
+    rank = rank_of(weight, time.time() if at is None else at)
+    with _lock:
+        _pending[post_id] = combine(_pending.get(post_id, NEVER), rank)
+
+
+def counts_views(view: typing.Callable) -> typing.Callable:
+    """Считает успешные GET view поста просмотрами."""
+    @functools.wraps(view)
+    def wrapper(request: HttpRequest, pk: int, **kwargs) -> HttpResponse:
+        response = view(request, pk=pk, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record(pk, settings.TRENDING_WEIGHTS['view'])
+        return response
+    return wrapper
+
+
+def _merge(pending: typing.Dict[int, float]) -> None:
+    rows = Trending.objects.filter(post_id__in=pending)
+    # пустой UPDATE берёт блокировку записи SQLite до чтения, иначе
+    # два процесса прочитали бы один rank и одно приращение потерялось
+    rows.update(rank=F('rank'))
+    stored = dict(rows.values_list('post_id', 'rank'))
+    Trending.objects.bulk_update(
+        [
+            Trending(post_id=post_id, rank=combine(rank, pending[post_id]))
+            for post_id, rank in stored.items()
+        ],
+        ['rank'],
+        batch_size=500,
+    )
+    # посты могли удалить, пока события лежали в памяти
+    new = Post.objects.filter(
+        pk__in=pending.keys() - stored.keys(),
+    ).values_list('pk', flat=True)
+    Trending.objects.bulk_create(
+        [Trending(post_id=post_id, rank=pending[post_id]) for post_id in new],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def flush(now: typing.Optional[float] = None) -> int:
+    """Складывает накопленные события в таблицу.
+
+    Возвращает число постов с новыми событиями.
+    """
+    global _pending, _flushed
+    now = time.time() if now is None else now
+    with _lock:
+        pending, _pending, _flushed = _pending, {}, now
+    try:
+        with transaction.atomic():
+            if pending:
+                _merge(pending)
+            Trending.objects.filter(
+                rank__lt=rank_of(settings.TRENDING_MIN_SCORE, now),
+            ).delete()
+    except Exception:
+        with _lock:
+            for post_id, rank in pending.items():
+                _pending[post_id] = combine(
+                    _pending.get(post_id, NEVER), rank,
+                )
+        raise
+    with _lock:
+        _boards.clear()
+    return len(pending)
+
+
+def flush_due() -> None:
+    """Сбрасывает события, если с прошлого сброса прошло достаточно."""
+    if not _pending:
+        return
+    if time.time() - _flushed < settings.TRENDING_FLUSH_SECONDS:
+        return
+    try:
+        flush()
+    except Exception:
+        logger.exception('Не удалось сохранить рейтинг постов')
+
+
+def ranked(group_id: typing.Optional[int] = None) -> typing.List[int]:
+    """id самых популярных постов, всех или группы."""
+    global _loaded
+    now = time.time()
+    with _lock:
+        if now - _loaded >= settings.TRENDING_FLUSH_SECONDS:
+            _boards.clear()
+            _loaded = now
+        board = _boards.get(group_id)
+    if board is not None:
+        return board
+    rows = Trending.objects.filter(
+        rank__gte=rank_of(settings.TRENDING_MIN_SCORE, now),
+    )
+    if group_id is not None:
+        rows = rows.filter(post__group_id=group_id)
+    board = list(
+        rows.order_by('-rank').values_list('post_id', flat=True)[
+            :settings.TRENDING_SIZE
+        ],
+    )
+    with _lock:
+        _boards[group_id] = board
+    return board
+
+
+def posts(group_id: typing.Optional[int] = None) -> typing.List[Post]:
+    """Самые популярные посты по порядку, одним запросом."""
+    ids = ranked(group_id)
+    found = Post.objects.select_related('author', 'group').in_bulk(ids)
+    return [found[post_id] for post_id in ids if post_id in found]
+
+
+def rebuild(now: typing.Optional[float] = None) -> int:
+    """Собирает рейтинг заново по комментариям.
+
+    Просмотры нигде не хранятся, поэтому после пересборки
+    рейтинг учитывает только комментарии.
+    """
+    now = time.time() if now is None else now
+    weight = settings.TRENDING_WEIGHTS['comment']
+    # раньше этого момента комментарий весит меньше TRENDING_MIN_SCORE
+    since = now - settings.TRENDING_HALF_LIFE * math.log2(
+        weight / settings.TRENDING_MIN_SCORE,
+    )
+    ranks: typing.Dict[int, float] = {}
+    comments = Comment.objects.filter(
+        pub_date__gte=datetime.datetime.fromtimestamp(
+            since, datetime.timezone.utc,
+        ),
+    ).values_list('post_id', 'pub_date')
+    for post_id, pub_date in comments.iterator():
+        ranks[post_id] = combine(
+            ranks.get(post_id, NEVER), rank_of(weight, pub_date.timestamp()),
+        )
+    with transaction.atomic():
+        Trending.objects.all().delete()
+        Trending.objects.bulk_create(
+            [Trending(post_id=pk, rank=rank) for pk, rank in ranks.items()],
+            batch_size=1000,
+        )
+    reset()
+    return len(ranks)
+
+
+def reset() -> None:
+    """Забывает накопленные события и списки в памяти."""
+    global _flushed, _loaded
+    with _lock:
+        _pending.clear()
+        _boards.clear()
+        _flushed = _loaded = time.time()
@@ -0,0 +1,117 @@
+"""Нормализация загруженных картинок постов.
+
+Оригиналы с камеры весят десятки мегабайт и несут EXIF, за что
+потом платят и миниатюры, и каждое скачивание. После сохранения
+поста картинка в пуле процессов (core.workers) поворачивается
+по EXIF, уменьшается до IMAGE_MAX_SIZE, теряет метаданные
+и пережимается в IMAGE_FORMAT с качеством IMAGE_QUALITY.
+Размеры и вес файла сохраняются в посте, затем строятся миниатюры.
+
+Анимированные картинки не пережимаются. Если пережатый файл
+оказался тяжелее исходного, а уменьшать и вычищать было нечего,
+остаётся исходный.
+"""
+import io
+import os
+import typing
+
+from core import workers
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from posts import thumbnails
+from posts.models import Post
+
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+}
+ALPHA_FORMATS = {'PNG', 'WEBP'}
+METADATA = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+
+def _encode(image: Image.Image) -> typing.Tuple[bytes, str]:
+    """Пережимает картинку, прозрачные - в формат с альфа-каналом."""
+    fmt = settings.IMAGE_FORMAT
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha and fmt not in ALPHA_FORMATS:
+        fmt = 'PNG'
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    options = {'optimize': True}
+    if fmt in ('JPEG', 'WEBP'):
+        options['quality'] = settings.IMAGE_QUALITY
+    if fmt == 'JPEG':
+        options['progressive'] = True
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue(), fmt
+
+
+def normalize(image_name: str) -> dict:
+    """Нормализует картинку, выполняется в процессе пула.
+
+    Возвращает имя итогового файла, его размеры и вес.
+    """
+    with default_storage.open(image_name) as file:
+        original = file.read()
+    image = Image.open(io.BytesIO(original))
+    result = {
+        'name': image_name,
+        'width': image.width,
+        'height': image.height,
+        'bytes': len(original),
+    }
+    if getattr(image, 'is_animated', False):
+        return result
+    metadata = any(key in image.info for key in METADATA)
+    # JPEG сразу декодируется в уменьшенном масштабе, это в разы
+    # быстрее, чем читать полный кадр с камеры
+    image.draft('RGB', settings.IMAGE_MAX_SIZE)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.IMAGE_MAX_SIZE, Image.LANCZOS)
+    data, fmt = _encode(image)
+    resized = image.size != (result['width'], result['height'])
+    if len(data) >= len(original) and not resized and not metadata:
+        return result
+    name = default_storage.save(
+        os.path.splitext(image_name)[0] + EXTENSIONS[fmt],
+        ContentFile(data),
+    )
+    result.update(
+        name=name, width=image.width, height=image.height, bytes=len(data),
+    )
+    return result
+
+
+def store(post_id: int, image_name: str, result: dict) -> None:
+    """Подменяет картинку поста, если её не успели сменить."""
+    posts = Post.objects.filter(pk=post_id, image=image_name)
+    updated = posts.update(
+        image=result['name'],
+        image_width=result['width'],
+        image_height=result['height'],
+        image_bytes=result['bytes'],
+    )
+    if result['name'] != image_name:
+        # файл, который больше никому не нужен: оригинал или
+        # новая версия картинки, которую успели заменить
+        default_storage.delete(image_name if updated else result['name'])
+    if not updated:
+        return
+    thumbnails.refresh_pages(post_id)
+    thumbnails.schedule(post_id, result['name'])
+
+
+def schedule(post_id: int, image_name: str) -> None:
+    """Ставит нормализацию картинки поста в очередь."""
+    if not image_name:
+        return
+    workers.submit(
+        normalize,
+        image_name,
+        callback=lambda result: store(post_id, image_name, result),
+    )
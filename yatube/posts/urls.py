@@ -11,6 +11,11 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('posts/<int:pk>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:pk>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path(
         'posts/<int:pk>/comment/',
         views.add_comment,
@@ -19,6 +24,24 @@ urlpatterns = [
     path('posts/<int:pk>/edit/', views.post_edit, name='post_edit'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending_posts, name='trending'),
+    path(
+        'group/<slug:slug>/trending/',
+        views.group_trending,
+        name='group_trending',
+    ),
+    path('feeds/<str:fmt>/', views.posts_feed, name='posts_feed'),
+    path(
+        'group/<slug:slug>/feeds/<str:fmt>/',
+        views.group_feed,
+        name='group_feed',
+    ),
+    path(
+        'profile/<str:username>/feeds/<str:fmt>/',
+        views.profile_feed,
+        name='profile_feed',
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
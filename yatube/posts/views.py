@@ -1,14 +1,26 @@
-from core.utils import paginate
+import typing
+from urllib.parse import urlencode
+
+from core.cache import cached_page, conditional_page, generation
+from core.routers import read_from_replica
+from core.utils import CursorPage, CursorPaginator, paginate
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from posts import graph, syndication, trending
+from posts.feed import feed_for
+from posts.following import for_request
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import search_post_ids
 
 
-@cache_page(20, key_prefix='index_page')
+@read_from_replica
+@conditional_page('posts', 'follow:{user}')
+@cached_page('posts')
 def index(request: HttpRequest) -> HttpResponse:
     """Отрисовка главной страницы с 10 последними статьями.
 
@@ -28,61 +40,258 @@ def index(request: HttpRequest) -> HttpResponse:
     )
 
 
+@read_from_replica
+@conditional_page('group:{slug}', 'follow:{user}')
+@cached_page('group:{slug}')
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     """Отрисовка страницы группы с 10 последними статьями данной группы.
 
     Принимает WSGIRequest, наименование группы в формате slug
     и возвращает подготовленную html страницу с данными.
     """
+    group = get_object_or_404(Group, slug=slug)
     return render(
         request,
         'posts/group_list.html',
         {
-            'group': get_object_or_404(Group, slug=slug),
+            'group': group,
             'page_obj': paginate(
                 request,
-                get_object_or_404(
-                    Group,
-                    slug=slug,
-                ).posts.select_related('group'),
+                group.posts.select_related('author', 'group'),
                 settings.LIMIT_POSTS,
+                count=group.posts_count,
             ),
         },
     )
 
 
+@read_from_replica
+@conditional_page('author:{username}')
+@cached_page('author:{username}')
 def profile(request: HttpRequest, username: str) -> HttpResponse:
     """Отрисовка страницы профиля пользователя.
 
     С информацией обо всех постах данного пользователя.
     """
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username,
+    )
     return render(
         request,
         'posts/profile.html',
         {
             'page_obj': paginate(
                 request,
-                author.posts.select_related('author'),
+                author.posts.select_related('author', 'group'),
                 settings.LIMIT_POSTS,
+                mode='cursor',
             ),
             'author': author,
+            'following': for_request(request).follows(author.pk),
+            'similar': graph.users(
+                graph.graph().similar(
+                    author.pk, settings.FOLLOW_RECOMMENDATIONS,
+                ),
+            ),
         },
     )
 
 
+def comments_page(request: HttpRequest, pk: int) -> CursorPage:
+    """Страница комментариев поста, от новых к старым.
+
+    Ключ курсора (pub_date, pk) идёт по индексу (post, pub_date),
+    авторы загружаются тем же запросом.
+    """
+    return CursorPaginator(
+        Comment.objects.filter(post_id=pk).select_related('author'),
+        settings.LIMIT_COMMENTS,
+    ).get_page(request.GET.get('cursor'))
+
+
+POST_SCOPES_KEY = 'post-scopes:{}:{}'
+
+
+def post_owner_scopes(pk: int, **kwargs) -> typing.List[str]:
+    """Области автора и группы поста для кеша его страницы.
+
+    Кешируются до изменения поста, поэтому проверка ETag
+    обходится без запроса к базе.
+    """
+    key = POST_SCOPES_KEY.format(pk, generation(f'post:{pk}')[0])
+    scopes = cache.get(key)
+    if scopes is None:
+        owner = Post.objects.filter(pk=pk).values_list(
+            'author__username', 'group__slug',
+        ).first()
+        scopes = []
+        if owner is not None:
+            scopes.append(f'author:{owner[0]}')
+            if owner[1]:
+                scopes.append(f'group:{owner[1]}')
+        cache.set(key, scopes, settings.PAGE_CACHE_TIMEOUT)
+    return scopes
+
+
+@read_from_replica
+@trending.counts_views
+@conditional_page('post:{pk}', post_owner_scopes)
+@cached_page('post:{pk}', post_owner_scopes)
 def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
     """Отрисовка страницы с описанием конкретного выбранного поста."""
     return render(
         request,
         'posts/post_detail.html',
         {
-            'post': get_object_or_404(Post, pk=pk),
+            'post': get_object_or_404(
+                Post.objects.select_related(
+                    'author__counters', 'group',
+                ),
+                pk=pk,
+            ),
+            'comments': comments_page(request, pk),
             'form': CommentForm(),
         },
     )
 
 
+@read_from_replica
+@conditional_page('post:{pk}')
+@cached_page('post:{pk}')
+def post_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    """Следующая страница комментариев без отрисовки самого поста.
+
+    Отдаёт HTML-фрагмент для подгрузки на странице поста,
+    а с параметром format=json - комментарии в JSON.
+    """
+    comments = comments_page(request, pk)
+    if not comments and not Post.objects.filter(pk=pk).exists():
+        raise Http404
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'author_name': comment.author.get_full_name(),
+                    'text': comment.text,
+                    'pub_date': comment.pub_date.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    return render(
+        request,
+        'includes/comments.html',
+        {
+            'post_id': pk,
+            'comments': comments,
+        },
+    )
+
+
+def search(request: HttpRequest) -> HttpResponse:
+    """Отрисовка страницы полнотекстового поиска по постам.
+
+    Посты ранжируются по релевантности текста поста
+    и комментариев к нему.
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate(request, search_post_ids(query), settings.LIMIT_POSTS)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page_obj.object_list,
+    )
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'query': query,
+            'page_obj': page_obj,
+            'page_query': urlencode({'q': query}) + '&',
+        },
+    )
+
+
+@read_from_replica
+def trending_posts(request: HttpRequest) -> HttpResponse:
+    """Самые популярные посты по просмотрам и комментариям."""
+    return render(
+        request, 'posts/trending.html', {'posts': trending.posts()},
+    )
+
+
+@read_from_replica
+def group_trending(request: HttpRequest, slug: str) -> HttpResponse:
+    """Самые популярные посты группы."""
+    group = get_object_or_404(Group, slug=slug)
+    return render(
+        request,
+        'posts/trending.html',
+        {'group': group, 'posts': trending.posts(group.pk)},
+    )
+
+
+@read_from_replica
+def posts_feed(request: HttpRequest, fmt: str) -> HttpResponse:
+    """Лента последних постов в формате rss, atom или json."""
+    return syndication.respond(
+        request,
+        fmt,
+        'posts',
+        Post.objects.all(),
+        lambda: {
+            'title': 'Yatube',
+            'description': 'Последние записи',
+            'link': reverse('posts:index'),
+        },
+    )
+
+
+@read_from_replica
+def group_feed(request: HttpRequest, slug: str, fmt: str) -> HttpResponse:
+    """Лента последних постов группы."""
+    def channel() -> typing.Optional[dict]:
+        group = Group.objects.filter(slug=slug).values(
+            'title', 'description',
+        ).first()
+        return group and dict(group, link=reverse(
+            'posts:group_list', args=(slug,),
+        ))
+    return syndication.respond(
+        request,
+        fmt,
+        f'group:{slug}',
+        Post.objects.filter(group__slug=slug),
+        channel,
+    )
+
+
+@read_from_replica
+def profile_feed(
+    request: HttpRequest, username: str, fmt: str,
+) -> HttpResponse:
+    """Лента последних постов автора."""
+    def channel() -> typing.Optional[dict]:
+        author = User.objects.filter(username=username).first()
+        return author and {
+            'title': author.get_full_name() or author.username,
+            'description': f'Записи автора {author.username}',
+            'link': reverse('posts:profile', args=(username,)),
+        }
+    return syndication.respond(
+        request,
+        fmt,
+        f'author:{username}',
+        Post.objects.filter(author__username=username),
+        channel,
+    )
+
+
 @login_required
 def post_create(request: HttpRequest) -> HttpResponse:
     """Отрисовка страницы с окном создания поста.
@@ -151,7 +360,9 @@ def add_comment(request: HttpRequest, pk: int) -> HttpResponse:
     return redirect('posts:post_detail', pk)
 
 
+@read_from_replica
 @login_required
+@conditional_page('posts', 'follow:{user}')
 def follow_index(request: HttpRequest) -> HttpResponse:
     """Отрисовка страницы c инф. о подписках текущего пользователя."""
     return render(
@@ -160,11 +371,14 @@ def follow_index(request: HttpRequest) -> HttpResponse:
         {
             'page_obj': paginate(
                 request,
-                Post.objects.filter(
-                    author__following__user=request.user,
-                ),
+                feed_for(request.user).select_related('author', 'group'),
                 settings.LIMIT_POSTS,
             ),
+            'recommended': graph.users(
+                graph.graph().recommend(
+                    request.user.pk, settings.FOLLOW_RECOMMENDATIONS,
+                ),
+            ),
         },
     )
 
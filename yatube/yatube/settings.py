@@ -1,14 +1,47 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 TEMP_MEDIA_ROOT = 'media/posts'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    },
-}
+# SHARED_CACHE=1 включает общий для всех воркеров хоста кеш в памяти
+SHARED_CACHE = bool(int(os.getenv('SHARED_CACHE', 0)))
+
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SharedMemoryCache',
+            'LOCATION': os.getenv(
+                'SHARED_CACHE_PATH',
+                os.path.join(tempfile.gettempdir(), 'yatube-cache.mmap'),
+            ),
+            'OPTIONS': {
+                'MAX_ENTRIES': 16384,
+                'WAYS': 8,
+                'SLOT_SIZE': 64 * 1024,
+            },
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# поколения областей (core.cache) сбрасывают сигналы, но кеш процесса
+# не видит сбросов из других воркеров: без общего кеша страницы
+# и поколения живут недолго, а с общим - сутки и без срока
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 20
+
+GENERATION_TIMEOUT = None if SHARED_CACHE else PAGE_CACHE_TIMEOUT
+
+PAGE_CACHE_LOCK_TIMEOUT = 10
+
+PAGE_CACHE_POLL_INTERVAL = 0.05
+
+CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
 
 SECRET_KEY = '@2oi_1*!!ldqi+%dsrjk7n+=!v$e)^pncz#b2a&#ee(0vkp46n'
 
@@ -30,6 +63,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -39,20 +73,59 @@ INSTALLED_APPS = [
 
 MEDIA_URL = '/media/'
 
+THUMBNAIL_GEOMETRIES = {
+    'card': ('300x300', {'crop': 'center', 'upscale': True}),
+    'wide': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# пул процессов для обработки картинок, см. core.workers;
+# тесты ставят 0 (core.test_runner, tests/conftest.py)
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', os.cpu_count() or 1))
+
+# нормализация загруженных картинок, см. posts.uploads
+IMAGE_MAX_SIZE = (2048, 2048)
+
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'JPEG')
+
+IMAGE_QUALITY = 82
+
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# сессии и пользователь запроса из кеша (core.sessions, core.auth)
+# включаются только с общим кешем: в кеше процесса выход и смена
+# пароля не дошли бы до остальных воркеров
+CACHED_AUTH_MIDDLEWARE = [
+    'core.middleware.CachedAuthenticationMiddleware'
+    if name == 'django.contrib.auth.middleware.AuthenticationMiddleware'
+    else name
+    for name in MIDDLEWARE
+]
+
+if SHARED_CACHE:
+    SESSION_ENGINE = 'core.sessions'
+    MIDDLEWARE = CACHED_AUTH_MIDDLEWARE
+
+USER_CACHE_TIMEOUT = 60 * 5
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
@@ -76,11 +149,89 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'lock_retries': 5,
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': 'auto',
+                'busy_timeout': 5000,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+
+# DATABASE_REPLICAS - пути к снимкам базы через запятую, снимки
+# обновляет команда snapshot_replicas. Соединение с репликой
+# не переиспользуется между запросами: открытое соединение продолжает
+# читать старый файл после того, как снимок заменён новым
+DATABASE_REPLICAS = []
+
+for number, path in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')),
+):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'timeout': 5,
+            'pragmas': {
+                'query_only': 1,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': 'auto',
+            },
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# пределы частоты запросов по имени view, см. core.ratelimit
+RATE_LIMITS = {
+    'posts:post_create': {'rate': '10/m', 'burst': 30},
+    'posts:post_edit': {'rate': '30/m', 'burst': 30},
+    'posts:add_comment': {'rate': '30/m', 'burst': 60},
+    'posts:profile_follow': {
+        'rate': '60/m', 'burst': 60, 'methods': ('GET', 'POST'),
+    },
+    'posts:profile_unfollow': {
+        'rate': '60/m', 'burst': 60, 'methods': ('GET', 'POST'),
     },
+    'users:signup': {'rate': '10/h', 'burst': 20},
+    'users:login': {'rate': '30/h', 'burst': 30},
 }
 
+# RATE_LIMITS_DISABLED=1 снимает пределы, например на сервере
+# для нагрузочного прогона с --url
+if os.getenv('RATE_LIMITS_DISABLED'):
+    RATE_LIMITS = {}
+
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')
+
+# заголовок с адресом клиента за прокси, например HTTP_X_FORWARDED_FOR
+RATE_LIMIT_IP_HEADER = os.getenv('RATE_LIMIT_IP_HEADER')
+
+# число наших прокси перед приложением: адрес клиента берётся
+# из RATE_LIMIT_IP_HEADER на столько позиций с конца
+RATE_LIMIT_PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', 1))
+
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', 60))
+
+# после записи пользователь читает основную базу, пока реплики
+# могут не содержать его изменений
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -98,12 +249,59 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LIMIT_POSTS = 10
 
+LIMIT_COMMENTS = 20
+
+# больше стольких записей списки админки не считают, см. core.admin
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+API_PAGE_SIZE = 20
+
+API_MAX_PAGE_SIZE = 100
+
+SYNDICATION_ITEMS = 20
+
+SYNDICATION_TITLE_LENGTH = 60
+
+PAGINATION_MODE = 'pages'
+
+PAGINATION_WINDOW = 2
+
 SHORT_TEXT_RETURN = 15
 
 TEXT_LENGTH_POST_RETURN = 50
 
 TITLE_LENGTH_RETURN = 60
 
+SEARCH_MAX_RESULTS = 1000
+
+SEARCH_COMMENT_WEIGHT = 0.5
+
+FEED_FANOUT_LIMIT = 10000
+
+# граф подписок в памяти и рекомендации, см. posts.graph
+FOLLOW_GRAPH_REFRESH_SECONDS = 60 * 5
+
+FOLLOW_GRAPH_MAX_DELTA = 1024
+
+FOLLOW_GRAPH_FANOUT = 200
+
+FOLLOW_RECOMMENDATIONS = 5
+
+# столько подписок пользователя ещё держим в кеше целиком,
+# см. posts.following
+FOLLOW_STATE_CACHE_LIMIT = 1000
+
+# рейтинг популярных постов, см. posts.trending
+TRENDING_HALF_LIFE = 60 * 60 * 6
+
+TRENDING_WEIGHTS = {'view': 1, 'comment': 5}
+
+TRENDING_MIN_SCORE = 0.1
+
+TRENDING_SIZE = 30
+
+TRENDING_FLUSH_SECONDS = 60
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -123,3 +321,34 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+METRICS_ENABLED = True
+
+METRICS_WINDOW = 1000
+
+QUERY_BUDGET_ACTION = 'log'
+
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 6,
+    'posts:post_comments': 4,
+    'posts:follow_index': 9,
+    'posts:search': 6,
+    'posts:trending': 3,
+    'posts:group_trending': 4,
+    'posts:post_create': 13,
+    'posts:post_edit': 14,
+    'posts:posts_feed': 1,
+    'posts:group_feed': 2,
+    'posts:profile_feed': 2,
+    'api:posts': 1,
+    'api:post': 1,
+    'api:post_comments': 2,
+    'api:group': 1,
+    'api:group_posts': 2,
+    'api:profile': 1,
+    'api:profile_posts': 2,
+    'api:follow': 5,
+}
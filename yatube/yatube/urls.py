@@ -1,4 +1,6 @@
 from about.apps import AboutConfig
+from api.apps import ApiConfig
+from core.views import metrics
 from django.contrib import admin
 from django.urls import include, path
 from posts.apps import PostsConfig
@@ -8,8 +10,10 @@ urlpatterns = [
     path('', include('posts.urls', namespace=PostsConfig.name)),
     path('about/', include('about.urls', namespace=AboutConfig.name)),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('api.urls', namespace=ApiConfig.name)),
     path('auth/', include('users.urls', namespace=UsersConfig.name)),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 handler403 = 'core.views.permission_denied'